@@ -0,0 +1,106 @@
+# Copyright Sierra
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+from tau_bench.envs.compiled_data import (
+    DOMAIN_DATA_MODULES,
+    compile_tables,
+    load_compiled_tables,
+    load_json_tables,
+)
+
+LOAD_PATHS = ["json", "compiled"]
+
+
+def current_rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def cold_load(env: str, load_path: str) -> Dict[str, Any]:
+    import importlib
+
+    module = importlib.import_module(DOMAIN_DATA_MODULES[env])
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    if load_path == "json":
+        data = load_json_tables(module.FOLDER_PATH, module.FILE_NAMES)
+    else:
+        data = load_compiled_tables(module.FOLDER_PATH, module.FILE_NAMES)
+        assert data is not None, "The compiled data is missing or stale"
+    seconds = time.perf_counter() - start
+    rss_after = current_rss_kb()
+    del data
+    return {"seconds": seconds, "rss_delta_kb": rss_after - rss_before}
+
+
+def run_in_subprocess(env: str, load_path: str) -> Dict[str, Any]:
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.data_load", "--child", env, load_path],
+        stderr=subprocess.DEVNULL,
+    )
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare cold-load time and RSS of the JSON and compiled data paths"
+    )
+    parser.add_argument(
+        "--env",
+        type=str,
+        nargs="+",
+        choices=list(DOMAIN_DATA_MODULES),
+        default=list(DOMAIN_DATA_MODULES),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output-path", type=str, help="Write the results as JSON to this path")
+    parser.add_argument("--child", type=str, nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(cold_load(*args.child)))
+        return
+
+    import importlib
+
+    results = []
+    for env in args.env:
+        module = importlib.import_module(DOMAIN_DATA_MODULES[env])
+        if load_compiled_tables(module.FOLDER_PATH, module.FILE_NAMES) is None:
+            compile_tables(module.FOLDER_PATH, module.FILE_NAMES)
+        for load_path in LOAD_PATHS:
+            runs = [run_in_subprocess(env, load_path) for _ in range(args.repeat)]
+            result = {
+                "env": env,
+                "load_path": load_path,
+                "median_seconds": statistics.median(r["seconds"] for r in runs),
+                "median_rss_delta_kb": statistics.median(r["rss_delta_kb"] for r in runs),
+                "runs": runs,
+            }
+            results.append(result)
+            print(
+                f"{env:<8} {load_path:<9} "
+                f"load {result['median_seconds'] * 1000:8.1f} ms  "
+                f"rss +{result['median_rss_delta_kb'] / 1024:7.1f} MB"
+            )
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# Copyright Sierra
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tau_bench.envs import get_env
+from tau_bench.envs import gt_cache
+from tau_bench.envs.base import DataHashMode, Env
+from tau_bench.envs.compiled_data import DOMAIN_DATA_MODULES
+from tau_bench.envs.data_variants import get_data_load_func
+from tau_bench.envs.user import BaseUserSimulationEnv
+from tau_bench.types import RESPOND_ACTION_NAME
+
+HISTORICAL_TRAJECTORIES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "historical_trajectories"
+)
+PERCENTILES = [50, 90, 99]
+
+ToolCall = Tuple[str, Dict[str, Any]]
+
+
+class ScriptedUser(BaseUserSimulationEnv):
+    """A user that answers without an LLM, so resets and rewards can be timed offline."""
+
+    def reset(self, instruction: Optional[str] = None) -> str:
+        return instruction or ""
+
+    def step(self, content: str) -> str:
+        return "###STOP###"
+
+    def get_total_cost(self) -> float:
+        return 0.0
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    # nearest rank
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies: List[float], **extra: Any) -> Dict[str, Any]:
+    sorted_latencies = sorted(latencies)
+    total = sum(sorted_latencies)
+    result = {
+        "name": name,
+        "count": len(latencies),
+        "ops_per_sec": len(latencies) / total if total > 0 else None,
+        "mean_ms": total / len(latencies) * 1000,
+        **{f"p{p}_ms": percentile(sorted_latencies, p) * 1000 for p in PERCENTILES},
+        "max_ms": sorted_latencies[-1] * 1000,
+    }
+    result.update(extra)
+    return result
+
+
+def measure(
+    func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None
+) -> List[float]:
+    """Latencies of `repeat` calls of `func`, with `setup` called untimed before each one."""
+    latencies = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def make_env(
+    env_name: str, data_variant: Optional[str], data_hash_mode: str, task_index: int = 0
+) -> Env:
+    env = get_env(
+        env_name,
+        user_strategy="llm",
+        user_model="offline",
+        user_provider="offline",
+        task_split="test",
+        task_index=task_index,
+        data_hash_mode=data_hash_mode,
+        data_variant=data_variant,
+    )
+    env.user = ScriptedUser()
+    return env
+
+
+def replay_ground_truth(env: Env) -> None:
+    for action in env.task.actions:
+        if action.name != RESPOND_ACTION_NAME and action.name not in env.terminate_tools:
+            env.step(action)
+
+
+def ground_truth_tool_calls(env: Env) -> List[ToolCall]:
+    return [
+        (action.name, action.kwargs)
+        for task in env.tasks
+        for action in task.actions
+        if action.name in env.tools_map
+    ]
+
+
+def historical_tool_calls(env_name: str, env: Env) -> List[ToolCall]:
+    """The tool calls of the agents in historical_trajectories/*-<env>.json."""
+    calls = []
+    if not os.path.isdir(HISTORICAL_TRAJECTORIES_DIR):
+        return calls
+    for file_name in sorted(os.listdir(HISTORICAL_TRAJECTORIES_DIR)):
+        if not file_name.endswith(f"-{env_name}.json"):
+            continue
+        with open(os.path.join(HISTORICAL_TRAJECTORIES_DIR, file_name)) as f:
+            results = json.load(f)
+        for result in results:
+            for message in result["traj"]:
+                for tool_call in message.get("tool_calls") or []:
+                    name = tool_call["function"]["name"]
+                    try:
+                        kwargs = json.loads(tool_call["function"]["arguments"])
+                    except json.JSONDecodeError:
+                        continue
+                    if name in env.tools_map and isinstance(kwargs, dict):
+                        calls.append((name, kwargs))
+    return calls
+
+
+def bench_lifecycle(
+    env_name: str, data_variant: Optional[str], data_hash_modes: List[str], repeat: int
+) -> List[Dict[str, Any]]:
+    results = []
+    data_load_func = get_data_load_func(env_name, data_variant)
+    results.append(summarize("load_data", measure(data_load_func, max(1, repeat // 10))))
+    env = make_env(env_name, data_variant, data_hash_modes[0])
+    num_tasks = len(env.tasks)
+    task_indexes = iter(range(repeat))
+    results.append(
+        summarize(
+            "Env.__init__",
+            measure(
+                lambda: make_env(env_name, data_variant, data_hash_modes[0], next(task_indexes) % num_tasks),
+                repeat,
+            ),
+        )
+    )
+    # every reset rolls back the mutations of a ground truth episode
+    task_indexes = iter(range(repeat))
+    results.append(
+        summarize(
+            "Env.reset",
+            measure(
+                lambda: env.reset(task_index=next(task_indexes) % num_tasks),
+                repeat,
+                setup=lambda: replay_ground_truth(env),
+            ),
+        )
+    )
+    for data_hash_mode in data_hash_modes:
+        env = make_env(env_name, data_variant, data_hash_mode)
+        env.preload()
+        task_indexes = iter(range(repeat))
+        results.append(
+            summarize(
+                "Env.get_data_hash",
+                measure(
+                    env.get_data_hash,
+                    repeat,
+                    setup=lambda: (env.reset(task_index=next(task_indexes) % num_tasks), replay_ground_truth(env)),
+                ),
+                data_hash_mode=data_hash_mode,
+            )
+        )
+        latencies = []
+        for task_index in range(num_tasks):
+            env.reset(task_index=task_index)
+            replay_ground_truth(env)
+            latencies.extend(measure(env.calculate_reward, 1))
+        results.append(
+            summarize(
+                "Env.calculate_reward",
+                latencies,
+                data_hash_mode=data_hash_mode,
+                gt_cache=gt_cache.USE_CACHE,
+            )
+        )
+    return results
+
+
+def bench_tools(
+    env_name: str, data_variant: Optional[str], repeat: int
+) -> List[Dict[str, Any]]:
+    """Latencies of `invoke` per tool, each call made on freshly reset data."""
+    env = make_env(env_name, data_variant, DataHashMode.FULL.value)
+    calls_by_tool: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+    sources = [
+        ("ground_truth", ground_truth_tool_calls(env)),
+        ("historical", historical_tool_calls(env_name, env)),
+    ]
+    for source, calls in sources:
+        for name, kwargs in calls:
+            calls_by_tool.setdefault(name, []).append((source, kwargs))
+    results = []
+    for name, calls in sorted(calls_by_tool.items()):
+        tool = env.tools_map[name]
+        latencies = []
+        for i in range(max(repeat, len(calls))):
+            _, kwargs = calls[i % len(calls)]
+            env.reset_data()
+            start = time.perf_counter()
+            try:
+                tool.invoke(data=env.data, **kwargs)
+            except Exception:
+                # the environment turns these into error observations, they are timed all the same
+                pass
+            latencies.append(time.perf_counter() - start)
+        results.append(
+            summarize(
+                f"{name}.invoke",
+                latencies,
+                samples={
+                    source: sum(1 for s, _ in calls if s == source) for source, _ in sources
+                },
+            )
+        )
+    return results
+
+
+def peak_rss_kb() -> int:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_benchmarks(
+    env_name: str, scale: int, data_hash_modes: List[str], repeat: int
+) -> Dict[str, Any]:
+    data_variant = None if scale == 1 else f"scaled-{scale}"
+    start = time.perf_counter()
+    cases = bench_lifecycle(env_name, data_variant, data_hash_modes, repeat)
+    cases.extend(bench_tools(env_name, data_variant, repeat))
+    return {
+        "env": env_name,
+        "scale": scale,
+        "data_variant": data_variant,
+        "seconds": time.perf_counter() - start,
+        "peak_rss_kb": peak_rss_kb(),
+        "cases": cases,
+    }
+
+
+def run_in_subprocess(
+    env_name: str, scale: int, data_hash_modes: List[str], repeat: int, use_gt_cache: bool
+) -> Dict[str, Any]:
+    # a fresh process per scale factor, so the peak memory of each is measured on its own
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.env_lifecycle",
+        "--child",
+        env_name,
+        str(scale),
+        "--repeat",
+        str(repeat),
+        "--data-hash-mode",
+        *data_hash_modes,
+    ]
+    if use_gt_cache:
+        command.append("--gt-cache")
+    output = subprocess.check_output(command, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode("utf-8").strip()
+
+
+def case_key(run: Dict[str, Any], case: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (run["env"], run["scale"], case["name"], case.get("data_hash_mode"))
+
+
+def print_run(run: Dict[str, Any], baseline: Optional[Dict[Tuple[Any, ...], Dict[str, Any]]]) -> None:
+    print(
+        f"{run['env']} x{run['scale']}: {run['seconds']:.1f} s, "
+        f"peak rss {run['peak_rss_kb'] / 1024:.1f} MB"
+    )
+    for case in run["cases"]:
+        name = case["name"]
+        if case.get("data_hash_mode") is not None:
+            name = f"{name}[{case['data_hash_mode']}]"
+        line = (
+            f"  {name:<48} {case['ops_per_sec'] or 0:12.1f} ops/s  "
+            f"p50 {case['p50_ms']:9.3f} ms  p99 {case['p99_ms']:9.3f} ms"
+        )
+        if baseline is not None and case_key(run, case) in baseline:
+            baseline_p50 = baseline[case_key(run, case)]["p50_ms"]
+            if baseline_p50 > 0:
+                line += f"  p50 x{case['p50_ms'] / baseline_p50:.2f} vs baseline"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time data loading, environment lifecycle, rewards and tools without any LLM"
+    )
+    parser.add_argument(
+        "--env",
+        type=str,
+        nargs="+",
+        choices=list(DOMAIN_DATA_MODULES),
+        default=list(DOMAIN_DATA_MODULES),
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Scale factors of the data, e.g. 1 10 100 (see tau_bench.envs.scale_up)",
+    )
+    parser.add_argument(
+        "--data-hash-mode",
+        type=str,
+        nargs="+",
+        choices=[item.value for item in DataHashMode],
+        default=[item.value for item in DataHashMode],
+    )
+    parser.add_argument("--repeat", type=int, default=50, help="Timed calls per case")
+    parser.add_argument(
+        "--gt-cache",
+        action="store_true",
+        help="Look the ground truth hashes up in the persistent cache instead of replaying the ground truth at every reward",
+    )
+    parser.add_argument("--output-path", type=str, help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", type=str, help="JSON results of another commit to compare with")
+    parser.add_argument("--child", type=str, nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        if not args.gt_cache:
+            gt_cache.disable_cache()
+        env_name, scale = args.child
+        print(json.dumps(run_benchmarks(env_name, int(scale), args.data_hash_mode, args.repeat)))
+        return
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = {
+                case_key(run, case): case for run in json.load(f)["runs"] for case in run["cases"]
+            }
+    runs = []
+    for env_name in args.env:
+        for scale in args.scale:
+            run = run_in_subprocess(env_name, scale, args.data_hash_mode, args.repeat, args.gt_cache)
+            runs.append(run)
+            print_run(run, baseline)
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "python": sys.version.split()[0],
+                    "repeat": args.repeat,
+                    "runs": runs,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
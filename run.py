@@ -1,11 +1,12 @@
 # Copyright Sierra
 
 import argparse
-from tau_bench.types import RunConfig
+from tau_bench.types import MOCK_PROVIDER, RunConfig
 from tau_bench.agents.tool_calling_agent import *
 from tau_bench.run import run
 from litellm import provider_list
 from tau_bench.envs.user import UserStrategy
+from tau_bench.envs.base import DataHashMode
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,7 +27,7 @@ def parse_args() -> RunConfig:
     parser.add_argument(
         "--model-provider",
         type=str,
-        choices=provider_list,
+        choices=provider_list + [MOCK_PROVIDER],
         help="The model provider for the agent",
     )
     parser.add_argument(
@@ -38,7 +39,7 @@ def parse_args() -> RunConfig:
     parser.add_argument(
         "--user-model-provider",
         type=str,
-        choices=provider_list,
+        choices=provider_list + [MOCK_PROVIDER],
         help="The model provider for the user simulator",
     )
     parser.add_argument(
@@ -70,10 +71,103 @@ def parse_args() -> RunConfig:
         default=1,
         help="Number of tasks to run in parallel",
     )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Adapt the number of tasks in flight to the LLM latency and rate limit errors (AIMD), with --max-concurrency as the upper bound",
+    )
+    parser.add_argument(
+        "--min-concurrency",
+        type=int,
+        default=1,
+        help="Lower bound of the adaptive concurrency limit",
+    )
+    parser.add_argument(
+        "--executor",
+        type=str,
+        default="thread",
+        choices=["thread", "process", "asyncio"],
+        help="Run the tasks in threads of this process, in forked worker processes that each run a pool of threads, or as coroutines on one event loop with async LLM calls",
+    )
+    parser.add_argument(
+        "--num-processes",
+        type=int,
+        help="Number of worker processes for the process executor (defaults to the number of CPUs). --max-concurrency is split across them",
+    )
+    parser.add_argument(
+        "--resume-from",
+        type=str,
+        help="Path to the checkpoint (.json or .jsonl) of an interrupted run with the same settings. Only the missing or failed-with-error episodes are run",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=str,
+        action="append",
+        default=[],
+        dest="rate_limits",
+        metavar="PROVIDER:MODEL=RPM:TPM",
+        help="Requests and tokens per minute allowed for a model, shared by the agent and the user simulator, e.g. openai:gpt-4o=500:30000. MODEL may be '*' and either budget may be empty. Can be repeated",
+    )
+    parser.add_argument(
+        "--results-db",
+        type=str,
+        help="Also store the episodes in this SQLite database, which can be queried across runs with `python -m tau_bench.result_store`",
+    )
+    parser.add_argument(
+        "--dedup-results",
+        action="store_true",
+        help="Store the large strings of the trajectories (e.g. the system prompt) once per results file, referenced by hash",
+    )
+    parser.add_argument(
+        "--columnar-search",
+        action="store_true",
+        help="Filter flights in the airline search tools with vectorized NumPy operations on a columnar copy of the flights",
+    )
+    parser.add_argument(
+        "--metrics-path",
+        type=str,
+        help="Write live run metrics to this file in the Prometheus text format (e.g. for node_exporter's textfile collector)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve live run metrics in the Prometheus text format on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between updates of the live run metrics",
+    )
     parser.add_argument("--seed", type=int, default=10)
     parser.add_argument("--shuffle", type=int, default=0)
+    parser.add_argument(
+        "--schedule",
+        type=str,
+        default="trial-major",
+        choices=["trial-major", "interleaved", "longest-first", "shuffled"],
+        help="Order in which the episodes of all trials are submitted to the shared pool of workers",
+    )
     parser.add_argument("--user-strategy", type=str, default="llm", choices=[item.value for item in UserStrategy])
     parser.add_argument("--few-shot-displays-path", type=str, help="Path to a jsonlines file containing few shot displays")
+    parser.add_argument(
+        "--data-hash-mode",
+        type=str,
+        default="full",
+        choices=[item.value for item in DataHashMode],
+        help="How the database is hashed for the reward: 'full' hashes the whole database, 'merkle' only rehashes the records touched by the episode",
+    )
+    parser.add_argument(
+        "--mock-latency",
+        type=str,
+        default="0",
+        help=f"Artificial latency of the {MOCK_PROVIDER} provider in milliseconds: 0, fixed:MS, uniform:MIN_MS:MAX_MS, exponential:MEAN_MS, normal:MEAN_MS:STDDEV_MS or lognormal:MEDIAN_MS:SIGMA",
+    )
+    parser.add_argument(
+        "--data-variant",
+        type=str,
+        help="Run on another version of the database: scaled-<factor>[-<seed>] for a synthetic copy scaled up by factor (e.g. scaled-100), or a folder with the domain's JSON files (see python -m tau_bench.envs.scale_up)",
+    )
     args = parser.parse_args()
     print(args)
     return RunConfig(
@@ -95,6 +189,22 @@ def parse_args() -> RunConfig:
         shuffle=args.shuffle,
         user_strategy=args.user_strategy,
         few_shot_displays_path=args.few_shot_displays_path,
+        data_hash_mode=args.data_hash_mode,
+        data_variant=args.data_variant,
+        mock_latency=args.mock_latency,
+        executor=args.executor,
+        num_processes=args.num_processes,
+        resume_from=args.resume_from,
+        schedule=args.schedule,
+        rate_limits=args.rate_limits,
+        adaptive_concurrency=args.adaptive_concurrency,
+        min_concurrency=args.min_concurrency,
+        metrics_path=args.metrics_path,
+        metrics_port=args.metrics_port,
+        metrics_interval=args.metrics_interval,
+        results_db=args.results_db,
+        dedup_results=args.dedup_results,
+        columnar_search=args.columnar_search,
     )
 
 
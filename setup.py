@@ -7,7 +7,7 @@ setup(
     version="0.1.0",
     description="The Tau-Bench package",
     long_description=open("README.md").read(),
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     include_package_data=True,
     install_requires=[
         "openai>=1.13.3",
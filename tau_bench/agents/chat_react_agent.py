@@ -1,7 +1,7 @@
 # Copyright Sierra
 
 import json
-from litellm import completion
+from tau_bench.rate_limit import acompletion, completion
 
 from tau_bench.agents.base import Agent
 from tau_bench.envs.base import Env
@@ -43,6 +43,20 @@ class ChatReActAgent(Agent):
             messages=messages,
             temperature=self.temperature,
         )
+        return self._parse_response(res)
+
+    async def generate_next_step_async(
+        self, messages: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Action, float]:
+        res = await acompletion(
+            model=self.model,
+            custom_llm_provider=self.provider,
+            messages=messages,
+            temperature=self.temperature,
+        )
+        return self._parse_response(res)
+
+    def _parse_response(self, res: Any) -> Tuple[Dict[str, Any], Action, float]:
         message = res.choices[0].message
         action_str = message.content.split("Action:")[-1].strip()
         try:
@@ -92,6 +106,40 @@ class ChatReActAgent(Agent):
             info=info,
         )
 
+    async def solve_async(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        response = await env.reset_async(task_index=task_index)
+        reward = 0.0
+        messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": self.prompt},
+            {"role": "user", "content": response.observation},
+        ]
+        total_cost = 0.0
+        info = {}
+        for _ in range(max_num_steps):
+            message, action, cost = await self.generate_next_step_async(messages)
+            response = await env.step_async(action)
+            obs = response.observation
+            reward = response.reward
+            info = {**info, **response.info.model_dump()}
+            if action.name != RESPOND_ACTION_NAME:
+                obs = "API output: " + obs
+            messages.extend(
+                [
+                    message,
+                    {"role": "user", "content": obs},
+                ]
+            )
+            total_cost += cost
+            if response.done:
+                break
+        return SolveResult(
+            messages=messages,
+            reward=reward,
+            info=info,
+        )
+
 
 REACT_INSTRUCTION = f"""
 # Instruction
@@ -2,10 +2,11 @@
 
 import json
 import random
-from litellm import completion
+from tau_bench.rate_limit import acompletion, completion
 from typing import List, Optional, Dict, Any
 
 from tau_bench.agents.base import Agent
+from tau_bench.agents.tool_calling_agent import append_step_messages
 from tau_bench.envs.base import Env
 from tau_bench.types import SolveResult, Action, RESPOND_ACTION_NAME
 
@@ -60,26 +61,45 @@ class FewShotToolCallingAgent(Agent):
             env_response = env.step(action)
             reward = env_response.reward
             info = {**info, **env_response.info.model_dump()}
-            if action.name != RESPOND_ACTION_NAME:
-                next_message["tool_calls"] = next_message["tool_calls"][:1]
-                messages.extend(
-                    [
-                        next_message,
-                        {
-                            "role": "tool",
-                            "tool_call_id": next_message["tool_calls"][0]["id"],
-                            "name": next_message["tool_calls"][0]["function"]["name"],
-                            "content": env_response.observation,
-                        },
-                    ]
-                )
-            else:
-                messages.extend(
-                    [
-                        next_message,
-                        {"role": "user", "content": env_response.observation},
-                    ]
-                )
+            append_step_messages(messages, next_message, action, env_response.observation)
+            if env_response.done:
+                break
+        return SolveResult(
+            reward=reward,
+            info=info,
+            messages=messages,
+            total_cost=total_cost,
+        )
+
+    async def solve_async(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        sampled_few_shot_displays = random.sample(self.few_shot_displays, self.num_few_shots)
+        few_shots = "\n\n".join([f"Example {i+1}:\n{display}" for i, display in enumerate(sampled_few_shot_displays)])
+        total_cost = 0.0
+        env_reset_res = await env.reset_async(task_index=task_index)
+        obs = env_reset_res.observation
+        info = env_reset_res.info.model_dump()
+        reward = 0.0
+        messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": f"{self.wiki}\n\n{few_shots}"},
+            {"role": "user", "content": obs},
+        ]
+        for _ in range(max_num_steps):
+            res = await acompletion(
+                messages=messages,
+                model=self.model,
+                custom_llm_provider=self.provider,
+                tools=self.tools_info,
+                temperature=self.temperature,
+            )
+            next_message = res.choices[0].message.model_dump()
+            total_cost += res._hidden_params["response_cost"]
+            action = message_to_action(next_message)
+            env_response = await env.step_async(action)
+            reward = env_response.reward
+            info = {**info, **env_response.info.model_dump()}
+            append_step_messages(messages, next_message, action, env_response.observation)
             if env_response.done:
                 break
         return SolveResult(
@@ -1,7 +1,7 @@
 # Copyright Sierra
 
 import json
-from litellm import completion
+from tau_bench.rate_limit import acompletion, completion
 from typing import List, Optional, Dict, Any
 
 from tau_bench.agents.base import Agent
@@ -50,26 +50,7 @@ class ToolCallingAgent(Agent):
             env_response = env.step(action)
             reward = env_response.reward
             info = {**info, **env_response.info.model_dump()}
-            if action.name != RESPOND_ACTION_NAME:
-                next_message["tool_calls"] = next_message["tool_calls"][:1]
-                messages.extend(
-                    [
-                        next_message,
-                        {
-                            "role": "tool",
-                            "tool_call_id": next_message["tool_calls"][0]["id"],
-                            "name": next_message["tool_calls"][0]["function"]["name"],
-                            "content": env_response.observation,
-                        },
-                    ]
-                )
-            else:
-                messages.extend(
-                    [
-                        next_message,
-                        {"role": "user", "content": env_response.observation},
-                    ]
-                )
+            append_step_messages(messages, next_message, action, env_response.observation)
             if env_response.done:
                 break
         return SolveResult(
@@ -79,6 +60,70 @@ class ToolCallingAgent(Agent):
             total_cost=total_cost,
         )
 
+    async def solve_async(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        total_cost = 0.0
+        env_reset_res = await env.reset_async(task_index=task_index)
+        obs = env_reset_res.observation
+        info = env_reset_res.info.model_dump()
+        reward = 0.0
+        messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": self.wiki},
+            {"role": "user", "content": obs},
+        ]
+        for _ in range(max_num_steps):
+            res = await acompletion(
+                messages=messages,
+                model=self.model,
+                custom_llm_provider=self.provider,
+                tools=self.tools_info,
+                temperature=self.temperature,
+            )
+            next_message = res.choices[0].message.model_dump()
+            total_cost += res._hidden_params["response_cost"]
+            action = message_to_action(next_message)
+            env_response = await env.step_async(action)
+            reward = env_response.reward
+            info = {**info, **env_response.info.model_dump()}
+            append_step_messages(messages, next_message, action, env_response.observation)
+            if env_response.done:
+                break
+        return SolveResult(
+            reward=reward,
+            info=info,
+            messages=messages,
+            total_cost=total_cost,
+        )
+
+
+def append_step_messages(
+    messages: List[Dict[str, Any]],
+    next_message: Dict[str, Any],
+    action: Action,
+    observation: str,
+) -> None:
+    if action.name != RESPOND_ACTION_NAME:
+        next_message["tool_calls"] = next_message["tool_calls"][:1]
+        messages.extend(
+            [
+                next_message,
+                {
+                    "role": "tool",
+                    "tool_call_id": next_message["tool_calls"][0]["id"],
+                    "name": next_message["tool_calls"][0]["function"]["name"],
+                    "content": observation,
+                },
+            ]
+        )
+    else:
+        messages.extend(
+            [
+                next_message,
+                {"role": "user", "content": observation},
+            ]
+        )
+
 
 def message_to_action(
     message: Dict[str, Any],
@@ -0,0 +1,109 @@
+# Copyright Sierra
+
+import hashlib
+from typing import Any, Dict, List, Optional, Set
+
+# a deduplicated string is replaced by {BLOB_REF_KEY: <sha256 of the string>}
+BLOB_REF_KEY = "$blob"
+# shorter strings cost less to repeat than to reference
+DEFAULT_MIN_BLOB_LENGTH = 256
+DEDUP_FORMAT = "tau-bench-dedup-v1"
+
+
+def blob_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def is_blob_ref(item: Any) -> bool:
+    return isinstance(item, dict) and len(item) == 1 and BLOB_REF_KEY in item
+
+
+def blob_refs(item: Any) -> Set[str]:
+    """The hashes of the blobs referenced anywhere in `item`."""
+    refs: Set[str] = set()
+    stack = [item]
+    while len(stack) > 0:
+        item = stack.pop()
+        if is_blob_ref(item):
+            refs.add(item[BLOB_REF_KEY])
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return refs
+
+
+class BlobTable(object):
+    """Content-addressed strings shared by the trajectories of many results.
+
+    The system prompt is repeated at the start of every trajectory, and so are the
+    observations of tools that return the same large payload (e.g. `list_all_airports`).
+    `dedup` replaces every string of at least `min_length` characters by a reference
+    to its hash, and `rehydrate` puts the strings back.
+    """
+
+    def __init__(
+        self,
+        blobs: Optional[Dict[str, str]] = None,
+        min_length: int = DEFAULT_MIN_BLOB_LENGTH,
+    ) -> None:
+        self.blobs: Dict[str, str] = dict(blobs or {})
+        self.min_length = min_length
+
+    def add(self, content: str) -> str:
+        key = blob_hash(content)
+        self.blobs.setdefault(key, content)
+        return key
+
+    def dedup(self, item: Any) -> Any:
+        if isinstance(item, str):
+            if len(item) < self.min_length:
+                return item
+            return {BLOB_REF_KEY: self.add(item)}
+        if isinstance(item, dict):
+            return {key: self.dedup(value) for key, value in item.items()}
+        if isinstance(item, list):
+            return [self.dedup(value) for value in item]
+        return item
+
+    def rehydrate(self, item: Any) -> Any:
+        if is_blob_ref(item):
+            key = item[BLOB_REF_KEY]
+            if key not in self.blobs:
+                raise KeyError(f"Missing blob {key}")
+            return self.blobs[key]
+        if isinstance(item, dict):
+            return {key: self.rehydrate(value) for key, value in item.items()}
+        if isinstance(item, list):
+            return [self.rehydrate(value) for value in item]
+        return item
+
+
+def dedup_result(result: Dict[str, Any], blob_table: BlobTable) -> Dict[str, Any]:
+    # only the trajectory is deduplicated, the other fields stay readable as they are
+    return {**result, "traj": blob_table.dedup(result["traj"])}
+
+
+def rehydrate_result(result: Dict[str, Any], blob_table: BlobTable) -> Dict[str, Any]:
+    return {**result, "traj": blob_table.rehydrate(result["traj"])}
+
+
+def dedup_results(
+    results: List[Dict[str, Any]], min_length: int = DEFAULT_MIN_BLOB_LENGTH
+) -> Dict[str, Any]:
+    """The deduplicated JSON results layout: `{"format", "blobs", "results"}`."""
+    blob_table = BlobTable(min_length=min_length)
+    deduped = [dedup_result(result, blob_table) for result in results]
+    return {"format": DEDUP_FORMAT, "blobs": blob_table.blobs, "results": deduped}
+
+
+def is_deduped(data: Any) -> bool:
+    return isinstance(data, dict) and data.get("format") == DEDUP_FORMAT
+
+
+def rehydrate_results(data: Any) -> List[Dict[str, Any]]:
+    """The results of either JSON results layout, with the blobs put back."""
+    if not is_deduped(data):
+        return data
+    blob_table = BlobTable(data["blobs"])
+    return [rehydrate_result(result, blob_table) for result in data["results"]]
@@ -0,0 +1,161 @@
+# Copyright Sierra
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from tau_bench.blobs import (
+    BLOB_REF_KEY,
+    BlobTable,
+    blob_refs,
+    dedup_result,
+    dedup_results,
+    rehydrate_result,
+    rehydrate_results,
+)
+from tau_bench.types import EnvRunResult
+
+DEFAULT_FSYNC_INTERVAL = 5.0
+
+
+def jsonl_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".jsonl"
+
+
+class CheckpointWriter(object):
+    """Appends finished results to a JSON lines checkpoint from a background thread.
+
+    `write` only enqueues the result, so callers never wait on disk I/O. The file is
+    flushed after every line and fsynced at most every `fsync_interval` seconds.
+
+    With `dedup`, the large strings of the trajectories are written once, as
+    `{"$blob": <hash>, "content": <string>}` lines preceding the first result that
+    references them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+        dedup: bool = False,
+    ) -> None:
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.dedup = dedup
+        self._blob_table = BlobTable()
+        self._written_blobs: Set[str] = set()
+        self._queue: queue.Queue[Optional[Dict[str, Any]]] = queue.Queue()
+        self._file = open(path, "a")
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, result: EnvRunResult) -> None:
+        self._queue.put(result.model_dump())
+
+    def _write_loop(self) -> None:
+        last_fsync = time.monotonic()
+        closed = False
+        while not closed:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+                if item is None:
+                    closed = True
+                else:
+                    self._file.write(self._format(item))
+                    self._file.flush()
+            except queue.Empty:
+                pass
+            if closed or time.monotonic() - last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                last_fsync = time.monotonic()
+
+    def _format(self, item: Dict[str, Any]) -> str:
+        if not self.dedup:
+            return json.dumps(item) + "\n"
+        item = dedup_result(item, self._blob_table)
+        lines = []
+        for key in sorted(blob_refs(item) - self._written_blobs):
+            self._written_blobs.add(key)
+            lines.append(
+                json.dumps({BLOB_REF_KEY: key, "content": self._blob_table.blobs[key]}) + "\n"
+            )
+        lines.append(json.dumps(item) + "\n")
+        # the blobs and the result go out in one write, so a truncated line never loses a blob
+        return "".join(lines)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+def load_checkpoint(path: str) -> List[Dict[str, Any]]:
+    """Reads the results of a checkpoint, either in the JSON lines or in the consolidated JSON layout.
+
+    Deduplicated checkpoints are rehydrated, so callers always get complete trajectories.
+    """
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            # the last line may be truncated if the run was killed while writing it
+            blob_table = BlobTable()
+            results = []
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if BLOB_REF_KEY in item:
+                    blob_table.blobs[item[BLOB_REF_KEY]] = item["content"]
+                elif len(blob_table.blobs) > 0:
+                    results.append(rehydrate_result(item, blob_table))
+                else:
+                    results.append(item)
+            return results
+        return rehydrate_results(json.load(f))
+
+
+def write_results(
+    results: List[Dict[str, Any]], json_path: str, dedup: bool = False
+) -> None:
+    """Writes results in the consolidated JSON layout, deduplicated or as a plain list."""
+    with open(json_path, "w") as f:
+        if dedup:
+            # the blobs are what makes the file large, indenting them would not help readability
+            json.dump(dedup_results(results), f)
+        else:
+            json.dump(results, f, indent=2)
+
+
+def consolidate_checkpoint(
+    jsonl_path: str, json_path: str, dedup: bool = False
+) -> List[Dict[str, Any]]:
+    results = load_checkpoint(jsonl_path)
+    write_results(results, json_path, dedup=dedup)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Consolidate a JSON lines checkpoint (e.g. of an interrupted run) into the JSON results layout"
+    )
+    parser.add_argument("jsonl_path", type=str)
+    parser.add_argument(
+        "--output-path", type=str, help="Defaults to the checkpoint path with a .json extension"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store the large strings of the trajectories once, referenced by hash",
+    )
+    args = parser.parse_args()
+    output_path = args.output_path or os.path.splitext(args.jsonl_path)[0] + ".json"
+    results = consolidate_checkpoint(args.jsonl_path, output_path, dedup=args.dedup)
+    print(f"📄 Consolidated {len(results)} results into {output_path}")
+
+
+if __name__ == "__main__":
+    main()
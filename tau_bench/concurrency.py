@@ -0,0 +1,190 @@
+# Copyright Sierra
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+DEFAULT_WINDOW_SIZE = 10
+DEFAULT_DECREASE_FACTOR = 0.5
+DEFAULT_LATENCY_TOLERANCE = 1.5
+DEFAULT_BASELINE_WINDOWS = 20
+MAX_RECENT_DECISIONS = 50
+
+
+class ConcurrencyDecision(BaseModel):
+    time: float
+    old_limit: int
+    new_limit: int
+    reason: str
+    p95_latency: Optional[float] = None
+    num_rate_limit_errors: int = 0
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class AdaptiveConcurrencyController(object):
+    """Bounds the number of in-flight episodes with an AIMD (additive increase, multiplicative decrease) limit.
+
+    The LLM calls of the episodes are fed back through `record_call`. After every
+    window of calls the limit is raised by one if no call was rate limited and the
+    p95 latency of the window stayed within `latency_tolerance` times the best p95 of
+    the last `baseline_windows` windows, and multiplied by `decrease_factor` otherwise.
+    The baseline thus follows the provider's latency when it drifts up for good,
+    instead of keeping the limit down for the rest of the run.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        decrease_factor: float = DEFAULT_DECREASE_FACTOR,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        baseline_windows: int = DEFAULT_BASELINE_WINDOWS,
+        verbose: bool = True,
+    ) -> None:
+        assert 1 <= min_limit <= max_limit, "Invalid concurrency bounds"
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        if initial_limit is None:
+            initial_limit = max(min_limit, max_limit // 4)
+        self.limit = min(max(initial_limit, min_limit), max_limit)
+        self.window_size = window_size
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.verbose = verbose
+        self.in_flight = 0
+        self.baseline_p95_latency: Optional[float] = None
+        self._recent_p95_latencies: Deque[float] = deque(maxlen=baseline_windows)
+        self.decisions: Deque[ConcurrencyDecision] = deque(maxlen=MAX_RECENT_DECISIONS)
+        self._latencies: List[float] = []
+        self._num_rate_limit_errors = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        # the coroutines waiting for a slot, woken through their own loop since the
+        # limit also changes from other threads
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1].wait()
+            finally:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def _notify_all(self) -> None:
+        # called with the condition held
+        self._condition.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+        self._async_waiters = []
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        await self.acquire_async()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_call(self, latency: float, rate_limited: bool = False) -> None:
+        with self._condition:
+            if time.monotonic() - latency < self._last_decrease or self.in_flight > self.limit:
+                # episodes admitted under a higher limit are still draining, so the call
+                # says nothing about the current limit
+                return
+            if rate_limited:
+                self._num_rate_limit_errors += 1
+            else:
+                self._latencies.append(latency)
+            if len(self._latencies) + self._num_rate_limit_errors >= self.window_size:
+                self._decide()
+                self._notify_all()
+
+    def _decide(self) -> None:
+        p95_latency = percentile(self._latencies, 0.95) if self._latencies else None
+        old_limit = self.limit
+        if self._num_rate_limit_errors > 0:
+            reason = "rate limited"
+            self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        elif (
+            self.baseline_p95_latency is not None
+            and p95_latency > self.baseline_p95_latency * self.latency_tolerance
+        ):
+            reason = "latency increased"
+            self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        else:
+            reason = "healthy"
+            self.limit = min(self.max_limit, self.limit + 1)
+        if p95_latency is not None:
+            self._recent_p95_latencies.append(p95_latency)
+            self.baseline_p95_latency = min(self._recent_p95_latencies)
+        decision = ConcurrencyDecision(
+            time=time.time(),
+            old_limit=old_limit,
+            new_limit=self.limit,
+            reason=reason,
+            p95_latency=p95_latency,
+            num_rate_limit_errors=self._num_rate_limit_errors,
+        )
+        self.decisions.append(decision)
+        if self.limit < old_limit:
+            self._last_decrease = time.monotonic()
+        self._latencies = []
+        self._num_rate_limit_errors = 0
+        if self.verbose and decision.new_limit != decision.old_limit:
+            print(f"⚙️  Concurrency limit {old_limit} -> {self.limit} ({reason})")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self.in_flight,
+                "baseline_p95_latency": self.baseline_p95_latency,
+                "recent_decisions": [decision.model_dump() for decision in self.decisions],
+            }
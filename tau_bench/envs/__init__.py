@@ -1,7 +1,7 @@
 # Copyright Sierra
 
 from typing import Optional, Union
-from tau_bench.envs.base import Env
+from tau_bench.envs.base import DataHashMode, Env
 from tau_bench.envs.user import UserStrategy
 
 
@@ -12,6 +12,8 @@ def get_env(
     task_split: str,
     user_provider: Optional[str] = None,
     task_index: Optional[int] = None,
+    data_hash_mode: Union[str, DataHashMode] = DataHashMode.FULL,
+    data_variant: Optional[str] = None,
 ) -> Env:
     if env_name == "retail":
         from tau_bench.envs.retail import MockRetailDomainEnv
@@ -22,6 +24,8 @@ def get_env(
             task_split=task_split,
             user_provider=user_provider,
             task_index=task_index,
+            data_hash_mode=data_hash_mode,
+            data_variant=data_variant,
         )
     elif env_name == "airline":
         from tau_bench.envs.airline import MockAirlineDomainEnv
@@ -32,6 +36,8 @@ def get_env(
             task_split=task_split,
             user_provider=user_provider,
             task_index=task_index,
+            data_hash_mode=data_hash_mode,
+            data_variant=data_variant,
         )
     else:
         raise ValueError(f"Unknown environment: {env_name}")
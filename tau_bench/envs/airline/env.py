@@ -1,10 +1,10 @@
 # Copyright Sierra
 
-from tau_bench.envs.airline.data import load_data
 from tau_bench.envs.airline.rules import RULES
 from tau_bench.envs.airline.tools import ALL_TOOLS
 from tau_bench.envs.airline.wiki import WIKI
-from tau_bench.envs.base import Env
+from tau_bench.envs.base import DataHashMode, Env
+from tau_bench.envs.data_variants import get_data_load_func
 from typing import Optional, Union
 from tau_bench.envs.user import UserStrategy
 
@@ -17,6 +17,8 @@ class MockAirlineDomainEnv(Env):
         user_provider: Optional[str] = None,
         task_split: str = "test",
         task_index: Optional[int] = None,
+        data_hash_mode: Union[str, DataHashMode] = DataHashMode.FULL,
+        data_variant: Optional[str] = None,
     ):
         match task_split:
             case "test":
@@ -26,7 +28,7 @@ class MockAirlineDomainEnv(Env):
             case _:
                 raise ValueError(f"Unknown task split: {task_split}")
         super().__init__(
-            data_load_func=load_data,
+            data_load_func=get_data_load_func("airline", data_variant),
             tools=ALL_TOOLS,
             tasks=tasks,
             wiki=WIKI,
@@ -35,5 +37,6 @@ class MockAirlineDomainEnv(Env):
             user_model=user_model,
             user_provider=user_provider,
             task_index=task_index,
+            data_hash_mode=data_hash_mode,
         )
         self.terminate_tools = ["transfer_to_human_agents"]
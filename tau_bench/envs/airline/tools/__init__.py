@@ -8,6 +8,7 @@ from .get_user_details import GetUserDetails
 from .list_all_airports import ListAllAirports
 from .search_direct_flight import SearchDirectFlight
 from .search_onestop_flight import SearchOnestopFlight
+from .search_multistop_flight import SearchMultistopFlight
 from .sort_flights import SortFlights
 from .send_certificate import SendCertificate
 from .think import Think
@@ -16,6 +17,7 @@ from .update_reservation_baggages import UpdateReservationBaggages
 from .update_reservation_flights import UpdateReservationFlights
 from .update_reservation_passengers import UpdateReservationPassengers
 
+# SearchMultistopFlight is an opt-in variant and is left out of the benchmark's tool set
 ALL_TOOLS = [
     BookReservation,
     Calculate,
@@ -0,0 +1,224 @@
+# Copyright Sierra
+
+import bisect
+import threading
+from datetime import date as Date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from tau_bench.envs.airline.tools.sort_flights import (
+    SortAttribute,
+    get_sort_value,
+    sort_flights,
+)
+from tau_bench.envs.snapshot import TrackedTable
+
+NEXT_DAY_SUFFIX = "+1"
+# the fields of a flight that the edges of the graph depend on
+SCHEDULE_FIELDS = [
+    "origin",
+    "destination",
+    "scheduled_departure_time_est",
+    "scheduled_arrival_time_est",
+]
+# sort attributes whose value for an itinerary is the sum of its segments' values, so a
+# partial itinerary can be discarded as soon as it is worse than the current top k
+ADDITIVE_SORT_ATTRIBUTES = [
+    SortAttribute.PRICE,
+    SortAttribute.PRICE_BASIC_ECONOMY,
+    SortAttribute.PRICE_ECONOMY,
+    SortAttribute.PRICE_BUSINESS,
+]
+
+Segment = Tuple[str, str]  # (flight number, date)
+
+
+def next_date(date: str) -> str:
+    return (Date.fromisoformat(date) + timedelta(days=1)).isoformat()
+
+
+def is_valid_layover(flight1: Dict[str, Any], flight2: Dict[str, Any]) -> bool:
+    """Whether flight2 can be taken after flight1, on the day flight1 lands."""
+    arrival = flight1["scheduled_arrival_time_est"].replace(NEXT_DAY_SUFFIX, "")
+    return (
+        flight1["destination"] == flight2["origin"]
+        and arrival <= flight2["scheduled_departure_time_est"]
+    )
+
+
+class ConnectionGraph(object):
+    """Flights as nodes, with an edge to every flight that can be connected to on landing.
+
+    The edges only depend on the schedule of the flights, so the graph of the pristine
+    flights is built once per process. Whether a flight is available on a given date is
+    read from the live records at query time.
+    """
+
+    def __init__(self, flights: Dict[str, Any]) -> None:
+        self.flights_by_origin: Dict[str, List[str]] = {}
+        for flight_number, flight in flights.items():
+            self.flights_by_origin.setdefault(flight["origin"], []).append(flight_number)
+        self.connections: Dict[str, List[str]] = {
+            flight_number: [
+                next_flight_number
+                for next_flight_number in self.flights_by_origin.get(flight["destination"], [])
+                if is_valid_layover(flight, flights[next_flight_number])
+            ]
+            for flight_number, flight in flights.items()
+        }
+
+    def iter_itineraries(
+        self,
+        flights: Dict[str, Any],
+        origin: str,
+        destination: str,
+        date: str,
+        max_stops: int,
+        max_cost: Optional[Callable[[], Optional[Any]]] = None,
+        segment_cost: Optional[Callable[[Dict[str, Any], str], Any]] = None,
+    ) -> Iterator[List[Segment]]:
+        """Depth-first search of the itineraries with at most `max_stops` layovers.
+
+        Every segment must be available on its date, and no airport is visited twice.
+        Itineraries are produced with the flights in table order at every depth, so
+        direct flights and one-stop itineraries come out in the order of the original
+        brute-force searches. With `segment_cost`, partial itineraries whose cost
+        reaches `max_cost()` are not extended.
+        """
+        path: List[Segment] = []
+        visited = {origin}
+
+        def is_available(flight_number: str, flight_date: str) -> Optional[Dict[str, Any]]:
+            if not dict.__contains__(flights, flight_number):
+                return None
+            flight = dict.__getitem__(flights, flight_number)
+            flight_dates = flight["dates"]
+            if flight_date in flight_dates and flight_dates[flight_date]["status"] == "available":
+                return flight
+            return None
+
+        def visit(flight_numbers: List[str], flight_date: str, cost: Any) -> Iterator[List[Segment]]:
+            for flight_number in flight_numbers:
+                flight = is_available(flight_number, flight_date)
+                if flight is None or (
+                    flight["destination"] in visited and flight["destination"] != destination
+                ):
+                    continue
+                flight_cost = cost
+                if segment_cost is not None:
+                    flight_cost = cost + segment_cost(flight, flight_date)
+                    bound = max_cost()
+                    if bound is not None and flight_cost >= bound:
+                        continue
+                path.append((flight_number, flight_date))
+                if flight["destination"] == destination:
+                    yield list(path)
+                elif len(path) <= max_stops:
+                    arrival_date = (
+                        next_date(flight_date)
+                        if NEXT_DAY_SUFFIX in flight["scheduled_arrival_time_est"]
+                        else flight_date
+                    )
+                    visited.add(flight["destination"])
+                    yield from visit(self.connections[flight_number], arrival_date, flight_cost)
+                    visited.discard(flight["destination"])
+                path.pop()
+
+        yield from visit(self.flights_by_origin.get(origin, []), date, 0)
+
+
+_graphs: Dict[int, Tuple[Dict[str, Any], ConnectionGraph]] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_connection_graph(flights: Dict[str, Any]) -> ConnectionGraph:
+    """The graph of `flights`, shared with every view of the same snapshot whose schedule is unchanged."""
+    if not isinstance(flights, TrackedTable) or not flights.is_aligned_with_base():
+        return ConnectionGraph(flights)
+    base = flights.base
+    if any(
+        dict.__getitem__(flights, key)[field] != base[key][field]
+        for key in flights.touched_keys
+        for field in SCHEDULE_FIELDS
+    ):
+        return ConnectionGraph(flights)
+    entry = _graphs.get(id(base))
+    if entry is not None:
+        return entry[1]
+    with _graphs_lock:
+        if id(base) not in _graphs:
+            # keeps the snapshot table alive, so its id is never reused while the graph is cached
+            _graphs[id(base)] = (base, ConnectionGraph(base))
+        return _graphs[id(base)][1]
+
+
+def to_segment(flight: Dict[str, Any], flight_date: str) -> Dict[str, Any]:
+    """A flight on a date in the layout of the search tools' results."""
+    segment = {k: v for k, v in flight.items() if k != "dates"}
+    segment.update(flight["dates"][flight_date])
+    segment["date"] = flight_date
+    return segment
+
+
+def to_flight_trip(flights: Dict[str, Any], itinerary: List[Segment]) -> List[Dict[str, Any]]:
+    return [
+        to_segment(dict.__getitem__(flights, flight_number), flight_date)
+        for flight_number, flight_date in itinerary
+    ]
+
+
+def search_itineraries(
+    flights: Dict[str, Any],
+    origin: str,
+    destination: str,
+    date: str,
+    max_stops: int = 1,
+    sort_by: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Itineraries from `origin` to `destination` departing on `date`, with up to `max_stops` layovers.
+
+    Without `sort_by` the itineraries are in search order. With `sort_by` they are
+    ordered like `sort_flights` orders them, and `limit` keeps only the first ones,
+    which for the price attributes also prunes the search.
+    """
+    if limit is not None and limit < 1:
+        return []
+    graph = get_connection_graph(flights)
+    if sort_by is None:
+        itineraries = graph.iter_itineraries(flights, origin, destination, date, max_stops)
+        if limit is not None:
+            itineraries = (itinerary for _, itinerary in zip(range(limit), itineraries))
+        return [to_flight_trip(flights, itinerary) for itinerary in itineraries]
+    sort_by = SortAttribute(sort_by)
+    if limit is None:
+        trips = [
+            to_flight_trip(flights, itinerary)
+            for itinerary in graph.iter_itineraries(flights, origin, destination, date, max_stops)
+        ]
+        return sort_flights(trips, sort_by)
+    # the best `limit` trips so far, sorted by (value, search order), so that among equal
+    # values the trip found first wins, like in a stable sort (the values may be strings)
+    best: List[Tuple[Any, int, List[Dict[str, Any]]]] = []
+
+    def max_cost() -> Optional[Any]:
+        return best[-1][0] if len(best) > 0 and len(best) >= limit else None
+
+    def segment_cost(flight: Dict[str, Any], flight_date: str) -> Any:
+        return get_sort_value(to_segment(flight, flight_date), sort_by)
+
+    itineraries = graph.iter_itineraries(
+        flights,
+        origin,
+        destination,
+        date,
+        max_stops,
+        max_cost=max_cost,
+        segment_cost=segment_cost if sort_by in ADDITIVE_SORT_ATTRIBUTES else None,
+    )
+    for order, itinerary in enumerate(itineraries):
+        trip = to_flight_trip(flights, itinerary)
+        value = get_sort_value(trip, sort_by)
+        if len(best) < limit or value < best[-1][0]:
+            bisect.insort(best, (value, order, trip), key=lambda item: item[:2])
+            del best[limit:]
+    return [trip for _, _, trip in best]
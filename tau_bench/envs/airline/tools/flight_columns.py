@@ -0,0 +1,220 @@
+# Copyright Sierra
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tau_bench.envs.snapshot import TrackedTable
+
+NEXT_DAY_SUFFIX = "+1"
+SECONDS_PER_DAY = 86400
+# status code of the (flight, date) cells the flight does not operate on
+MISSING = -1
+AVAILABLE_STATUS = "available"
+
+_enabled = False
+
+
+def enable_columnar_search() -> None:
+    """Makes the airline search tools filter flights on the columnar store."""
+    global _enabled
+    _enabled = True
+
+
+def disable_columnar_search() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_columnar_search_enabled() -> bool:
+    return _enabled
+
+
+def parse_time(time_str: str) -> int:
+    """Seconds since midnight of "HH:MM:SS", plus a day for a "+1" suffix."""
+    seconds = SECONDS_PER_DAY if NEXT_DAY_SUFFIX in time_str else 0
+    hours, minutes, secs = map(int, time_str.replace(NEXT_DAY_SUFFIX, "").split(":"))
+    return seconds + hours * 3600 + minutes * 60 + secs
+
+
+class FlightColumns(object):
+    """The flights of a snapshot as arrays, with one row per flight in table order.
+
+    The schedule is stored per flight (airport codes, departure and arrival times in
+    seconds) and the status per (flight, date), as a code or MISSING when the flight
+    does not operate that day. Seats and prices are read from the records.
+    """
+
+    def __init__(self, flights: Dict[str, Any]) -> None:
+        self.flight_numbers = list(flights)
+        self.rows = {flight_number: row for row, flight_number in enumerate(self.flight_numbers)}
+        self.airports: Dict[str, int] = {}
+        self.statuses: Dict[str, int] = {}
+        self.dates: Dict[str, int] = {}
+        for flight in flights.values():
+            for airport in [flight["origin"], flight["destination"]]:
+                self.airports.setdefault(airport, len(self.airports))
+            for date, info in flight["dates"].items():
+                self.dates.setdefault(date, len(self.dates))
+                self.statuses.setdefault(info["status"], len(self.statuses))
+        num_flights = len(self.flight_numbers)
+        num_dates = len(self.dates)
+        self.origin = np.empty(num_flights, dtype=np.int32)
+        self.destination = np.empty(num_flights, dtype=np.int32)
+        self.departure_seconds = np.empty(num_flights, dtype=np.int64)
+        self.arrival_seconds = np.empty(num_flights, dtype=np.int64)
+        self.status = np.full((num_flights, num_dates), MISSING, dtype=np.int16)
+        for row, flight in enumerate(flights.values()):
+            self.origin[row] = self.airports[flight["origin"]]
+            self.destination[row] = self.airports[flight["destination"]]
+            self.departure_seconds[row] = parse_time(flight["scheduled_departure_time_est"])
+            self.arrival_seconds[row] = parse_time(flight["scheduled_arrival_time_est"])
+            for date, info in flight["dates"].items():
+                column = self.dates[date]
+                self.status[row, column] = self.statuses[info["status"]]
+
+
+_columns: Dict[int, Tuple[Dict[str, Any], FlightColumns]] = {}
+_columns_lock = threading.Lock()
+
+
+def get_flight_columns(base: Dict[str, Any]) -> FlightColumns:
+    """The columns of a snapshot flights table, built at most once per process."""
+    entry = _columns.get(id(base))
+    if entry is not None:
+        return entry[1]
+    with _columns_lock:
+        if id(base) not in _columns:
+            # keeps the snapshot table alive, so its id is never reused while the columns are cached
+            _columns[id(base)] = (base, FlightColumns(base))
+        return _columns[id(base)][1]
+
+
+class FlightColumnsView(object):
+    """The columns of an episode's flights: the snapshot columns with the touched rows patched.
+
+    The touched records are re-read from the episode's table at every query, so the
+    view stays consistent with the mutations of the tools.
+    """
+
+    def __init__(self, flights: TrackedTable, columns: FlightColumns) -> None:
+        self.flights = flights
+        self.columns = columns
+        self.touched_rows = sorted(columns.rows[key] for key in flights.touched_keys)
+        self.origin = columns.origin
+        self.destination = columns.destination
+        self.departure_seconds = columns.departure_seconds
+        self.arrival_seconds = columns.arrival_seconds
+        # airports that only appear in touched records get codes past the snapshot's
+        self.airports = columns.airports
+        if len(self.touched_rows) > 0:
+            self.airports = dict(columns.airports)
+            self.origin = self.origin.copy()
+            self.destination = self.destination.copy()
+            self.departure_seconds = self.departure_seconds.copy()
+            self.arrival_seconds = self.arrival_seconds.copy()
+            for row in self.touched_rows:
+                flight = self.record(row)
+                for airport in [flight["origin"], flight["destination"]]:
+                    self.airports.setdefault(airport, len(self.airports))
+                self.origin[row] = self.airports[flight["origin"]]
+                self.destination[row] = self.airports[flight["destination"]]
+                self.departure_seconds[row] = parse_time(flight["scheduled_departure_time_est"])
+                self.arrival_seconds[row] = parse_time(flight["scheduled_arrival_time_est"])
+
+    def airport_code(self, airport: str) -> int:
+        # airports that no flight serves match no row
+        return self.airports.get(airport, -1)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        # read without touching the key, the records must only be read
+        return dict.__getitem__(self.flights, self.columns.flight_numbers[row])
+
+    def available_on(self, date: str) -> np.ndarray:
+        """Boolean mask of the flights that operate on `date` with the status "available"."""
+        column = self.columns.dates.get(date)
+        available_code = self.columns.statuses.get(AVAILABLE_STATUS)
+        if column is None or available_code is None:
+            mask = np.zeros(len(self.columns.flight_numbers), dtype=bool)
+        else:
+            mask = self.columns.status[:, column] == available_code
+        for row in self.touched_rows:
+            flight_dates = self.record(row)["dates"]
+            mask[row] = date in flight_dates and flight_dates[date]["status"] == AVAILABLE_STATUS
+        return mask
+
+
+def get_flight_columns_view(flights: Dict[str, Any]) -> Optional[FlightColumnsView]:
+    """The columnar view of `flights`, or None if it cannot be derived from a snapshot.
+
+    That is the case for plain dicts, and for views where flights were inserted or
+    deleted, which change the rows of the table.
+    """
+    if not isinstance(flights, TrackedTable) or not flights.is_aligned_with_base():
+        return None
+    return FlightColumnsView(flights, get_flight_columns(flights.base))
+
+
+def search_direct_rows(view: FlightColumnsView, origin: str, destination: str, date: str) -> List[int]:
+    """Rows of the direct flights available on `date`, in table order."""
+    mask = view.available_on(date)
+    mask &= view.origin == view.airport_code(origin)
+    mask &= view.destination == view.airport_code(destination)
+    return np.flatnonzero(mask).tolist()
+
+
+def search_onestop_rows(
+    view: FlightColumnsView, origin: str, destination: str, date: str
+) -> List[Tuple[int, int, str]]:
+    """(row1, row2, date2) of the one-stop itineraries, in the order of the nested loop search.
+
+    This reproduces `SearchOnestopFlightWithoutSort` exactly for a string `date`,
+    including how it derives the date of the second flight and compares the
+    "HH:MM:SS(+1)" times as strings. The tools search other dates with the nested loop.
+    """
+    first_candidates = view.origin == view.airport_code(origin)
+    second_candidates = view.destination == view.airport_code(destination)
+    # the times are compared as "HH:MM:SS(+1)" strings: by time of day, and for the same
+    # time of day a "+1" time is later than one without it
+    arrival_clock = view.arrival_seconds % SECONDS_PER_DAY
+    arrives_next_day = view.arrival_seconds >= SECONDS_PER_DAY
+    departure_clock = view.departure_seconds % SECONDS_PER_DAY
+    departs_next_day = view.departure_seconds >= SECONDS_PER_DAY
+    try:
+        date2 = f"2024-05-{int(date[-2:])+1}"
+    except ValueError:
+        # the nested loop only derives the date of the second flight, and fails on a
+        # malformed date, once it reaches a pair connecting after a next-day arrival
+        if any(
+            np.any(second_candidates & (view.origin == view.destination[row1]))
+            for row1 in np.flatnonzero(first_candidates & arrives_next_day).tolist()
+        ):
+            raise
+        date2 = None
+    first_rows = np.flatnonzero(first_candidates & view.available_on(date))
+    if len(first_rows) == 0:
+        return []
+    results = []
+    for next_day in [False, True]:
+        rows1 = first_rows[arrives_next_day[first_rows] == next_day]
+        date2_of_rows1 = date2 if next_day else date
+        if len(rows1) == 0 or date2_of_rows1 is None:
+            # without a connecting pair, the malformed date would not have raised
+            continue
+        rows2 = np.flatnonzero(second_candidates & view.available_on(date2_of_rows1))
+        # every (flight1, flight2) pair at once, in the row-major order of the nested loop
+        connects = view.destination[rows1][:, None] == view.origin[rows2][None, :]
+        arrival1 = arrival_clock[rows1][:, None]
+        departure2 = departure_clock[rows2][None, :]
+        if next_day:
+            connects &= (arrival1 < departure2) | (
+                (arrival1 == departure2) & departs_next_day[rows2][None, :]
+            )
+        else:
+            connects &= arrival1 <= departure2
+        for i, j in zip(*np.nonzero(connects)):
+            results.append((int(rows1[i]), int(rows2[j]), date2_of_rows1))
+    # the nested loop goes through the first flights in table order
+    results.sort(key=lambda item: item[0])
+    return results
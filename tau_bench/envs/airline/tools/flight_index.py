@@ -0,0 +1,32 @@
+# Copyright Sierra
+
+from typing import Any, Dict, List, Tuple
+
+from tau_bench.envs.table_index import find_records
+
+
+def _origin(flight: Dict[str, Any]) -> str:
+    return flight["origin"]
+
+
+def _destination(flight: Dict[str, Any]) -> str:
+    return flight["destination"]
+
+
+def _route(flight: Dict[str, Any]) -> Tuple[str, str]:
+    return flight["origin"], flight["destination"]
+
+
+# the searches return the flights in the order of data["flights"], like a full scan would
+def flights_from(flights: Dict[str, Any], origin: str) -> List[Dict[str, Any]]:
+    return find_records(flights, "flights_by_origin", _origin, origin)
+
+
+def flights_to(flights: Dict[str, Any], destination: str) -> List[Dict[str, Any]]:
+    return find_records(flights, "flights_by_destination", _destination, destination)
+
+
+def flights_between(
+    flights: Dict[str, Any], origin: str, destination: str
+) -> List[Dict[str, Any]]:
+    return find_records(flights, "flights_by_route", _route, (origin, destination))
@@ -2,6 +2,12 @@
 
 import json
 from typing import Any, Dict
+from tau_bench.envs.airline.tools.flight_columns import (
+    get_flight_columns_view,
+    is_columnar_search_enabled,
+    search_direct_rows,
+)
+from tau_bench.envs.airline.tools.flight_index import flights_between
 from tau_bench.envs.airline.tools.sort_flights import (
     SORT_ATTRIBUTE_STRING_VALUES,
     sort_flights,
@@ -60,17 +66,29 @@ class SearchDirectFlightWithoutSort:
     @staticmethod
     def invoke(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
         flights = data["flights"]
+        # the columns are keyed by date strings, the loop handles any other value as it always did
+        view = (
+            get_flight_columns_view(flights)
+            if is_columnar_search_enabled() and isinstance(date, str)
+            else None
+        )
+        if view is not None:
+            candidates = [
+                view.record(row)
+                for row in search_direct_rows(view, origin, destination, date)
+            ]
+        else:
+            candidates = flights_between(flights, origin, destination)
         results = []
-        for flight in flights.values():
-            if flight["origin"] == origin and flight["destination"] == destination:
-                if (
-                    date in flight["dates"]
-                    and flight["dates"][date]["status"] == "available"
-                ):
-                    # results add flight except dates, but add flight["datas"][date]
-                    results.append({k: v for k, v in flight.items() if k != "dates"})
-                    results[-1].update(flight["dates"][date])
-                    results[-1]["date"] = date
+        for flight in candidates:
+            if (
+                date in flight["dates"]
+                and flight["dates"][date]["status"] == "available"
+            ):
+                # results add flight except dates, but add flight["datas"][date]
+                results.append({k: v for k, v in flight.items() if k != "dates"})
+                results[-1].update(flight["dates"][date])
+                results[-1]["date"] = date
         return results
 
     @staticmethod
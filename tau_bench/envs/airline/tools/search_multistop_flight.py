@@ -0,0 +1,86 @@
+# Copyright Sierra
+
+import json
+from typing import Any, Dict, Optional
+from tau_bench.envs.airline.tools.connection_graph import search_itineraries
+from tau_bench.envs.airline.tools.sort_flights import SORT_ATTRIBUTE_STRING_VALUES
+from tau_bench.envs.tool import Tool
+
+DEFAULT_MAX_STOPS = 2
+DEFAULT_LIMIT = 20
+
+
+class SearchMultistopFlight(Tool):
+    """Itineraries with up to `max_stops` layovers, searched on the connection graph.
+
+    This tool is not part of ALL_TOOLS, so the benchmark's tool set is unchanged. Add it
+    to the tools of an env to let the agent search itineraries with several layovers.
+    """
+
+    @staticmethod
+    def invoke(
+        data: Dict[str, Any],
+        origin: str,
+        destination: str,
+        date: str,
+        max_stops: int = DEFAULT_MAX_STOPS,
+        sort_by: str = "price_any_class",
+        limit: Optional[int] = DEFAULT_LIMIT,
+    ) -> str:
+        if max_stops < 0:
+            return "Error: max_stops must be non-negative"
+        if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+            return "Error: limit must be a positive integer"
+        if sort_by not in SORT_ATTRIBUTE_STRING_VALUES:
+            return f"Error: invalid sort attribute {sort_by}"
+        itineraries = search_itineraries(
+            data["flights"],
+            origin,
+            destination,
+            date,
+            max_stops=max_stops,
+            sort_by=sort_by,
+            limit=limit,
+        )
+        return json.dumps(itineraries)
+
+    @staticmethod
+    def get_info() -> Dict[str, Any]:
+        return {
+            "type": "function",
+            "function": {
+                "name": "search_multistop_flight",
+                "description": "Search itineraries between two cities departing on a specific date, with up to a given number of layovers. Each itinerary is a list of flights, and a flight landing the next day connects to flights of that day. The itineraries are sorted by the sort attribute.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "origin": {
+                            "type": "string",
+                            "description": "The origin city airport in three letters, such as 'JFK'.",
+                        },
+                        "destination": {
+                            "type": "string",
+                            "description": "The destination city airport in three letters, such as 'LAX'.",
+                        },
+                        "date": {
+                            "type": "string",
+                            "description": "The date of the first flight in the format 'YYYY-MM-DD', such as '2024-05-01'.",
+                        },
+                        "max_stops": {
+                            "type": "integer",
+                            "description": f"The maximum number of layovers. The default is {DEFAULT_MAX_STOPS}, 0 searches direct flights only.",
+                        },
+                        "sort_by": {
+                            "type": "string",
+                            "description": "The attribute to sort the itineraries by. The default is 'price_any_class'.",
+                            "enum": SORT_ATTRIBUTE_STRING_VALUES,
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": f"The maximum number of itineraries to return. The default is {DEFAULT_LIMIT}.",
+                        },
+                    },
+                    "required": ["origin", "destination", "date"],
+                },
+            },
+        }
@@ -1,7 +1,13 @@
 # Copyright Sierra
 
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List
+from tau_bench.envs.airline.tools.flight_columns import (
+    get_flight_columns_view,
+    is_columnar_search_enabled,
+    search_onestop_rows,
+)
+from tau_bench.envs.airline.tools.flight_index import flights_between, flights_from
 from tau_bench.envs.airline.tools.sort_flights import (
     SORT_ATTRIBUTE_STRING_VALUES,
     sort_flights,
@@ -56,44 +62,52 @@ class SearchOnestopFlightWithSort:
         return info
 
 
+def to_onestop_result(
+    flight1: Dict[str, Any], flight2: Dict[str, Any], date: str, date2: str
+) -> List[Dict[str, Any]]:
+    result1 = {k: v for k, v in flight1.items() if k != "dates"}
+    result1.update(flight1["dates"][date])
+    result1["date"] = date
+    result2 = {k: v for k, v in flight2.items() if k != "dates"}
+    result2.update(flight2["dates"][date])
+    result2["date"] = date2
+    return [result1, result2]
+
+
 class SearchOnestopFlightWithoutSort:
     @staticmethod
     def invoke(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
         flights = data["flights"]
+        # the columns are keyed by date strings, the loop handles any other value as it always did
+        view = (
+            get_flight_columns_view(flights)
+            if is_columnar_search_enabled() and isinstance(date, str)
+            else None
+        )
+        if view is not None:
+            return [
+                to_onestop_result(view.record(row1), view.record(row2), date, date2)
+                for row1, row2, date2 in search_onestop_rows(view, origin, destination, date)
+            ]
         results = []
-        for flight1 in flights.values():
-            if flight1["origin"] == origin:
-                for flight2 in flights.values():
+        for flight1 in flights_from(flights, origin):
+            for flight2 in flights_between(flights, flight1["destination"], destination):
+                date2 = (
+                    f"2024-05-{int(date[-2:])+1}"
+                    if "+1" in flight1["scheduled_arrival_time_est"]
+                    else date
+                )
+                if (
+                    flight1["scheduled_arrival_time_est"]
+                    > flight2["scheduled_departure_time_est"]
+                ):
+                    continue
+                if date in flight1["dates"] and date2 in flight2["dates"]:
                     if (
-                        flight2["destination"] == destination
-                        and flight1["destination"] == flight2["origin"]
+                        flight1["dates"][date]["status"] == "available"
+                        and flight2["dates"][date2]["status"] == "available"
                     ):
-                        date2 = (
-                            f"2024-05-{int(date[-2:])+1}"
-                            if "+1" in flight1["scheduled_arrival_time_est"]
-                            else date
-                        )
-                        if (
-                            flight1["scheduled_arrival_time_est"]
-                            > flight2["scheduled_departure_time_est"]
-                        ):
-                            continue
-                        if date in flight1["dates"] and date2 in flight2["dates"]:
-                            if (
-                                flight1["dates"][date]["status"] == "available"
-                                and flight2["dates"][date2]["status"] == "available"
-                            ):
-                                result1 = {
-                                    k: v for k, v in flight1.items() if k != "dates"
-                                }
-                                result1.update(flight1["dates"][date])
-                                result1["date"] = date
-                                result2 = {
-                                    k: v for k, v in flight2.items() if k != "dates"
-                                }
-                                result2.update(flight2["dates"][date])
-                                result2["date"] = date2
-                                results.append([result1, result2])
+                        results.append(to_onestop_result(flight1, flight2, date, date2))
         return results
 
     @staticmethod
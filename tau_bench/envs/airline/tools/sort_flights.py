@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
 from enum import StrEnum
-from typing import List, Union, Any, Dict
+from functools import lru_cache
+from typing import List, Optional, Union, Any, Dict
+import numpy as np
 from tau_bench.envs.tool import Tool
 import json
 
@@ -70,16 +72,26 @@ def get_dict_value_by_sort_by(obj, sort_by):
     return obj
 
 
+def _to_seconds(time_str):
+    baseline = 0
+    if "+1" in time_str:
+        baseline += 86400
+        time_str = time_str.replace("+1", "")
+    hours, minutes, seconds = map(int, time_str.split(":"))
+    baseline += hours * 3600 + minutes * 60 + seconds
+    return baseline
+
+
+# the same few scheduled times are parsed over and over while sorting
+_cached_to_seconds = lru_cache(maxsize=4096)(_to_seconds)
+
+
 def time_difference_seconds(time1, time2):
     # Convert to seconds first
     def to_seconds(time_str):
-        baseline = 0
-        if "+1" in time_str:
-            baseline += 86400
-            time_str = time_str.replace("+1", "")
-        hours, minutes, seconds = map(int, time_str.split(":"))
-        baseline += hours * 3600 + minutes * 60 + seconds
-        return baseline
+        if type(time_str) is str:
+            return _cached_to_seconds(time_str)
+        return _to_seconds(time_str)
 
     seconds1 = to_seconds(time1)
     seconds2 = to_seconds(time2)
@@ -159,13 +171,143 @@ def get_sort_value(flight_trip: FlightTrip, sort_by: SortAttribute):
                 raise ValueError(f"Invalid sort attribute: {sort_by}")
 
 
-def sort_flights(flight_trips, sort_by: SortAttribute):
-    return sorted(
-        flight_trips,
-        key=lambda x: get_sort_value(x, sort_by),
+# below this many trips, the overhead of NumPy outweighs the vectorized sort
+MIN_VECTORIZED_SORT_SIZE = 32
+# integers up to this magnitude are exact as float64
+_MAX_EXACT_FLOAT_INT = 2**53
+
+
+def _to_sort_array(values: List[Any]) -> Optional[np.ndarray]:
+    """The values as a NumPy array that orders them exactly like Python, or None if there is none.
+
+    Numbers are compared as they are, and strings through their rank in the Python
+    order of the distinct values.
+    """
+    types = set(type(value) for value in values)
+    if types <= {str}:
+        ranks = {value: rank for rank, value in enumerate(sorted(set(values)))}
+        return np.fromiter((ranks[value] for value in values), dtype=np.int64, count=len(values))
+    if types <= {int, bool}:
+        if any(abs(value) >= 2**63 for value in values):
+            return None
+        return np.array(values, dtype=np.int64)
+    if types <= {int, bool, float}:
+        if any(
+            value != value or (type(value) is not float and abs(value) > _MAX_EXACT_FLOAT_INT)
+            for value in values
+        ):
+            # NaN and huge integers do not order the same way as float64
+            return None
+        return np.array(values, dtype=np.float64)
+    return None
+
+
+def rank_sort_values(values: List[Any], limit: Optional[int] = None) -> List[int]:
+    """The indices of `values` in stable ascending order, or of the `limit` smallest ones.
+
+    This is the order `sorted` gives, and it raises the same errors for values that
+    cannot be compared.
+    """
+    num_values = len(values)
+    if limit is not None and limit >= num_values:
+        limit = None
+    keys = _to_sort_array(values) if num_values >= MIN_VECTORIZED_SORT_SIZE else None
+    if keys is None:
+        order = sorted(range(num_values), key=values.__getitem__)
+        return order if limit is None else order[:limit]
+    if limit is None:
+        return np.argsort(keys, kind="stable").tolist()
+    if limit <= 0:
+        return []
+    # partial selection: only the values up to the limit-th smallest are sorted, and the
+    # candidates are in index order, so ties stay in their original order
+    threshold = np.partition(keys, limit - 1)[limit - 1]
+    candidates = np.flatnonzero(keys <= threshold)
+    return candidates[np.argsort(keys[candidates], kind="stable")][:limit].tolist()
+
+
+_PRICE_CABINS = {
+    SortAttribute.PRICE_BASIC_ECONOMY: "basic_economy",
+    SortAttribute.PRICE_ECONOMY: "economy",
+    SortAttribute.PRICE_BUSINESS: "business",
+}
+
+
+def _segment_price(segment: Dict[str, Any], sort_by: SortAttribute) -> Any:
+    prices = segment["prices"]
+    if sort_by == SortAttribute.PRICE:
+        return min(prices["basic_economy"], prices["economy"], prices["business"])
+    return prices[_PRICE_CABINS[sort_by]]
+
+
+def _segment_duration(segment: Dict[str, Any]) -> int:
+    arrival = segment["scheduled_arrival_time_est"]
+    departure = segment["scheduled_departure_time_est"]
+    if type(arrival) is not str or type(departure) is not str:
+        raise TypeError("Unparsed time")
+    return _cached_to_seconds(arrival) - _cached_to_seconds(departure)
+
+
+def _fast_sort_value(flight_trip: Any, sort_by: SortAttribute) -> Any:
+    if type(flight_trip) is dict:
+        if sort_by in _PRICE_CABINS or sort_by == SortAttribute.PRICE:
+            return _segment_price(flight_trip, sort_by)
+        if sort_by == SortAttribute.DEPARTURE_TIME:
+            return flight_trip["scheduled_departure_time_est"]
+        if sort_by == SortAttribute.ARRIVAL_TIME:
+            return flight_trip["scheduled_arrival_time_est"]
+        return _segment_duration(flight_trip)
+    if type(flight_trip) is not list or any(type(segment) is not dict for segment in flight_trip):
+        raise TypeError("Irregular trip")
+    if sort_by in _PRICE_CABINS or sort_by == SortAttribute.PRICE:
+        return sum(_segment_price(segment, sort_by) for segment in flight_trip)
+    departures = [segment["scheduled_departure_time_est"] for segment in flight_trip]
+    if any(type(departure) is not str for departure in departures):
+        raise TypeError("Unsortable departures")
+    if sort_by == SortAttribute.TOTAL_FLIGHT_DURATION_EXCL_LAYOVER:
+        return sum(_segment_duration(segment) for segment in flight_trip)
+    # the first and the last segments of a stable sort by departure time
+    first = min(range(len(flight_trip)), key=departures.__getitem__)
+    last = max(range(len(flight_trip)), key=lambda i: (departures[i], i))
+    if sort_by == SortAttribute.DEPARTURE_TIME:
+        return departures[first]
+    if sort_by == SortAttribute.ARRIVAL_TIME:
+        return flight_trip[last]["scheduled_arrival_time_est"]
+    return _segment_duration(
+        {
+            "scheduled_arrival_time_est": flight_trip[last]["scheduled_arrival_time_est"],
+            "scheduled_departure_time_est": departures[first],
+        }
     )
 
 
+def get_sort_values(flight_trips: List[Any], sort_by: SortAttribute) -> List[Any]:
+    """`get_sort_value` of every trip, computed in one pass.
+
+    Well-formed trips go through a specialized path that dispatches on the attribute
+    once per trip and reuses the parsed times. Anything else is left to
+    `get_sort_value`, so malformed trips raise exactly the same errors.
+    """
+    if sort_by in SORT_ATTRIBUTE_STRING_VALUES:
+        sort_by = SortAttribute(sort_by)
+        try:
+            return [_fast_sort_value(flight_trip, sort_by) for flight_trip in flight_trips]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            pass
+    return [get_sort_value(flight_trip, sort_by) for flight_trip in flight_trips]
+
+
+def sort_flights(flight_trips, sort_by: SortAttribute, limit: Optional[int] = None):
+    """The trips sorted by `sort_by` like `sorted(..., key=get_sort_value)`, optionally only the first `limit`.
+
+    The sort values of all trips are computed in one pass, and ranked with a single
+    vectorized stable sort.
+    """
+    flight_trips = list(flight_trips)
+    values = get_sort_values(flight_trips, sort_by)
+    return [flight_trips[i] for i in rank_sort_values(values, limit)]
+
+
 class SortFlightToolSchema(BaseModel):
     flight_trips: List[FlightTrip] = Field(
         description='flights to sort. A single "flight" can be either a single FlightSegment or a list of FlightSegments.'
@@ -1,11 +1,23 @@
 # Copyright Sierra
 
+import enum
 import random
+import threading
 from hashlib import sha256
+from tau_bench.envs import gt_cache
+from tau_bench.envs.snapshot import (
+    DataLoadFunc,
+    TrackedTable,
+    load_snapshot,
+    load_snapshot_view,
+    rollback_data,
+    snapshot_fingerprint,
+)
 from tau_bench.envs.tool import Tool
 from typing import Any, Callable, Dict, List, Type, Optional, Set, Union, Tuple
 
 from tau_bench.envs.user import load_user, UserStrategy
+from tau_bench.timeline import REWARD_PHASE, TOOL_PHASE, timed, untimed, user_llm_calls
 from tau_bench.types import (
     Action,
     Task,
@@ -41,6 +53,80 @@ def consistent_hash(
     return sha256(str(value).encode("utf-8")).hexdigest()
 
 
+class DataHashMode(enum.Enum):
+    FULL = "full"
+    MERKLE = "merkle"
+
+
+_HASH_MODULUS = 2**256
+
+
+def record_digest(key: str, record: ToHashable) -> int:
+    return int.from_bytes(
+        sha256(f"{key}\0{to_hashable(record)}".encode("utf-8")).digest(), "big"
+    )
+
+
+class MerkleDataHasher(object):
+    """Hashes every record of every top-level table separately and combines them into a root hash.
+
+    A table digest is the sum of its record digests modulo 2**256, so it can be updated
+    record by record. The digests of the pristine snapshot are computed once per process,
+    and only the `touched_keys` of a `TrackedTable` are rehashed on top of them.
+    """
+
+    _base_digests: Dict[DataLoadFunc, Dict[str, Tuple[int, Dict[str, int]]]] = {}
+    _base_digests_lock = threading.Lock()
+
+    def __init__(self, data_load_func: DataLoadFunc) -> None:
+        self.data_load_func = data_load_func
+
+    def get_base_digests(self) -> Dict[str, Tuple[int, Dict[str, int]]]:
+        base_digests = self._base_digests.get(self.data_load_func)
+        if base_digests is not None:
+            return base_digests
+        with self._base_digests_lock:
+            if self.data_load_func not in self._base_digests:
+                base_digests = {}
+                for name, table in load_snapshot(self.data_load_func).items():
+                    if isinstance(table, dict):
+                        digests = {
+                            key: record_digest(key, record)
+                            for key, record in table.items()
+                        }
+                        base_digests[name] = (
+                            sum(digests.values()) % _HASH_MODULUS,
+                            digests,
+                        )
+                self._base_digests[self.data_load_func] = base_digests
+            return self._base_digests[self.data_load_func]
+
+    def table_digest(self, name: str, table: Any) -> int:
+        base_digests = self.get_base_digests()
+        if not isinstance(table, dict):
+            return record_digest(name, table)
+        if not isinstance(table, TrackedTable) or name not in base_digests:
+            return (
+                sum(record_digest(key, record) for key, record in table.items())
+                % _HASH_MODULUS
+            )
+        digest, digests = base_digests[name]
+        for key in table.touched_keys:
+            if key in digests:
+                digest -= digests[key]
+            if dict.__contains__(table, key):
+                digest += record_digest(key, dict.__getitem__(table, key))
+        return digest % _HASH_MODULUS
+
+    def get_data_hash(self, data: Dict[str, Any]) -> str:
+        return consistent_hash(
+            tuple(
+                (name, self.table_digest(name, table))
+                for name, table in sorted(data.items())
+            )
+        )
+
+
 class Env(object):
     def __init__(
         self,
@@ -53,10 +139,13 @@ class Env(object):
         user_model: str,
         user_provider: Optional[str] = None,
         task_index: Optional[int] = None,
+        data_hash_mode: Union[str, DataHashMode] = DataHashMode.FULL,
     ) -> None:
         super().__init__()
         self.data_load_func = data_load_func
-        self.data = data_load_func()
+        self.data_hash_mode = DataHashMode(data_hash_mode)
+        self.data_hasher = MerkleDataHasher(data_load_func)
+        self.data = self.load_data()
         self.tools_map: Dict[str, Type[Tool]] = {
             tool.get_info()["function"]["name"]: tool for tool in tools
         }
@@ -75,35 +164,78 @@ class Env(object):
         )
         self.actions: List[Action] = []
 
-    def reset(self, task_index: Optional[int] = None) -> EnvResetResponse:
+    def preload(self) -> None:
+        """Computes the process-wide state shared by all episodes, e.g. before forking workers."""
+        snapshot_fingerprint(self.data_load_func)
+        if self.data_hash_mode == DataHashMode.MERKLE:
+            self.data_hasher.get_base_digests()
+
+    def load_data(self) -> Dict[str, Any]:
+        # the domain data is parsed once per process and shared, records are copied on first access
+        return load_snapshot_view(self.data_load_func)
+
+    def reset_data(self) -> None:
+        # only the records touched by the previous episode are restored
+        self.data = rollback_data(self.data, self.data_load_func)
+
+    def _reset_task(self, task_index: Optional[int]) -> None:
         if task_index is None:
             task_index = random.randint(0, len(self.tasks))
         self.task_index = task_index
-        self.data = self.data_load_func()
+        self.reset_data()
         self.task = self.tasks[task_index]
         self.actions = []
-        initial_observation = self.user.reset(instruction=self.task.instruction)
+
+    def reset(self, task_index: Optional[int] = None) -> EnvResetResponse:
+        self._reset_task(task_index)
+        with user_llm_calls():
+            initial_observation = self.user.reset(instruction=self.task.instruction)
+        return EnvResetResponse(
+            observation=initial_observation, info=EnvInfo(task=self.task, source="user")
+        )
+
+    async def reset_async(self, task_index: Optional[int] = None) -> EnvResetResponse:
+        self._reset_task(task_index)
+        with user_llm_calls():
+            initial_observation = await self.user.reset_async(
+                instruction=self.task.instruction
+            )
         return EnvResetResponse(
             observation=initial_observation, info=EnvInfo(task=self.task, source="user")
         )
 
     def step(self, action: Action) -> EnvResponse:
         self.actions.append(action)
+        user_observation = None
+        if action.name == RESPOND_ACTION_NAME:
+            with user_llm_calls():
+                user_observation = self.user.step(action.kwargs["content"])
+        return self._step(action, user_observation)
+
+    async def step_async(self, action: Action) -> EnvResponse:
+        self.actions.append(action)
+        user_observation = None
+        if action.name == RESPOND_ACTION_NAME:
+            with user_llm_calls():
+                user_observation = await self.user.step_async(action.kwargs["content"])
+        return self._step(action, user_observation)
 
+    def _step(self, action: Action, user_observation: Optional[str]) -> EnvResponse:
         info = EnvInfo(task=self.task)
         reward = 0
         done = False
         if action.name == RESPOND_ACTION_NAME:
-            observation = self.user.step(action.kwargs["content"])
+            observation = user_observation
             info.source = "user"
             done = "###STOP###" in observation
         elif action.name in self.tools_map:
-            try:
-                observation = self.tools_map[action.name].invoke(
-                    data=self.data, **action.kwargs
-                )
-            except Exception as e:
-                observation = f"Error: {e}"
+            with timed(TOOL_PHASE, action.name):
+                try:
+                    observation = self.tools_map[action.name].invoke(
+                        data=self.data, **action.kwargs
+                    )
+                except Exception as e:
+                    observation = f"Error: {e}"
             info.source = action.name
             if action.name in self.terminate_tools:
                 done = True
@@ -112,15 +244,39 @@ class Env(object):
             info.source = action.name
 
         if done:
-            reward_res = self.calculate_reward()
+            with timed(REWARD_PHASE):
+                reward_res = self.calculate_reward()
             reward = reward_res.reward
             info.reward_info = reward_res
             info.user_cost = self.user.get_total_cost()
         return EnvResponse(observation=observation, reward=reward, done=done, info=info)
 
     def get_data_hash(self) -> str:
+        if self.data_hash_mode == DataHashMode.MERKLE:
+            return self.data_hasher.get_data_hash(self.data)
         return consistent_hash(to_hashable(self.data))
 
+    def get_gt_data_hash(self) -> str:
+        key = gt_cache.make_key(
+            type(self).__name__,
+            self.data_hash_mode.value,
+            snapshot_fingerprint(self.data_load_func),
+            gt_cache.tools_fingerprint(self.tools_map.values()),
+            self.terminate_tools,
+            self.task.model_dump(mode="json"),
+        )
+        gt_data_hash = gt_cache.lookup(key)
+        if gt_data_hash is None:
+            self.reset_data()
+            # the replay is part of the reward phase, not tool calls of the episode
+            with untimed():
+                for action in self.task.actions:
+                    if action.name not in self.terminate_tools:
+                        self.step(action)
+            gt_data_hash = self.get_data_hash()
+            gt_cache.store(key, gt_data_hash)
+        return gt_data_hash
+
     def calculate_reward(self) -> RewardResult:
         data_hash = self.get_data_hash()
         reward = 1.0
@@ -129,12 +285,7 @@ class Env(object):
         ]
 
         # Check if the database changes are correct. If they are not correct, then we set the reward to 0.
-        # TODO: cache gt_data_hash in tasks.py (low priority)
-        self.data = self.data_load_func()
-        for action in self.task.actions:
-            if action.name not in self.terminate_tools:
-                self.step(action)
-        gt_data_hash = self.get_data_hash()
+        gt_data_hash = self.get_gt_data_hash()
         info = RewardActionInfo(
             r_actions=data_hash == gt_data_hash, gt_data_hash=gt_data_hash
         )
@@ -0,0 +1,116 @@
+# Copyright Sierra
+
+import argparse
+import importlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from typing import Any, Dict, List, Optional
+
+COMPILED_FILE_NAME = "data.pkl"
+MAGIC = b"TAUDATA1"
+_HEADER_LENGTH = struct.Struct("<Q")
+
+DOMAIN_DATA_MODULES = {
+    "airline": "tau_bench.envs.airline.data",
+    "retail": "tau_bench.envs.retail.data",
+}
+
+
+def source_stamps(folder_path: str, file_names: Dict[str, str]) -> Dict[str, List[int]]:
+    stamps = {}
+    for file_name in file_names.values():
+        stat = os.stat(os.path.join(folder_path, file_name))
+        stamps[file_name] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def load_json_tables(folder_path: str, file_names: Dict[str, str]) -> Dict[str, Any]:
+    tables = {}
+    for name, file_name in file_names.items():
+        with open(os.path.join(folder_path, file_name)) as f:
+            tables[name] = json.load(f)
+    return tables
+
+
+def load_compiled_tables(
+    folder_path: str, file_names: Dict[str, str]
+) -> Optional[Dict[str, Any]]:
+    """Loads the compiled tables, or returns None if they are missing, older than the JSON files or corrupt."""
+    path = os.path.join(folder_path, COMPILED_FILE_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        # an empty file cannot be mapped (ValueError), and a truncated one fails to unpack
+        # or unpickle, so the JSON files are loaded instead
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buffer = memoryview(mm)
+            try:
+                if buffer[: len(MAGIC)] != MAGIC:
+                    return None
+                offset = len(MAGIC)
+                (header_length,) = _HEADER_LENGTH.unpack_from(buffer, offset)
+                offset += _HEADER_LENGTH.size
+                header = json.loads(bytes(buffer[offset : offset + header_length]))
+                if header["sources"] != source_stamps(folder_path, file_names):
+                    return None
+                return pickle.loads(buffer[offset + header_length :])
+            finally:
+                buffer.release()
+    except (ValueError, KeyError, TypeError, EOFError, struct.error, pickle.UnpicklingError):
+        return None
+
+
+def load_tables(folder_path: str, file_names: Dict[str, str]) -> Dict[str, Any]:
+    """Loads the tables of a domain, through the compiled file when it is present and fresh.
+
+    The JSON files remain the source of truth, see `compile_tables`.
+    """
+    tables = load_compiled_tables(folder_path, file_names)
+    if tables is None:
+        tables = load_json_tables(folder_path, file_names)
+    return tables
+
+
+def compile_tables(folder_path: str, file_names: Dict[str, str]) -> str:
+    header = json.dumps({"sources": source_stamps(folder_path, file_names)}).encode(
+        "utf-8"
+    )
+    payload = pickle.dumps(load_json_tables(folder_path, file_names), protocol=5)
+    path = os.path.join(folder_path, COMPILED_FILE_NAME)
+    # a unique temporary file, so concurrent compilations never write into each other's
+    fd, tmp_path = tempfile.mkstemp(dir=folder_path, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(payload)
+    # mkstemp creates the file readable by its owner only
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compile the JSON databases of the domains into the binary format used by load_data"
+    )
+    parser.add_argument(
+        "--env",
+        type=str,
+        nargs="+",
+        choices=list(DOMAIN_DATA_MODULES),
+        default=list(DOMAIN_DATA_MODULES),
+    )
+    args = parser.parse_args()
+    for env in args.env:
+        module = importlib.import_module(DOMAIN_DATA_MODULES[env])
+        path = compile_tables(module.FOLDER_PATH, module.FILE_NAMES)
+        print(f"Compiled {env} data to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Copyright Sierra
+
+import importlib
+import os
+import re
+import threading
+from types import ModuleType
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from tau_bench.envs.compiled_data import DOMAIN_DATA_MODULES, load_tables
+from tau_bench.envs.scale_up import scale_data
+
+DataLoadFunc = Callable[[], Dict[str, Any]]
+
+# "scaled-<factor>" or "scaled-<factor>-<seed>", e.g. "scaled-100" or "scaled-100-7"
+SCALED_VARIANT_PATTERN = re.compile(r"^scaled-(\d+)(?:-(\d+))?$")
+
+_variants: Dict[Tuple[str, str], DataLoadFunc] = {}
+_variants_lock = threading.Lock()
+
+
+def get_domain_data_module(env_name: str) -> ModuleType:
+    if env_name not in DOMAIN_DATA_MODULES:
+        raise ValueError(f"Unknown environment: {env_name}")
+    return importlib.import_module(DOMAIN_DATA_MODULES[env_name])
+
+
+def register_data_variant(env_name: str, name: str, data_load_func: DataLoadFunc) -> None:
+    """Makes `data_load_func` loadable as the data variant `name` of the environment."""
+    with _variants_lock:
+        _variants[(env_name, name)] = data_load_func
+
+
+def _make_data_load_func(env_name: str, data_variant: str) -> DataLoadFunc:
+    module = get_domain_data_module(env_name)
+    match = SCALED_VARIANT_PATTERN.match(data_variant)
+    if match is not None:
+        factor = int(match.group(1))
+        seed = int(match.group(2) or 0)
+
+        def load_scaled_data() -> Dict[str, Any]:
+            return scale_data(env_name, module.load_data(), factor, seed)
+
+        return load_scaled_data
+    if os.path.isdir(data_variant):
+        # a folder written by `python -m tau_bench.envs.scale_up`, or any folder with the domain's JSON files
+        folder_path = os.path.abspath(data_variant)
+
+        def load_folder_data() -> Dict[str, Any]:
+            return load_tables(folder_path, module.FILE_NAMES)
+
+        return load_folder_data
+    raise ValueError(
+        f"Unknown data variant for {env_name}: {data_variant} "
+        "(expected a registered variant, scaled-<factor>[-<seed>] or a data folder)"
+    )
+
+
+def get_data_load_func(env_name: str, data_variant: Optional[str] = None) -> DataLoadFunc:
+    """The function loading the data variant of the environment, the original data by default.
+
+    The same function is returned for the same variant, so the parsed snapshot of a
+    variant is shared by every environment of the process like the original one is.
+    """
+    if data_variant is None:
+        return get_domain_data_module(env_name).load_data
+    data_load_func = _variants.get((env_name, data_variant))
+    if data_load_func is not None:
+        return data_load_func
+    with _variants_lock:
+        if (env_name, data_variant) not in _variants:
+            _variants[(env_name, data_variant)] = _make_data_load_func(env_name, data_variant)
+        return _variants[(env_name, data_variant)]
@@ -0,0 +1,172 @@
+# Copyright Sierra
+
+import importlib
+import inspect
+import json
+import marshal
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from hashlib import sha256
+from types import ModuleType
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from tau_bench.envs.tool import Tool
+
+CACHE_DIR_ENV_VAR = "TAU_BENCH_CACHE_DIR"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tau_bench")
+CACHE_FILE_NAME = "gt_data_hashes.json"
+# part of every key, bump it when a change that affects the ground truth hashes is not
+# covered by the fingerprints below
+GT_CACHE_VERSION = 1
+# the modules that reset, replay and hash the data, which the tools do not import
+REPLAY_MODULES = ["tau_bench.envs.base", "tau_bench.envs.snapshot"]
+
+USE_CACHE = True
+_lock = threading.Lock()
+_entries: Optional[Dict[str, str]] = None
+_tools_fingerprints: Dict[tuple, str] = {}
+
+
+def disable_cache() -> None:
+    global USE_CACHE
+    with _lock:
+        USE_CACHE = False
+
+
+def enable_cache() -> None:
+    global USE_CACHE
+    with _lock:
+        USE_CACHE = True
+
+
+def get_cache_path() -> str:
+    cache_dir = os.environ.get(CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR)
+    return os.path.join(cache_dir, CACHE_FILE_NAME)
+
+
+def _module_dependencies(modules: Iterable[ModuleType]) -> List[ModuleType]:
+    """The given modules and the tau_bench modules they use, directly or not."""
+    found: Dict[str, ModuleType] = {}
+    stack = list(modules)
+    while len(stack) > 0:
+        module = stack.pop()
+        if module.__name__ in found:
+            continue
+        found[module.__name__] = module
+        for value in vars(module).values():
+            if inspect.ismodule(value):
+                dependency = value
+            elif inspect.isclass(value) or inspect.isfunction(value):
+                dependency = sys.modules.get(value.__module__)
+            else:
+                continue
+            if dependency is not None and dependency.__name__.startswith("tau_bench."):
+                stack.append(dependency)
+    return [found[name] for name in sorted(found)]
+
+
+def _module_code(module: ModuleType) -> bytes:
+    try:
+        return inspect.getsource(module).encode("utf-8")
+    except (OSError, TypeError):
+        pass
+    # installed without sources (e.g. only .pyc files, or in a zipapp)
+    try:
+        code = module.__spec__.loader.get_code(module.__name__)
+    except Exception:
+        code = None
+    if code is not None:
+        return marshal.dumps(code)
+    return str(getattr(module, "__version__", GT_CACHE_VERSION)).encode("utf-8")
+
+
+def tools_fingerprint(tools: Iterable[Type[Tool]]) -> str:
+    """Fingerprint of the code that produces the ground truth state.
+
+    That is the tool implementations, the helper modules they use (e.g. the search
+    indexes) and the modules that replay and hash the data.
+    """
+    tools = tuple(sorted(tools, key=lambda tool: tool.__qualname__))
+    if tools not in _tools_fingerprints:
+        modules = [inspect.getmodule(tool) for tool in tools]
+        modules.extend(importlib.import_module(name) for name in REPLAY_MODULES)
+        fingerprint = sha256()
+        for module in _module_dependencies(modules):
+            fingerprint.update(module.__name__.encode("utf-8"))
+            fingerprint.update(_module_code(module))
+        _tools_fingerprints[tools] = fingerprint.hexdigest()
+    return _tools_fingerprints[tools]
+
+
+def make_key(*parts: Any) -> str:
+    return sha256(
+        json.dumps([GT_CACHE_VERSION, *parts], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def _read_cache_file(path: str) -> Dict[str, str]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def lookup(key: str) -> Optional[str]:
+    global _entries
+    if not USE_CACHE:
+        return None
+    with _lock:
+        if _entries is None:
+            _entries = _read_cache_file(get_cache_path())
+        return _entries.get(key)
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Serializes the updates of the cache file across processes, where flock is available."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def store(key: str, gt_data_hash: str) -> None:
+    global _entries
+    if not USE_CACHE:
+        return
+    path = get_cache_path()
+    with _lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _file_lock(path):
+            # merge with the file on disk, other processes may have written to it in the meantime
+            entries = _read_cache_file(path)
+            entries.update(_entries or {})
+            entries[key] = gt_data_hash
+            _entries = entries
+            # readers never see a partially written file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, path)
+
+
+def clear() -> None:
+    global _entries
+    with _lock:
+        _entries = None
+        if os.path.exists(get_cache_path()):
+            os.remove(get_cache_path())
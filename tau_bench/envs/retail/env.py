@@ -1,7 +1,7 @@
 # Copyright Sierra
 
-from tau_bench.envs.base import Env
-from tau_bench.envs.retail.data import load_data
+from tau_bench.envs.base import DataHashMode, Env
+from tau_bench.envs.data_variants import get_data_load_func
 from tau_bench.envs.retail.rules import RULES
 from tau_bench.envs.retail.tools import ALL_TOOLS
 from tau_bench.envs.retail.wiki import WIKI
@@ -17,6 +17,8 @@ class MockRetailDomainEnv(Env):
         user_provider: Optional[str] = None,
         task_split: str = "test",
         task_index: Optional[int] = None,
+        data_hash_mode: Union[str, DataHashMode] = DataHashMode.FULL,
+        data_variant: Optional[str] = None,
     ):
         match task_split:
             case "test":
@@ -28,7 +30,7 @@ class MockRetailDomainEnv(Env):
             case _:
                 raise ValueError(f"Unknown task split: {task_split}")
         super().__init__(
-            data_load_func=load_data,
+            data_load_func=get_data_load_func("retail", data_variant),
             tools=ALL_TOOLS,
             tasks=tasks,
             wiki=WIKI,
@@ -37,5 +39,6 @@ class MockRetailDomainEnv(Env):
             user_model=user_model,
             user_provider=user_provider,
             task_index=task_index,
+            data_hash_mode=data_hash_mode,
         )
         self.terminate_tools = ["transfer_to_human_agents"]
@@ -0,0 +1,33 @@
+# Copyright Sierra
+
+from typing import Any, Dict, List, Tuple
+
+from tau_bench.envs.table_index import find_keys
+
+
+def _email(profile: Dict[str, Any]) -> str:
+    return profile["email"].lower()
+
+
+def _name_zip(profile: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (
+        profile["name"]["first_name"].lower(),
+        profile["name"]["last_name"].lower(),
+        profile["address"]["zip"],
+    )
+
+
+# the lookups return the user ids in the order of data["users"], like a full scan would
+def user_ids_by_email(users: Dict[str, Any], email: str) -> List[str]:
+    return find_keys(users, "users_by_email", _email, email.lower())
+
+
+def user_ids_by_name_zip(
+    users: Dict[str, Any], first_name: str, last_name: str, zip: str
+) -> List[str]:
+    return find_keys(
+        users,
+        "users_by_name_zip",
+        _name_zip,
+        (first_name.lower(), last_name.lower(), zip),
+    )
@@ -0,0 +1,329 @@
+# Copyright Sierra
+
+import argparse
+import json
+import os
+import random
+import string
+from typing import Any, Callable, Dict, List, Set
+
+from tau_bench.envs.snapshot import copy_data
+
+Tables = Dict[str, Dict[str, Any]]
+
+# draws in a row that may collide with taken ids before the id space counts as exhausted
+MAX_ID_ATTEMPTS = 1000
+# synthetic airport codes are long enough that at most this share of the codes is used
+MAX_AIRPORT_CODE_USAGE = 0.1
+
+
+class IdAllocator(object):
+    """Draws random ids that collide neither with the original ids nor with each other."""
+
+    def __init__(self, rng: random.Random, taken: Set[str]) -> None:
+        self.rng = rng
+        self.taken = set(taken)
+
+    def new(self, make_id: Callable[[random.Random], str]) -> str:
+        for _ in range(MAX_ID_ATTEMPTS):
+            new_id = make_id(self.rng)
+            if new_id not in self.taken:
+                self.taken.add(new_id)
+                return new_id
+        raise ValueError(
+            f"No free id after {MAX_ID_ATTEMPTS} draws, the id space is exhausted "
+            f"({len(self.taken)} ids taken)"
+        )
+
+    def digits(self, prefix: str, num_digits: int) -> str:
+        return self.new(
+            lambda rng: prefix + "".join(rng.choice(string.digits) for _ in range(num_digits))
+        )
+
+
+def _jitter(rng: random.Random, value: Any, spread: float = 0.1) -> Any:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    scaled = value * (1 + rng.uniform(-spread, spread))
+    return max(0, round(scaled)) if isinstance(value, int) else round(scaled, 2)
+
+
+def _clone_user(
+    rng: random.Random,
+    user: Dict[str, Any],
+    names: List[Dict[str, str]],
+    user_ids: IdAllocator,
+    emails: IdAllocator,
+    payment_ids: IdAllocator,
+) -> Dict[str, Any]:
+    """A copy of a user with a new name, user id, email and payment method ids.
+
+    The old to new payment method ids are returned in `user["_payment_ids"]`, which the
+    caller pops once the user's orders or reservations have been remapped.
+    """
+    clone = copy_data(user)
+    name = rng.choice(names)
+    first_name, last_name = name["first_name"], name["last_name"]
+    clone["name"] = {"first_name": first_name, "last_name": last_name}
+    clone["_user_id"] = user_ids.new(
+        lambda rng: f"{first_name.lower()}_{last_name.lower()}_{rng.randint(1000, 9999)}"
+    )
+    clone["email"] = emails.new(
+        lambda rng: f"{first_name.lower()}.{last_name.lower()}{rng.randint(1000, 9999)}@example.com"
+    )
+    if "address" in clone:
+        clone["address"]["zip"] = "".join(rng.choice(string.digits) for _ in range(5))
+    payment_methods = {}
+    clone["_payment_ids"] = {}
+    for payment_id, payment_method in clone.get("payment_methods", {}).items():
+        new_payment_id = payment_ids.digits(payment_id.rsplit("_", 1)[0] + "_", 7)
+        clone["_payment_ids"][payment_id] = new_payment_id
+        payment_method["id"] = new_payment_id
+        payment_methods[new_payment_id] = payment_method
+    clone["payment_methods"] = payment_methods
+    return clone
+
+
+def airport_code_length(num_codes: int) -> int:
+    """The length of the synthetic airport codes, three letters unless `num_codes` needs more."""
+    length = 3
+    while len(string.ascii_uppercase) ** length * MAX_AIRPORT_CODE_USAGE < num_codes:
+        length += 1
+    return length
+
+
+def scale_airline_data(data: Tables, factor: int, seed: int = 0) -> Tables:
+    """The airline tables with `factor - 1` synthetic copies of every flight, user and reservation.
+
+    The original records are kept unchanged and first in every table, so everything
+    the tasks reference is still there and lookups that return the first match are
+    unaffected. Every copy gets its own synthetic airports (e.g. "QZX" for "SFO", or
+    longer codes when the factor needs more than three letters offer), and its flights
+    keep the schedules but fly between these airports with jittered prices and seats,
+    so a search between the original airports never returns a synthetic flight. Synthetic users and reservations get new ids and only reference synthetic
+    records.
+    """
+    assert factor >= 1, "The scale factor must be at least 1"
+    rng = random.Random(seed)
+    flights = dict(data["flights"])
+    users = dict(data["users"])
+    reservations = dict(data["reservations"])
+    names = [user["name"] for user in data["users"].values()]
+    user_ids = IdAllocator(rng, set(users))
+    emails = IdAllocator(rng, {user["email"] for user in users.values()})
+    payment_ids = IdAllocator(
+        rng, {payment_id for user in users.values() for payment_id in user["payment_methods"]}
+    )
+    reservation_ids = IdAllocator(rng, set(reservations))
+    airports = sorted(
+        {flight[field] for flight in flights.values() for field in ["origin", "destination"]}
+    )
+    airport_codes = IdAllocator(rng, set(airports))
+    code_length = airport_code_length(len(airports) * factor)
+    next_flight_number = len(data["flights"]) + 1
+    for _ in range(factor - 1):
+        airport_map = {
+            airport: airport_codes.new(
+                lambda rng: "".join(rng.choice(string.ascii_uppercase) for _ in range(code_length))
+            )
+            for airport in airports
+        }
+        flight_numbers: Dict[str, str] = {}
+        for flight_number, flight in data["flights"].items():
+            while f"HAT{next_flight_number:03d}" in flights:
+                next_flight_number += 1
+            new_flight_number = f"HAT{next_flight_number:03d}"
+            flight_numbers[flight_number] = new_flight_number
+            clone = copy_data(flight)
+            clone["flight_number"] = new_flight_number
+            clone["origin"] = airport_map[flight["origin"]]
+            clone["destination"] = airport_map[flight["destination"]]
+            for info in clone["dates"].values():
+                for field in ["available_seats", "prices"]:
+                    if field in info:
+                        info[field] = {
+                            cabin: _jitter(rng, value) for cabin, value in info[field].items()
+                        }
+            flights[new_flight_number] = clone
+        new_user_ids: Dict[str, str] = {}
+        payment_id_maps: Dict[str, Dict[str, str]] = {}
+        clones = {}
+        for user_id, user in data["users"].items():
+            clone = _clone_user(rng, user, names, user_ids, emails, payment_ids)
+            new_user_ids[user_id] = clone.pop("_user_id")
+            payment_id_maps[user_id] = clone.pop("_payment_ids")
+            clones[user_id] = clone
+        reservation_id_map: Dict[str, str] = {}
+        for reservation_id, reservation in data["reservations"].items():
+            new_reservation_id = reservation_ids.new(
+                lambda rng: "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+            )
+            reservation_id_map[reservation_id] = new_reservation_id
+            clone = copy_data(reservation)
+            clone["reservation_id"] = new_reservation_id
+            clone["user_id"] = new_user_ids.get(reservation["user_id"], reservation["user_id"])
+            for field in ["origin", "destination"]:
+                clone[field] = airport_map.get(reservation[field], reservation[field])
+            for flight in clone["flights"]:
+                flight["flight_number"] = flight_numbers.get(
+                    flight["flight_number"], flight["flight_number"]
+                )
+                for field in ["origin", "destination"]:
+                    flight[field] = airport_map.get(flight[field], flight[field])
+            payment_id_map = payment_id_maps.get(reservation["user_id"], {})
+            for payment in clone["payment_history"]:
+                payment["payment_id"] = payment_id_map.get(
+                    payment["payment_id"], payment["payment_id"]
+                )
+            reservations[new_reservation_id] = clone
+        for user_id, clone in clones.items():
+            clone["reservations"] = [
+                reservation_id_map[reservation_id]
+                for reservation_id in clone.get("reservations", [])
+                if reservation_id in reservation_id_map
+            ]
+            users[new_user_ids[user_id]] = clone
+    return {"flights": flights, "reservations": reservations, "users": users}
+
+
+def scale_retail_data(data: Tables, factor: int, seed: int = 0) -> Tables:
+    """The retail tables with `factor - 1` synthetic copies of every product, user and order.
+
+    The original records are kept unchanged and first in every table. Synthetic
+    products are numbered copies of the original product types (e.g. "T-Shirt 2"), so
+    `list_all_product_types` keeps pointing to the original products, and synthetic
+    users and orders only reference synthetic records.
+    """
+    assert factor >= 1, "The scale factor must be at least 1"
+    rng = random.Random(seed)
+    products = dict(data["products"])
+    users = dict(data["users"])
+    orders = dict(data["orders"])
+    names = [user["name"] for user in data["users"].values()]
+    user_ids = IdAllocator(rng, set(users))
+    emails = IdAllocator(rng, {user["email"] for user in users.values()})
+    payment_ids = IdAllocator(
+        rng, {payment_id for user in users.values() for payment_id in user["payment_methods"]}
+    )
+    product_ids = IdAllocator(
+        rng,
+        set(products)
+        | {item_id for product in products.values() for item_id in product["variants"]},
+    )
+    order_ids = IdAllocator(rng, set(orders))
+    tracking_ids = IdAllocator(
+        rng,
+        {
+            tracking_id
+            for order in orders.values()
+            for fulfillment in order["fulfillments"]
+            for tracking_id in fulfillment["tracking_id"]
+        },
+    )
+    for copy_index in range(2, factor + 1):
+        product_id_map: Dict[str, str] = {}
+        item_id_map: Dict[str, str] = {}
+
+        def new_product_id(product_id: str) -> str:
+            if product_id not in product_id_map:
+                product_id_map[product_id] = product_ids.digits("", 10)
+            return product_id_map[product_id]
+
+        def new_item_id(item_id: str) -> str:
+            # items of past orders are not necessarily variants of a product anymore
+            if item_id not in item_id_map:
+                item_id_map[item_id] = product_ids.digits("", 10)
+            return item_id_map[item_id]
+
+        for product_id, product in data["products"].items():
+            clone = copy_data(product)
+            clone["name"] = f"{product['name']} {copy_index}"
+            clone["product_id"] = new_product_id(product_id)
+            variants = {}
+            for item_id, variant in clone["variants"].items():
+                variant["item_id"] = new_item_id(item_id)
+                variant["price"] = _jitter(rng, variant["price"])
+                variants[variant["item_id"]] = variant
+            clone["variants"] = variants
+            products[clone["product_id"]] = clone
+        new_user_ids: Dict[str, str] = {}
+        payment_id_maps: Dict[str, Dict[str, str]] = {}
+        clones = {}
+        for user_id, user in data["users"].items():
+            clone = _clone_user(rng, user, names, user_ids, emails, payment_ids)
+            new_user_ids[user_id] = clone.pop("_user_id")
+            payment_id_maps[user_id] = clone.pop("_payment_ids")
+            clones[user_id] = clone
+        order_id_map: Dict[str, str] = {}
+        for order_id, order in data["orders"].items():
+            new_order_id = order_ids.digits("#W", 7)
+            order_id_map[order_id] = new_order_id
+            clone = copy_data(order)
+            clone["order_id"] = new_order_id
+            clone["user_id"] = new_user_ids.get(order["user_id"], order["user_id"])
+            if order["user_id"] in clones:
+                clone["address"] = copy_data(clones[order["user_id"]]["address"])
+            for item in clone["items"]:
+                item["name"] = f"{item['name']} {copy_index}"
+                item["product_id"] = new_product_id(item["product_id"])
+                item["item_id"] = new_item_id(item["item_id"])
+            for fulfillment in clone["fulfillments"]:
+                fulfillment["tracking_id"] = [
+                    tracking_ids.digits("", 12) for _ in fulfillment["tracking_id"]
+                ]
+                fulfillment["item_ids"] = [new_item_id(item_id) for item_id in fulfillment["item_ids"]]
+            payment_id_map = payment_id_maps.get(order["user_id"], {})
+            for payment in clone["payment_history"]:
+                payment["payment_method_id"] = payment_id_map.get(
+                    payment["payment_method_id"], payment["payment_method_id"]
+                )
+            orders[new_order_id] = clone
+        for user_id, clone in clones.items():
+            clone["orders"] = [
+                order_id_map[order_id]
+                for order_id in clone.get("orders", [])
+                if order_id in order_id_map
+            ]
+            users[new_user_ids[user_id]] = clone
+    return {"orders": orders, "products": products, "users": users}
+
+
+SCALERS: Dict[str, Callable[[Tables, int, int], Tables]] = {
+    "airline": scale_airline_data,
+    "retail": scale_retail_data,
+}
+
+
+def scale_data(env_name: str, data: Tables, factor: int, seed: int = 0) -> Tables:
+    if env_name not in SCALERS:
+        raise ValueError(f"Unknown environment: {env_name}")
+    return SCALERS[env_name](data, factor, seed)
+
+
+def write_tables(tables: Tables, output_dir: str, file_names: Dict[str, str]) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    for name, file_name in file_names.items():
+        with open(os.path.join(output_dir, file_name), "w") as f:
+            json.dump(tables[name], f, indent=4)
+
+
+def main() -> None:
+    from tau_bench.envs.data_variants import get_domain_data_module
+
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic, scaled-up copy of a domain's database, loadable with --data-variant DIR"
+    )
+    parser.add_argument("env", type=str, choices=list(SCALERS))
+    parser.add_argument("--factor", type=int, required=True, help="e.g. 10, 100 or 1000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", type=str, required=True)
+    args = parser.parse_args()
+    module = get_domain_data_module(args.env)
+    tables = scale_data(args.env, module.load_data(), args.factor, args.seed)
+    write_tables(tables, args.output_dir, module.FILE_NAMES)
+    sizes = ", ".join(f"{len(table)} {name}" for name, table in tables.items())
+    print(f"📄 Wrote {sizes} to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
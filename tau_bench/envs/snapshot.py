@@ -0,0 +1,201 @@
+# Copyright Sierra
+
+import json
+import threading
+from hashlib import sha256
+from typing import Any, Callable, Dict, Optional, Set
+
+DataLoadFunc = Callable[[], Dict[str, Any]]
+
+_snapshots: Dict[DataLoadFunc, Dict[str, Any]] = {}
+_snapshots_lock = threading.Lock()
+_fingerprints: Dict[DataLoadFunc, str] = {}
+
+
+def copy_data(item: Any) -> Any:
+    """Structural copy of JSON-like data (dicts, lists and immutable leaves).
+
+    This is noticeably cheaper than `copy.deepcopy` because it does not need to
+    track shared references, which never occur in data parsed from JSON.
+    """
+    if type(item) is dict:
+        return {key: copy_data(value) for key, value in item.items()}
+    elif type(item) is list:
+        return [copy_data(element) for element in item]
+    return item
+
+
+class TrackedTable(dict):
+    """A top-level table of the domain data (e.g. users, orders) layered over the shared snapshot.
+
+    Untouched keys map to the snapshot records themselves, which must only be read.
+    The first time a record is reached through `table[key]` (or `get`, `pop`, ...) it is
+    replaced by a private copy, so the table only owns the records an episode may have
+    mutated and those keys end up in `touched_keys`. Iterating the table does not touch
+    keys, so tools must look a record up by key before mutating it.
+
+    `base` is the snapshot table the view was created from, if any. Apart from the
+    `touched_keys`, the table holds exactly the records of `base`, in the same order,
+    which lets lookups reuse indexes built once on the snapshot. `reordered` is set
+    once a record of `base` is deleted, since re-inserting it would move it to the end.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.touched_keys: Set[str] = set()
+        self.base: Optional[Dict[str, Any]] = None
+        self.reordered = False
+
+    def _touch(self, key: str) -> None:
+        # looking up a missing key changes nothing, so it is not recorded
+        if key not in self.touched_keys and super().__contains__(key):
+            self.touched_keys.add(key)
+            super().__setitem__(key, copy_data(super().__getitem__(key)))
+
+    def __getitem__(self, key: str) -> Any:
+        self._touch(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.touched_keys.add(key)
+        super().__setitem__(key, value)
+
+    def _deleted(self, key: str) -> None:
+        self.touched_keys.add(key)
+        if self.base is None or key in self.base:
+            self.reordered = True
+
+    def is_aligned_with_base(self) -> bool:
+        """Whether the table holds the records of `base` in the same order, none inserted or deleted."""
+        return (
+            self.base is not None
+            and not self.reordered
+            and all(
+                key in self.base and super(TrackedTable, self).__contains__(key)
+                for key in self.touched_keys
+            )
+        )
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._deleted(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self._touch(key)
+        return super().get(key, default)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        self._touch(key)
+        self.touched_keys.add(key)
+        return super().setdefault(key, default)
+
+    def pop(self, key: str, *args: Any) -> Any:
+        self._touch(key)
+        if super().__contains__(key):
+            self._deleted(key)
+        return super().pop(key, *args)
+
+    def popitem(self) -> Any:
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        key = next(reversed(self))
+        self._touch(key)
+        self._deleted(key)
+        return key, super().pop(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        other = dict(*args, **kwargs)
+        self.touched_keys.update(other)
+        super().update(other)
+
+    def clear(self) -> None:
+        for key in list(self):
+            self._deleted(key)
+        super().clear()
+
+
+def track_table(base: Dict[str, Any]) -> TrackedTable:
+    table = TrackedTable(base)
+    table.base = base
+    return table
+
+
+def track_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        name: track_table(table) if isinstance(table, dict) else copy_data(table)
+        for name, table in data.items()
+    }
+
+
+def load_snapshot(data_load_func: DataLoadFunc) -> Dict[str, Any]:
+    """Returns the pristine data of a domain, parsing it at most once per process.
+
+    The returned dict is shared by every caller and must never be mutated. Use
+    `load_snapshot_view` to get a view that tools can write to.
+    """
+    snapshot = _snapshots.get(data_load_func)
+    if snapshot is not None:
+        return snapshot
+    with _snapshots_lock:
+        if data_load_func not in _snapshots:
+            _snapshots[data_load_func] = data_load_func()
+        return _snapshots[data_load_func]
+
+
+def load_snapshot_view(data_load_func: DataLoadFunc) -> Dict[str, Any]:
+    """Returns a per-episode view of the snapshot that copies records on first access.
+
+    Creating a view only copies the references of each table, so the memory of
+    concurrent episodes scales with the records they touch, not with the database size.
+    """
+    return track_data(load_snapshot(data_load_func))
+
+
+def rollback_data(data: Dict[str, Any], data_load_func: DataLoadFunc) -> Dict[str, Any]:
+    """Restores in place the records touched since `data` was taken from the snapshot.
+
+    The touched keys of each `TrackedTable` act as an undo journal, so this is
+    O(records touched) rather than O(database). Tables that are not tracked are
+    taken from the snapshot again.
+    """
+    snapshot = load_snapshot(data_load_func)
+    for name in list(data):
+        if name not in snapshot:
+            del data[name]
+    for name, base_table in snapshot.items():
+        table = data.get(name)
+        if (
+            isinstance(table, TrackedTable)
+            and not table.reordered
+            and all(key in table or key not in base_table for key in table.touched_keys)
+        ):
+            for key in table.touched_keys:
+                if key in base_table:
+                    dict.__setitem__(table, key, base_table[key])
+                else:
+                    # a record inserted by the episode, possibly deleted again since
+                    dict.pop(table, key, None)
+            table.touched_keys.clear()
+            table.base = base_table
+        elif isinstance(base_table, dict):
+            # a pristine record was deleted, restoring it in place would change the key order
+            data[name] = track_table(base_table)
+        else:
+            data[name] = copy_data(base_table)
+    return data
+
+
+def snapshot_fingerprint(data_load_func: DataLoadFunc) -> str:
+    """Content hash of the pristine data, which identifies the data version."""
+    if data_load_func not in _fingerprints:
+        snapshot = load_snapshot(data_load_func)
+        _fingerprints[data_load_func] = sha256(
+            json.dumps(snapshot, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+    return _fingerprints[data_load_func]
+
+
+def clear_snapshots() -> None:
+    with _snapshots_lock:
+        _snapshots.clear()
+        _fingerprints.clear()
@@ -0,0 +1,89 @@
+# Copyright Sierra
+
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from tau_bench.envs.snapshot import TrackedTable
+
+IndexKeyFunc = Callable[[Dict[str, Any]], Hashable]
+
+
+class TableIndex(object):
+    """The keys of the records of a snapshot table, grouped by `key_func(record)` in table order."""
+
+    def __init__(self, base: Dict[str, Any], key_func: IndexKeyFunc) -> None:
+        # keeps the snapshot table alive, so its id is never reused while the index is cached
+        self.base = base
+        self.positions: Dict[str, int] = {}
+        self.groups: Dict[Hashable, List[str]] = {}
+        for position, (key, record) in enumerate(base.items()):
+            self.positions[key] = position
+            self.groups.setdefault(key_func(record), []).append(key)
+
+
+_indexes: Dict[Tuple[int, str], TableIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_table_index(
+    base: Dict[str, Any], name: str, key_func: IndexKeyFunc
+) -> TableIndex:
+    """The index `name` of a snapshot table, built at most once per process."""
+    cache_key = (id(base), name)
+    index = _indexes.get(cache_key)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        if cache_key not in _indexes:
+            _indexes[cache_key] = TableIndex(base, key_func)
+        return _indexes[cache_key]
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def find_keys(
+    table: Dict[str, Any], name: str, key_func: IndexKeyFunc, value: Hashable
+) -> List[str]:
+    """The keys of the records of `table` with `key_func(record) == value`, in table order.
+
+    For a `TrackedTable` view, the untouched records are looked up in the index `name`
+    of its snapshot table and only the touched records are checked one by one, so the
+    result always reflects the mutations of the episode. Other tables are scanned.
+    Records are never copied, so the lookup does not touch any key.
+    """
+    if (
+        not isinstance(table, TrackedTable)
+        or not table.is_aligned_with_base()
+        or not _is_hashable(value)
+    ):
+        # inserted or deleted records change the order of the table
+        return [key for key, record in table.items() if key_func(record) == value]
+    base = table.base
+    touched_keys = table.touched_keys
+    index = get_table_index(base, name, key_func)
+    keys = [key for key in index.groups.get(value, []) if key not in touched_keys]
+    touched_matches = [
+        key for key in touched_keys if key_func(dict.__getitem__(table, key)) == value
+    ]
+    if len(touched_matches) > 0:
+        keys.extend(touched_matches)
+        keys.sort(key=index.positions.__getitem__)
+    return keys
+
+
+def find_records(
+    table: Dict[str, Any], name: str, key_func: IndexKeyFunc, value: Hashable
+) -> List[Dict[str, Any]]:
+    """The records matching `find_keys`, without touching them (they must only be read)."""
+    return [dict.__getitem__(table, key) for key in find_keys(table, name, key_func, value)]
+
+
+def clear_table_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
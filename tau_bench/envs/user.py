@@ -1,10 +1,13 @@
 # Copyright Sierra
 
 import abc
+import asyncio
 import enum
-from litellm import completion
+from tau_bench.rate_limit import acompletion, completion
 from typing import Optional, List, Dict, Any, Union
 
+MAX_EMPTY_RESPONSE_ATTEMPTS = 3
+
 
 class BaseUserSimulationEnv(abc.ABC):
     metadata = {}
@@ -21,6 +24,12 @@ class BaseUserSimulationEnv(abc.ABC):
     def get_total_cost(self) -> float:
         raise NotImplementedError
 
+    async def reset_async(self, instruction: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.reset, instruction)
+
+    async def step_async(self, content: str) -> str:
+        return await asyncio.to_thread(self.step, content)
+
 
 class HumanUserSimulationEnv(BaseUserSimulationEnv):
     def reset(self, instruction: str) -> str:
@@ -42,40 +51,57 @@ class LLMUserSimulationEnv(BaseUserSimulationEnv):
         self.total_cost = 0.0
         self.reset_messages()
 
-    def _generate_message(self, messages: List[Dict[str, Any]]) -> str:
+    # the sync and async paths share these helpers and only differ in how they call the LLM
+    def _completion_kwargs(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "custom_llm_provider": self.provider,
+            "messages": messages,
+        }
+
+    @staticmethod
+    def _non_empty_message(res: Any, messages: List[Dict[str, Any]]) -> Optional[Any]:
+        """The message of `res`, or None if it is empty, with a request to try again appended to `messages`."""
+        message = res.choices[0].message
+        if message.content:
+            return message
+        messages.append({"role": "assistant", "content": ""})
+        messages.append(
+            {
+                "role": "user",
+                "content": "You returned an empty response, which is disallowed. Please try again.",
+            }
+        )
+        return None
+
+    def _record_response(self, res: Any) -> Any:
+        message = res.choices[0].message
+        self.messages.append(message.model_dump())
+        self.total_cost = res._hidden_params["response_cost"]
+        return message
+
+    def _generate_message(self, messages: List[Dict[str, Any]]) -> Any:
         """Sometimes, the model inexplicably returns an empty response, so we retry"""
+        copied_messages = messages.copy()
+        for _ in range(MAX_EMPTY_RESPONSE_ATTEMPTS):
+            res = completion(**self._completion_kwargs(copied_messages))
+            if self._non_empty_message(res, copied_messages) is not None:
+                return res
+        raise ValueError("Failed to generate a non-empty user message")
 
-        message_content = ""
-        retries = 3
+    async def _generate_message_async(self, messages: List[Dict[str, Any]]) -> Any:
         copied_messages = messages.copy()
-        while not message_content and retries > 0:
-            res = completion(
-                model=self.model,
-                custom_llm_provider=self.provider,
-                messages=copied_messages,
-            )
-            message = res.choices[0].message
-            message_content = message.content
-            retries -= 1
-            if not message_content:
-                copied_messages.append({"role": "assistant", "content": ""})
-                copied_messages.append(
-                    {
-                        "role": "user",
-                        "content": "You returned an empty response, which is disallowed. Please try again.",
-                    }
-                )
-
-        if not message_content:
-            raise ValueError("Failed to generate a non-empty user message")
-
-        return res, message
+        for _ in range(MAX_EMPTY_RESPONSE_ATTEMPTS):
+            res = await acompletion(**self._completion_kwargs(copied_messages))
+            if self._non_empty_message(res, copied_messages) is not None:
+                return res
+        raise ValueError("Failed to generate a non-empty user message")
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
-        res, message = self._generate_message(messages)
-        self.messages.append(message.model_dump())
-        self.total_cost = res._hidden_params["response_cost"]
-        return message.content
+        return self._record_response(self._generate_message(messages)).content
+
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        return self._record_response(await self._generate_message_async(messages)).content
 
     def build_system_prompt(self, instruction: Optional[str]) -> str:
         instruction_display = (
@@ -117,6 +143,14 @@ class LLMUserSimulationEnv(BaseUserSimulationEnv):
         self.messages.append({"role": "user", "content": content})
         return self.generate_next_message(self.messages)
 
+    async def reset_async(self, instruction: Optional[str] = None) -> str:
+        self.reset_messages(instruction)
+        return await self.generate_next_message_async(self.messages)
+
+    async def step_async(self, content: str) -> str:
+        self.messages.append({"role": "user", "content": content})
+        return await self.generate_next_message_async(self.messages)
+
     def get_total_cost(self) -> float:
         return self.total_cost
 
@@ -151,13 +185,12 @@ User Response:
 <the user response (this will be parsed and sent to the agent)>"""
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
-        res = completion(
-            model=self.model, custom_llm_provider=self.provider, messages=messages
-        )
-        message = res.choices[0].message
-        self.messages.append(message.model_dump())
-        self.total_cost = res._hidden_params["response_cost"]
-        return self.parse_response(message.content)
+        res = completion(**self._completion_kwargs(messages))
+        return self.parse_response(self._record_response(res).content)
+
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        res = await acompletion(**self._completion_kwargs(messages))
+        return self.parse_response(self._record_response(res).content)
 
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
@@ -212,6 +245,10 @@ class VerifyUserSimulationEnv(LLMUserSimulationEnv):
         assert cur_message is not None
         return cur_message.content
 
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        # verify() is synchronous, so the whole verification loop runs in a thread
+        return await asyncio.to_thread(self.generate_next_message, messages)
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
@@ -327,6 +364,10 @@ class ReflectionUserSimulationEnv(LLMUserSimulationEnv):
             attempts += 1
         return initial_response
 
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        # verify() and reflect() are synchronous, so the whole reflection loop runs in a thread
+        return await asyncio.to_thread(self.generate_next_message, messages)
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
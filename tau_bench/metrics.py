@@ -0,0 +1,19 @@
+# Copyright Sierra
+
+from math import comb
+from typing import Dict
+
+
+def is_successful(reward: float) -> bool:
+    return (1 - 1e-6) <= reward <= (1 + 1e-6)
+
+
+def compute_pass_hat_ks(c_per_task_id: Dict[int, int], num_trials: int) -> Dict[int, float]:
+    """pass^k from https://arxiv.org/pdf/2406.12045, given the number of successful trials c of each task."""
+    pass_hat_ks: Dict[int, float] = {}
+    for k in range(1, num_trials + 1):
+        sum_task_pass_hat_k = 0
+        for c in c_per_task_id.values():
+            sum_task_pass_hat_k += comb(c, k) / comb(num_trials, k)
+        pass_hat_ks[k] = sum_task_pass_hat_k / len(c_per_task_id)
+    return pass_hat_ks
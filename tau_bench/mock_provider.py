@@ -0,0 +1,294 @@
+# Copyright Sierra
+
+import asyncio
+import glob
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import litellm
+from litellm import CustomLLM
+
+from tau_bench.rate_limit import estimate_tokens
+from tau_bench.types import MOCK_PROVIDER, RESPOND_ACTION_NAME, Task
+
+# use MOCK_PROVIDER as the model provider and/or the user model provider, e.g.
+# --model-provider tau-mock --model ground-truth --user-model-provider tau-mock --user-model ground-truth
+# the agent replays the task's ground truth actions, the user states the instruction and stops
+GROUND_TRUTH_MODEL = "ground-truth"
+# the agent and the user replay the messages of a historical trajectory of the task
+REPLAY_MODEL = "replay"
+MOCK_MODELS = [GROUND_TRUTH_MODEL, REPLAY_MODEL]
+STOP_MESSAGE = "###STOP###"
+DEFAULT_TRAJECTORIES_PATTERN = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "historical_trajectories",
+    "*.json",
+)
+
+LatencySampler = Callable[[random.Random], float]
+
+
+def parse_latency(spec: str) -> LatencySampler:
+    """Parses an artificial latency distribution, in milliseconds, into a sampler of seconds.
+
+    `0` (no latency), `fixed:MS`, `uniform:MIN_MS:MAX_MS`, `exponential:MEAN_MS`,
+    `normal:MEAN_MS:STDDEV_MS` (clipped at 0) or `lognormal:MEDIAN_MS:SIGMA`.
+    """
+    name, *params = spec.split(":")
+    try:
+        values = [float(param) for param in params]
+        if name in ["0", "none"] and len(values) == 0:
+            return lambda rng: 0.0
+        if name == "fixed" and len(values) == 1:
+            return lambda rng: values[0] / 1000
+        if name == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1]) / 1000
+        if name == "exponential" and len(values) == 1:
+            return lambda rng: rng.expovariate(1 / values[0]) / 1000 if values[0] > 0 else 0.0
+        if name == "normal" and len(values) == 2:
+            return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+        if name == "lognormal" and len(values) == 2:
+            median, sigma = values
+            return lambda rng: rng.lognormvariate(0, sigma) * median / 1000
+    except ValueError:
+        pass
+    raise ValueError(
+        f"Invalid latency distribution {spec!r}, expected 0, fixed:MS, uniform:MIN_MS:MAX_MS, "
+        "exponential:MEAN_MS, normal:MEAN_MS:STDDEV_MS or lognormal:MEDIAN_MS:SIGMA"
+    )
+
+
+def load_all_tasks() -> List[Task]:
+    from tau_bench.envs.airline.revised_tasks_test import TASKS as airline_revised_test
+    from tau_bench.envs.airline.tasks_test import TASKS as airline_test
+    from tau_bench.envs.retail.tasks_dev import TASKS_DEV as retail_dev
+    from tau_bench.envs.retail.tasks_test import TASKS_TEST as retail_test
+    from tau_bench.envs.retail.tasks_train import TASKS_TRAIN as retail_train
+
+    return airline_test + retail_test + retail_train + retail_dev + airline_revised_test
+
+
+def first_user_message(messages: List[Dict[str, Any]]) -> Optional[str]:
+    for message in messages:
+        if message["role"] == "user":
+            return message["content"]
+    return None
+
+
+def user_instruction(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """The instruction in the system prompt of the user simulator."""
+    if len(messages) == 0 or messages[0]["role"] != "system":
+        return None
+    content = messages[0]["content"]
+    start = content.find("<instructions>\n")
+    end = content.find("\n</instructions>")
+    if start == -1 or end == -1:
+        return None
+    return content[start + len("<instructions>\n") : end]
+
+
+def task_key(task: Dict[str, Any]) -> str:
+    # the instructions of the tasks were revised since the historical trajectories were
+    # recorded, the user and the ground truth actions identify the task
+    return json.dumps([task["user_id"], task["actions"]], sort_keys=True)
+
+
+def count_turns(messages: List[Dict[str, Any]]) -> int:
+    # the messages a model generated so far are its assistant messages
+    return sum(1 for message in messages if message["role"] == "assistant")
+
+
+class MockLLM(CustomLLM):
+    """A litellm provider that answers the agents and the user simulators without any network.
+
+    Calls with tools are answered as the agent, the others as the user simulator. The
+    user simulator finds its task by the instruction in its system prompt, and the
+    agent by the first message of the user, so the two sides of an episode agree on
+    the task without sharing any state. Only the tool calling agents are supported.
+    Answers only depend on the conversation, the latency is drawn from a seeded
+    distribution.
+    """
+
+    def __init__(
+        self,
+        tasks: Optional[List[Task]] = None,
+        trajectories_pattern: str = DEFAULT_TRAJECTORIES_PATTERN,
+        latency: str = "0",
+        seed: int = 0,
+    ) -> None:
+        super().__init__()
+        self._tasks = tasks
+        self.trajectories_pattern = trajectories_pattern
+        self.sample_latency = parse_latency(latency)
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._tasks_by_instruction: Optional[Dict[str, Dict[str, Any]]] = None
+        self._trajectories_by_task: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._tasks_by_trajectory: Optional[Dict[int, Dict[str, Any]]] = None
+        self._trajectories_by_first_message: Optional[Dict[str, List[List[Dict[str, Any]]]]] = None
+
+    def _load(self) -> None:
+        with self._load_lock:
+            if self._tasks_by_instruction is not None:
+                return
+            tasks_by_instruction: Dict[str, Dict[str, Any]] = {}
+            # instructions shared by several tasks are played as the first one
+            for task in self._tasks if self._tasks is not None else load_all_tasks():
+                tasks_by_instruction.setdefault(task.instruction, task.model_dump(mode="json"))
+            trajectories_by_task: Dict[str, List[Dict[str, Any]]] = {}
+            tasks_by_trajectory: Dict[int, Dict[str, Any]] = {}
+            for path in sorted(glob.glob(self.trajectories_pattern)):
+                with open(path) as f:
+                    results = json.load(f)
+                # the lowest trial of every task is replayed
+                for result in sorted(results, key=lambda result: result.get("trial", 0)):
+                    task = result["info"]["task"]
+                    if task_key(task) not in trajectories_by_task:
+                        trajectories_by_task[task_key(task)] = result["traj"]
+                        tasks_by_trajectory[id(result["traj"])] = task
+                        tasks_by_instruction.setdefault(task["instruction"], task)
+            trajectories_by_first_message: Dict[str, List[List[Dict[str, Any]]]] = {}
+            for traj in trajectories_by_task.values():
+                trajectories_by_first_message.setdefault(first_user_message(traj), []).append(traj)
+            self._trajectories_by_task = trajectories_by_task
+            self._tasks_by_trajectory = tasks_by_trajectory
+            self._trajectories_by_first_message = trajectories_by_first_message
+            self._tasks_by_instruction = tasks_by_instruction
+
+    def find_trajectory(self, messages: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """The trajectory the user of the agent's conversation replays."""
+        candidates = self._trajectories_by_first_message.get(first_user_message(messages), [])
+        user_messages = [message["content"] for message in messages if message["role"] == "user"]
+        for traj in candidates:
+            traj_user_messages = [message["content"] for message in traj if message["role"] == "user"]
+            if traj_user_messages[: len(user_messages)] == user_messages:
+                return traj
+        return candidates[0] if len(candidates) > 0 else None
+
+    def find_task(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """The task of the agent's conversation."""
+        message = first_user_message(messages)
+        if message in self._tasks_by_instruction:
+            return self._tasks_by_instruction[message]
+        traj = self.find_trajectory(messages)
+        if traj is None:
+            raise ValueError(f"No task starts with the user message {message!r}")
+        return self._tasks_by_trajectory[id(traj)]
+
+    def agent_message(self, model: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        turn = count_turns(messages)
+        if model == REPLAY_MODEL:
+            traj = self.find_trajectory(messages)
+            if traj is None and first_user_message(messages) in self._tasks_by_instruction:
+                # the user states the instruction in ground truth mode
+                task = self._tasks_by_instruction[first_user_message(messages)]
+                traj = self._trajectories_by_task.get(task_key(task))
+            if traj is None:
+                raise ValueError(f"No historical trajectory starts with {first_user_message(messages)!r}")
+            agent_messages = [message for message in traj if message["role"] == "assistant"]
+            if turn < len(agent_messages):
+                return agent_messages[turn]
+            return {"role": "assistant", "content": "Is there anything else I can help you with?"}
+        task = self.find_task(messages)
+        actions = [action for action in task["actions"] if action["name"] != RESPOND_ACTION_NAME]
+        if turn < len(actions):
+            action = actions[turn]
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{turn}",
+                        "type": "function",
+                        "function": {"name": action["name"], "arguments": json.dumps(action["kwargs"])},
+                    }
+                ],
+            }
+        # the outputs the reward looks for in the agent's answers
+        return {"role": "assistant", "content": " ".join(["Done."] + task["outputs"])}
+
+    def user_message(self, model: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        turn = count_turns(messages)
+        instruction = user_instruction(messages)
+        if model == REPLAY_MODEL:
+            task = self._tasks_by_instruction.get(instruction)
+            traj = None if task is None else self._trajectories_by_task.get(task_key(task))
+            if traj is None:
+                raise ValueError(f"No historical trajectory for the instruction {instruction!r}")
+            user_messages = [message for message in traj if message["role"] == "user"]
+            content = user_messages[turn]["content"] if turn < len(user_messages) else STOP_MESSAGE
+        else:
+            # the instruction lets the agent find the task
+            content = instruction if turn == 0 else STOP_MESSAGE
+        return {"role": "assistant", "content": content}
+
+    def respond(
+        self, model: str, messages: List[Dict[str, Any]], optional_params: Dict[str, Any]
+    ) -> litellm.ModelResponse:
+        if model not in MOCK_MODELS:
+            raise ValueError(f"Unknown {MOCK_PROVIDER} model {model!r}, expected one of {MOCK_MODELS}")
+        self._load()
+        tools = optional_params.get("tools")
+        if tools is not None:
+            message = self.agent_message(model, messages)
+        else:
+            message = self.user_message(model, messages)
+        prompt_tokens = estimate_tokens(messages, tools)
+        completion_tokens = estimate_tokens([message])
+        response = litellm.ModelResponse(
+            model=model,
+            choices=[
+                {
+                    "index": 0,
+                    "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                    "message": message,
+                }
+            ],
+            usage=litellm.Usage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+        response._hidden_params["response_cost"] = 0.0
+        return response
+
+    def latency(self) -> float:
+        with self._rng_lock:
+            return self.sample_latency(self.rng)
+
+    def completion(
+        self, model: str, messages: list, *args: Any, **kwargs: Any
+    ) -> litellm.ModelResponse:
+        time.sleep(self.latency())
+        return self.respond(model, messages, kwargs.get("optional_params") or {})
+
+    async def acompletion(
+        self, model: str, messages: list, *args: Any, **kwargs: Any
+    ) -> litellm.ModelResponse:
+        await asyncio.sleep(self.latency())
+        return self.respond(model, messages, kwargs.get("optional_params") or {})
+
+
+def register_mock_provider(
+    tasks: Optional[List[Task]] = None,
+    trajectories_pattern: str = DEFAULT_TRAJECTORIES_PATTERN,
+    latency: str = "0",
+    seed: int = 0,
+) -> MockLLM:
+    """Makes litellm route the `tau-mock` provider to a new `MockLLM`.
+
+    `tasks` are the tasks played in ground truth mode, all the tasks of the repo by
+    default. The trajectories matching `trajectories_pattern` are replayed.
+    """
+    handler = MockLLM(tasks=tasks, trajectories_pattern=trajectories_pattern, latency=latency, seed=seed)
+    litellm.custom_provider_map = [
+        item for item in litellm.custom_provider_map if item["provider"] != MOCK_PROVIDER
+    ] + [{"provider": MOCK_PROVIDER, "custom_handler": handler}]
+    litellm.utils.custom_llm_setup()
+    return handler
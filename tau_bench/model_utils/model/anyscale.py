@@ -5,6 +5,7 @@ from tau_bench.model_utils.model.chat import ChatModel, Message
 from tau_bench.model_utils.model.completion import approx_cost_for_datapoint, approx_prompt_str
 from tau_bench.model_utils.model.general_model import wrap_temperature
 from tau_bench.model_utils.model.utils import approx_num_tokens
+from tau_bench.rate_limit import estimate_tokens, get_rate_limiter, usage_tokens
 
 API_KEY_ENV_VAR = "ANYSCALE_API_KEY"
 BASE_URL = "https://api.endpoints.anyscale.com/v1"
@@ -59,12 +60,16 @@ class AnyscaleModel(ChatModel):
         if temperature is None:
             temperature = self.temperature
         msgs = self.build_generate_message_state(messages)
+        reservation = get_rate_limiter().acquire(
+            "anyscale", self.model, estimate_tokens(msgs)
+        )
         res = self.client.chat.completions.create(
             model=self.model,
             messages=msgs,
             temperature=wrap_temperature(temperature),
             response_format={"type": "json_object" if force_json else "text"},
         )
+        reservation.settle(usage_tokens(res.usage))
         return self.handle_generate_message_response(
             prompt=msgs, content=res.choices[0].message.content, force_json=force_json
         )
@@ -6,6 +6,7 @@ from tau_bench.model_utils.model.chat import ChatModel, Message
 from tau_bench.model_utils.model.completion import approx_cost_for_datapoint, approx_prompt_str
 from tau_bench.model_utils.model.general_model import wrap_temperature
 from tau_bench.model_utils.model.utils import approx_num_tokens
+from tau_bench.rate_limit import estimate_tokens, get_rate_limiter, usage_tokens
 
 DEFAULT_CLAUDE_MODEL = "claude-3-5-sonnet-20240620"
 DEFAULT_MAX_TOKENS = 8192
@@ -127,12 +128,16 @@ class ClaudeModel(ChatModel):
         if temperature is None:
             temperature = self.temperature
         msgs = self.build_generate_message_state(messages)
+        reservation = get_rate_limiter().acquire(
+            "anthropic", self.model, estimate_tokens(msgs)
+        )
         res = self.client.messages.create(
             model=self.model,
             messages=msgs,
             temperature=wrap_temperature(temperature),
             max_tokens=DEFAULT_MAX_TOKENS,
         )
+        reservation.settle(usage_tokens(res.usage))
         return self.handle_generate_message_response(
             prompt=msgs, content=res.content[0].text, force_json=force_json
         )
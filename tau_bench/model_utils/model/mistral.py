@@ -5,6 +5,7 @@ from tau_bench.model_utils.model.chat import ChatModel, Message
 from tau_bench.model_utils.model.completion import approx_cost_for_datapoint, approx_prompt_str
 from tau_bench.model_utils.model.general_model import wrap_temperature
 from tau_bench.model_utils.model.utils import approx_num_tokens
+from tau_bench.rate_limit import estimate_tokens, get_rate_limiter, usage_tokens
 
 DEFAULT_MISTRAL_MODEL = "mistral-large-latest"
 
@@ -59,12 +60,16 @@ class MistralModel(ChatModel):
         if temperature is None:
             temperature = self.temperature
         msgs = self.build_generate_message_state(messages)
+        reservation = get_rate_limiter().acquire(
+            "mistral", self.model, estimate_tokens(msgs)
+        )
         res = self.client.chat(
             model=self.model,
             messages=msgs,
             temperature=wrap_temperature(temperature),
             response_format={"type": "json_object" if force_json else "text"},
         )
+        reservation.settle(usage_tokens(res.usage))
         return self.handle_generate_message_response(
             prompt=msgs, content=res.choices[0].message.content, force_json=force_json
         )
@@ -3,6 +3,12 @@ from tau_bench.model_utils.model.chat import ChatModel, Message
 from tau_bench.model_utils.model.completion import approx_cost_for_datapoint, approx_prompt_str
 from tau_bench.model_utils.model.general_model import wrap_temperature
 from tau_bench.model_utils.model.utils import approx_num_tokens
+from tau_bench.rate_limit import (
+    VLLM_PROVIDER,
+    estimate_tokens,
+    get_rate_limiter,
+    usage_tokens,
+)
 
 PRICE_PER_INPUT_TOKEN_MAP = {
     "Qwen/Qwen2-0.5B-Instruct": 0.0,
@@ -116,11 +122,15 @@ class VLLMChatModel(ChatModel):
         if temperature is None:
             temperature = self.temperature
         msgs = self.build_generate_message_state(messages)
+        reservation = get_rate_limiter().acquire(
+            VLLM_PROVIDER, self.model, estimate_tokens(msgs)
+        )
         res = self.client.chat.completions.create(
             model=self.model,
             messages=msgs,
             temperature=wrap_temperature(temperature=temperature),
         )
+        reservation.settle(usage_tokens(res.usage))
         return self.handle_generate_message_response(
             prompt=msgs, content=res.choices[0].message.content, force_json=force_json
         )
@@ -0,0 +1,276 @@
+# Copyright Sierra
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import litellm
+
+from tau_bench.timeline import record_llm_call
+
+WILDCARD_MODEL = "*"
+# litellm's provider name for an OpenAI-compatible vLLM server, which the vLLM chat
+# model also uses, so that both paths to the same server share one budget
+VLLM_PROVIDER = "hosted_vllm"
+Clock = Callable[[], float]
+
+
+class RateLimit(object):
+    """Requests and tokens per minute allowed for a (provider, model). None means unlimited."""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+    def share(self, num_shares: int) -> "RateLimit":
+        return RateLimit(
+            requests_per_minute=None
+            if self.requests_per_minute is None
+            else self.requests_per_minute / num_shares,
+            tokens_per_minute=None
+            if self.tokens_per_minute is None
+            else self.tokens_per_minute / num_shares,
+        )
+
+    def __repr__(self) -> str:
+        return f"RateLimit(requests_per_minute={self.requests_per_minute}, tokens_per_minute={self.tokens_per_minute})"
+
+
+def parse_rate_limit(spec: str) -> Tuple[Tuple[str, str], RateLimit]:
+    """Parses `provider:model=RPM:TPM`, e.g. `openai:gpt-4o=500:30000`.
+
+    The model may be `*` to apply the limit to every model of the provider (each model
+    gets its own buckets), and either budget may be left empty, e.g. `anthropic:*=:80000`.
+    """
+    try:
+        key, budgets = spec.rsplit("=", 1)
+        provider, model = key.split(":", 1)
+        rpm, tpm = budgets.split(":")
+    except ValueError:
+        raise ValueError(
+            f"Invalid rate limit {spec!r}, expected provider:model=RPM:TPM"
+        ) from None
+    return (provider, model), RateLimit(
+        requests_per_minute=float(rpm) if rpm else None,
+        tokens_per_minute=float(tpm) if tpm else None,
+    )
+
+
+def parse_rate_limits(specs: List[str]) -> Dict[Tuple[str, str], RateLimit]:
+    return dict(parse_rate_limit(spec) for spec in specs)
+
+
+class TokenBucket(object):
+    """Refills continuously at `capacity` units per minute, up to `capacity`.
+
+    `reserve` takes the units right away, possibly driving the balance negative, and
+    returns how long the caller must wait before the balance would have covered them.
+    Later callers queue behind earlier reservations, so waiting callers are served in
+    order and never starve.
+    """
+
+    def __init__(self, capacity: float, clock: Clock = time.monotonic) -> None:
+        self.capacity = capacity
+        self.refill_per_second = capacity / 60
+        self.balance = capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.balance = min(
+            self.capacity, self.balance + (now - self.updated) * self.refill_per_second
+        )
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        # a single call larger than the whole budget only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(self.clock())
+            self.balance -= amount
+            if self.balance >= 0:
+                return 0.0
+            return -self.balance / self.refill_per_second
+
+    def adjust(self, amount: float) -> None:
+        """Charges `amount` more units (or refunds them if negative) without waiting."""
+        with self._lock:
+            self._refill(self.clock())
+            self.balance = min(self.capacity, self.balance - amount)
+
+
+class Reservation(object):
+    def __init__(self, token_bucket: Optional[TokenBucket], estimated_tokens: int) -> None:
+        self.token_bucket = token_bucket
+        self.estimated_tokens = estimated_tokens
+
+    def settle(self, total_tokens: Optional[int]) -> None:
+        """Corrects the pre-charged estimate with the tokens the provider reported."""
+        if self.token_bucket is not None and total_tokens is not None:
+            self.token_bucket.adjust(total_tokens - self.estimated_tokens)
+            self.token_bucket = None
+
+
+class RateLimiter(object):
+    """Request and token budgets per (provider, model), shared by every caller in the process.
+
+    The agents and the user simulators go through the same limiter, so they draw from
+    the same quota. Callers without a configured limit never wait.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[Tuple[str, str], RateLimit]] = None,
+        clock: Clock = time.monotonic,
+    ) -> None:
+        self.limits = dict(limits or {})
+        self.clock = clock
+        self._buckets: Dict[Tuple[str, str], Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._lock = threading.Lock()
+
+    def get_limit(self, provider: str, model: str) -> Optional[RateLimit]:
+        limit = self.limits.get((provider, model))
+        if limit is None:
+            limit = self.limits.get((provider, WILDCARD_MODEL))
+        return limit
+
+    def _get_buckets(
+        self, provider: str, model: str
+    ) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        key = (provider, model)
+        if key not in self._buckets:
+            with self._lock:
+                if key not in self._buckets:
+                    limit = self.get_limit(provider, model) or RateLimit()
+                    self._buckets[key] = (
+                        None
+                        if limit.requests_per_minute is None
+                        else TokenBucket(limit.requests_per_minute, self.clock),
+                        None
+                        if limit.tokens_per_minute is None
+                        else TokenBucket(limit.tokens_per_minute, self.clock),
+                    )
+        return self._buckets[key]
+
+    def _reserve(
+        self, provider: str, model: str, estimated_tokens: int
+    ) -> Tuple[Reservation, float]:
+        request_bucket, token_bucket = self._get_buckets(provider, model)
+        wait = 0.0
+        if request_bucket is not None:
+            wait = max(wait, request_bucket.reserve(1))
+        if token_bucket is not None:
+            wait = max(wait, token_bucket.reserve(estimated_tokens))
+        return Reservation(token_bucket, estimated_tokens), wait
+
+    def acquire(self, provider: str, model: str, estimated_tokens: int) -> Reservation:
+        """Blocks until a request of about `estimated_tokens` prompt tokens fits in the budgets."""
+        reservation, wait = self._reserve(provider, model, estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return reservation
+
+    async def acquire_async(
+        self, provider: str, model: str, estimated_tokens: int
+    ) -> Reservation:
+        reservation, wait = self._reserve(provider, model, estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return reservation
+
+
+_rate_limiter = RateLimiter()
+# called with the latency of every completed call and whether the provider rate limited it
+CallListener = Callable[[float, bool], None]
+_call_listeners: List[CallListener] = []
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _rate_limiter
+
+
+def set_rate_limits(limits: Dict[Tuple[str, str], RateLimit]) -> None:
+    global _rate_limiter
+    _rate_limiter = RateLimiter(limits)
+
+
+def add_call_listener(listener: CallListener) -> None:
+    _call_listeners.append(listener)
+
+
+def remove_call_listener(listener: CallListener) -> None:
+    _call_listeners.remove(listener)
+
+
+def _notify_call(latency: float, rate_limited: bool) -> None:
+    for listener in list(_call_listeners):
+        listener(latency, rate_limited)
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None) -> int:
+    # very rough estimate (about 4 characters per token), good enough to pace requests
+    num_chars = len(json.dumps(messages, default=str))
+    if tools is not None:
+        num_chars += len(json.dumps(tools))
+    return num_chars // 4
+
+
+def usage_tokens(usage: Any) -> Optional[int]:
+    """Total tokens of a response's usage, in the OpenAI or the Anthropic layout."""
+    if usage is None:
+        return None
+    total_tokens = getattr(usage, "total_tokens", None)
+    if total_tokens is None and hasattr(usage, "input_tokens"):
+        total_tokens = usage.input_tokens + usage.output_tokens
+    return total_tokens
+
+
+def _split_provider(kwargs: Dict[str, Any]) -> Tuple[str, str]:
+    model = kwargs["model"]
+    provider = kwargs.get("custom_llm_provider")
+    if provider is None:
+        provider, _, model = model.rpartition("/")
+    return provider, model
+
+
+def completion(**kwargs: Any) -> Any:
+    """`litellm.completion`, paced by the process-wide rate limiter."""
+    provider, model = _split_provider(kwargs)
+    reservation = get_rate_limiter().acquire(
+        provider, model, estimate_tokens(kwargs["messages"], kwargs.get("tools"))
+    )
+    start = time.monotonic()
+    try:
+        res = litellm.completion(**kwargs)
+    except litellm.RateLimitError:
+        _notify_call(time.monotonic() - start, True)
+        raise
+    _notify_call(time.monotonic() - start, False)
+    record_llm_call(start, res)
+    reservation.settle(usage_tokens(getattr(res, "usage", None)))
+    return res
+
+
+async def acompletion(**kwargs: Any) -> Any:
+    """`litellm.acompletion`, paced by the process-wide rate limiter."""
+    provider, model = _split_provider(kwargs)
+    reservation = await get_rate_limiter().acquire_async(
+        provider, model, estimate_tokens(kwargs["messages"], kwargs.get("tools"))
+    )
+    start = time.monotonic()
+    try:
+        res = await litellm.acompletion(**kwargs)
+    except litellm.RateLimitError:
+        _notify_call(time.monotonic() - start, True)
+        raise
+    _notify_call(time.monotonic() - start, False)
+    record_llm_call(start, res)
+    reservation.settle(usage_tokens(getattr(res, "usage", None)))
+    return res
@@ -0,0 +1,306 @@
+# Copyright Sierra
+
+import argparse
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from tau_bench.blobs import BlobTable, blob_refs
+from tau_bench.metrics import compute_pass_hat_ks, is_successful
+from tau_bench.types import EnvRunResult, RunConfig
+
+# the columns of RunConfig that runs are usually filtered on
+RUN_COLUMNS = [
+    "model",
+    "model_provider",
+    "user_model",
+    "user_model_provider",
+    "env",
+    "task_split",
+    "agent_strategy",
+    "user_strategy",
+    "temperature",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    model TEXT,
+    model_provider TEXT,
+    user_model TEXT,
+    user_model_provider TEXT,
+    env TEXT,
+    task_split TEXT,
+    agent_strategy TEXT,
+    user_strategy TEXT,
+    temperature REAL,
+    config TEXT NOT NULL,
+    checkpoint_path TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs (model);
+CREATE INDEX IF NOT EXISTS runs_env_split ON runs (env, task_split);
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    task_id INTEGER NOT NULL,
+    trial INTEGER NOT NULL,
+    reward REAL NOT NULL,
+    error_type TEXT,
+    agent_cost REAL,
+    user_cost REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    duration REAL,
+    info TEXT NOT NULL,
+    usage TEXT,
+    timeline TEXT NOT NULL,
+    -- zlib-compressed JSON of the trajectory, with its large strings moved to blobs
+    traj BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS episodes_run_task ON episodes (run_id, task_id, trial);
+CREATE INDEX IF NOT EXISTS episodes_task ON episodes (task_id);
+"""
+
+
+def compress_traj(traj: List[Dict[str, Any]]) -> bytes:
+    return zlib.compress(json.dumps(traj).encode("utf-8"))
+
+
+def decompress_traj(blob: bytes) -> List[Dict[str, Any]]:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ResultStore(object):
+    """Episodes of many runs in one SQLite database, indexed by model, env, split and task.
+
+    Every episode row keeps the scalar fields that are aggregated across runs (reward,
+    cost, tokens, duration) as columns, and the trajectory as a compressed blob that is
+    only decoded when the results are loaded back. The large strings of the trajectories
+    (the system prompt above all) are stored once in the blobs table, across all runs.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            # concurrent runs may share the database
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def create_run(self, config: RunConfig, checkpoint_path: Optional[str] = None) -> int:
+        config_dict = config.model_dump(mode="json", exclude={"custom_agent"})
+        if config.custom_agent is not None:
+            config_dict["custom_agent"] = config.custom_agent.__qualname__
+        return self.add_run(config_dict, checkpoint_path=checkpoint_path)
+
+    def add_run(self, config_dict: Dict[str, Any], checkpoint_path: Optional[str] = None) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"INSERT INTO runs (created_at, {', '.join(RUN_COLUMNS)}, config, checkpoint_path) "
+                f"VALUES (?, {', '.join('?' for _ in RUN_COLUMNS)}, ?, ?)",
+                [datetime.now().isoformat()]
+                + [config_dict.get(column) for column in RUN_COLUMNS]
+                + [json.dumps(config_dict), checkpoint_path],
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def add_result(self, run_id: int, result: EnvRunResult) -> None:
+        usage = result.usage
+        blob_table = BlobTable()
+        traj = blob_table.dedup(result.traj)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, content) VALUES (?, ?)",
+                list(blob_table.blobs.items()),
+            )
+            self._conn.execute(
+                "INSERT INTO episodes (run_id, task_id, trial, reward, error_type, agent_cost, user_cost, "
+                "prompt_tokens, completion_tokens, duration, info, usage, timeline, traj) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    result.task_id,
+                    result.trial,
+                    result.reward,
+                    result.info.get("error_type", "Exception")
+                    if "error" in result.info
+                    else None,
+                    usage.agent_cost if usage is not None else None,
+                    usage.user_cost if usage is not None else None,
+                    usage.agent_prompt_tokens + usage.user_prompt_tokens
+                    if usage is not None
+                    else None,
+                    usage.agent_completion_tokens + usage.user_completion_tokens
+                    if usage is not None
+                    else None,
+                    max((event.start + event.duration for event in result.timeline), default=None),
+                    json.dumps(result.info),
+                    usage.model_dump_json() if usage is not None else None,
+                    json.dumps([event.model_dump() for event in result.timeline]),
+                    compress_traj(traj),
+                ),
+            )
+            self._conn.commit()
+
+    def find_runs(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Runs matching the given RUN_COLUMNS values, e.g. `find_runs(env="retail", model="gpt-4o")`."""
+        for column in filters:
+            if column not in RUN_COLUMNS:
+                raise ValueError(f"Cannot filter runs on {column}")
+        where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT runs.*, COUNT(episodes.id) AS num_episodes, AVG(episodes.reward) AS avg_reward, "
+                f"SUM(episodes.agent_cost) AS agent_cost, SUM(episodes.user_cost) AS user_cost "
+                f"FROM runs LEFT JOIN episodes ON episodes.run_id = runs.id "
+                f"WHERE {where} GROUP BY runs.id ORDER BY runs.id",
+                list(filters.values()),
+            ).fetchall()
+        return [{key: row[key] for key in row.keys() if key != "config"} for row in rows]
+
+    def get_rewards(self, run_id: int) -> List[Tuple[int, int, float]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, trial, reward FROM episodes WHERE run_id = ? ORDER BY trial, task_id",
+                (run_id,),
+            ).fetchall()
+        return [(row["task_id"], row["trial"], row["reward"]) for row in rows]
+
+    def get_metrics(self, run_id: int) -> Dict[str, Any]:
+        """Average reward and pass^k of a run, as computed by `display_metrics`."""
+        rewards = self.get_rewards(run_id)
+        if len(rewards) == 0:
+            return {"num_episodes": 0, "avg_reward": None, "pass_hat_ks": {}}
+        num_trials = len(set(trial for _, trial, _ in rewards))
+        c_per_task_id: Dict[int, int] = {}
+        for task_id, _, reward in rewards:
+            c_per_task_id[task_id] = c_per_task_id.get(task_id, 0) + (
+                1 if is_successful(reward) else 0
+            )
+        return {
+            "num_episodes": len(rewards),
+            "avg_reward": sum(reward for _, _, reward in rewards) / len(rewards),
+            "pass_hat_ks": compute_pass_hat_ks(c_per_task_id, num_trials),
+        }
+
+    def load_results(self, run_id: int) -> List[EnvRunResult]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM episodes WHERE run_id = ? ORDER BY trial, task_id", (run_id,)
+            ).fetchall()
+            trajs = [decompress_traj(row["traj"]) for row in rows]
+            blob_table = BlobTable(self._get_blobs(set().union(*map(blob_refs, trajs))))
+        return [
+            EnvRunResult(
+                task_id=row["task_id"],
+                reward=row["reward"],
+                info=json.loads(row["info"]),
+                traj=blob_table.rehydrate(traj),
+                trial=row["trial"],
+                timeline=json.loads(row["timeline"]),
+                usage=json.loads(row["usage"]) if row["usage"] is not None else None,
+            )
+            for row, traj in zip(rows, trajs)
+        ]
+
+    def _get_blobs(self, hashes: Set[str]) -> Dict[str, str]:
+        blobs = {}
+        hashes = list(hashes)
+        # stay below SQLite's limit on the number of bound parameters
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i : i + 500]
+            rows = self._conn.execute(
+                f"SELECT hash, content FROM blobs WHERE hash IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+            blobs.update((row["hash"], row["content"]) for row in rows)
+        return blobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query the results stored with --results-db")
+    parser.add_argument("db_path", type=str)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    runs_parser = subparsers.add_parser("runs", help="List the runs, optionally filtered")
+    metrics_parser = subparsers.add_parser(
+        "metrics", help="Average reward and pass^k of the matching runs"
+    )
+    for subparser in [runs_parser, metrics_parser]:
+        subparser.add_argument("--run-id", type=int)
+        subparser.add_argument("--model", type=str)
+        subparser.add_argument("--user-model", type=str)
+        subparser.add_argument("--env", type=str)
+        subparser.add_argument("--task-split", type=str)
+        subparser.add_argument("--agent-strategy", type=str)
+    import_parser = subparsers.add_parser(
+        "import", help="Add the results of a checkpoint (.json or .jsonl) written by run.py"
+    )
+    import_parser.add_argument("results_path", type=str)
+    import_parser.add_argument("--model", type=str, required=True)
+    import_parser.add_argument("--model-provider", type=str, required=True)
+    import_parser.add_argument("--user-model-provider", type=str, required=True)
+    import_parser.add_argument("--user-model", type=str, default="gpt-4o")
+    import_parser.add_argument("--env", type=str, required=True)
+    import_parser.add_argument("--task-split", type=str, default="test")
+    import_parser.add_argument("--agent-strategy", type=str, default="tool-calling")
+    args = parser.parse_args()
+
+    store = ResultStore(args.db_path)
+    if args.command == "import":
+        from tau_bench.checkpoint import load_checkpoint
+
+        config_dict = {
+            "model": args.model,
+            "model_provider": args.model_provider,
+            "user_model": args.user_model,
+            "user_model_provider": args.user_model_provider,
+            "env": args.env,
+            "task_split": args.task_split,
+            "agent_strategy": args.agent_strategy,
+        }
+        run_id = store.add_run(config_dict, checkpoint_path=args.results_path)
+        results = load_checkpoint(args.results_path)
+        for result in results:
+            store.add_result(run_id, EnvRunResult.model_validate(result))
+        print(f"Imported {len(results)} results as run {run_id}")
+        return
+
+    filters = {
+        column: getattr(args, column)
+        for column in ["model", "user_model", "env", "task_split", "agent_strategy"]
+        if getattr(args, column) is not None
+    }
+    runs = store.find_runs(**filters)
+    if args.run_id is not None:
+        runs = [run for run in runs if run["id"] == args.run_id]
+    for run in runs:
+        print(
+            f"run {run['id']} ({run['created_at']}): {run['agent_strategy']} {run['model']} on {run['env']}/{run['task_split']}, "
+            f"user {run['user_model']}, {run['num_episodes']} episodes"
+        )
+        if args.command == "metrics" and run["num_episodes"] > 0:
+            metrics = store.get_metrics(run["id"])
+            print(f"  🏆 Average reward: {metrics['avg_reward']}")
+            print("  📈 Pass^k")
+            for k, pass_hat_k in metrics["pass_hat_ks"].items():
+                print(f"    k={k}: {pass_hat_k}")
+
+
+if __name__ == "__main__":
+    main()
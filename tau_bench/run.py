@@ -2,29 +2,79 @@
 
 import os
 import json
+import asyncio
+import queue
 import random
+import threading
 import traceback
-from math import comb
+from contextlib import nullcontext
+from math import ceil
 import multiprocessing
-from typing import List, Dict, Any
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
+from tau_bench.checkpoint import (
+    CheckpointWriter,
+    jsonl_path_for,
+    load_checkpoint,
+    write_results,
+)
+from tau_bench.concurrency import AdaptiveConcurrencyController, percentile
+from tau_bench.metrics import compute_pass_hat_ks, is_successful
+from tau_bench.rate_limit import (
+    add_call_listener,
+    parse_rate_limits,
+    remove_call_listener,
+    set_rate_limits,
+)
+from tau_bench.result_store import ResultStore
+from tau_bench.telemetry import RunTelemetry
+from tau_bench.timeline import PHASES, record_timeline
 from tau_bench.envs import get_env
+from tau_bench.envs.airline.tools.flight_columns import enable_columnar_search
+from tau_bench.envs.base import DataHashMode, Env
 from tau_bench.agents.base import Agent
-from tau_bench.types import EnvRunResult, RunConfig
+from tau_bench.types import MOCK_PROVIDER, EnvRunResult, RunConfig, SolveResult
 from litellm import provider_list
 from tau_bench.envs.user import UserStrategy
 
 
 def run(config: RunConfig) -> List[EnvRunResult]:
     assert config.env in ["retail", "airline"], "Only retail and airline envs are supported"
-    assert config.model_provider in provider_list, "Invalid model provider"
-    assert config.user_model_provider in provider_list, "Invalid user model provider"
+    assert config.model_provider in provider_list + [MOCK_PROVIDER], "Invalid model provider"
+    assert config.user_model_provider in provider_list + [MOCK_PROVIDER], "Invalid user model provider"
     if config.agent_strategy is not None:
         assert config.agent_strategy in ["tool-calling", "act", "react", "few-shot"], "Invalid agent strategy"
     assert config.task_split in ["train", "test", "dev", "revised_test"], "Invalid task split"
     assert config.user_strategy in [item.value for item in UserStrategy], "Invalid user strategy"
+    assert config.data_hash_mode in [item.value for item in DataHashMode], "Invalid data hash mode"
+    assert config.executor in ["thread", "process", "asyncio"], "Invalid executor"
+    assert config.schedule in ["trial-major", "interleaved", "longest-first", "shuffled"], "Invalid schedule"
+    if config.executor == "process":
+        assert "fork" in multiprocessing.get_all_start_methods(), "The process executor requires fork"
+
+    rate_limits = parse_rate_limits(config.rate_limits)
+    num_processes = max(1, min(config.num_processes or os.cpu_count() or 1, config.max_concurrency))
+    if config.executor == "process":
+        # every worker process paces its own calls, so each one gets an equal share of the budgets
+        rate_limits = {key: limit.share(num_processes) for key, limit in rate_limits.items()}
+    set_rate_limits(rate_limits)
+    if config.columnar_search:
+        enable_columnar_search()
+    controller = None
+    if config.adaptive_concurrency:
+        # --max-concurrency becomes the upper bound of the adaptive limit. Forked workers
+        # each adapt their own limit, within their share of --max-concurrency
+        max_limit = (
+            ceil(config.max_concurrency / num_processes)
+            if config.executor == "process"
+            else config.max_concurrency
+        )
+        controller = AdaptiveConcurrencyController(
+            max_limit=max_limit, min_limit=min(config.min_concurrency, max_limit)
+        )
+        add_call_listener(controller.record_call)
 
     random.seed(config.seed)
     time_str = datetime.now().strftime("%m%d%H%M%S")
@@ -39,89 +89,442 @@ def run(config: RunConfig) -> List[EnvRunResult]:
         user_model=config.user_model,
         user_provider=config.user_model_provider,
         task_split=config.task_split,
+        data_hash_mode=config.data_hash_mode,
+        data_variant=config.data_variant,
     )
+    if MOCK_PROVIDER in [config.model_provider, config.user_model_provider]:
+        # imported here, the mock's custom provider API is only in recent litellm versions
+        from tau_bench.mock_provider import register_mock_provider
+
+        # the mock plays the tasks of the run, the forked workers inherit the provider
+        register_mock_provider(tasks=env.tasks, latency=config.mock_latency, seed=config.seed)
     agent = agent_factory(
         tools_info=env.tools_info,
         wiki=env.wiki,
         config=config,
     )
+    if config.executor == "process":
+        # the forked workers inherit the parsed data, tasks and tools copy-on-write
+        env.preload()
     end_index = (
         len(env.tasks) if config.end_index == -1 else min(config.end_index, len(env.tasks))
     )
     results: List[EnvRunResult] = []
-    lock = multiprocessing.Lock()
+    # results are streamed to a JSON lines file and consolidated into ckpt_path at the end
+    checkpoint_writer = CheckpointWriter(jsonl_path_for(ckpt_path), dedup=config.dedup_results)
     if config.task_ids and len(config.task_ids) > 0:
-        print(f"Running tasks {config.task_ids} (checkpoint path: {ckpt_path})")
+        print(f"Running tasks {config.task_ids} (checkpoint path: {checkpoint_writer.path})")
     else:
         print(
-            f"Running tasks {config.start_index} to {end_index} (checkpoint path: {ckpt_path})"
+            f"Running tasks {config.start_index} to {end_index} (checkpoint path: {checkpoint_writer.path})"
     )
-    for i in range(config.num_trials):
-        if config.task_ids and len(config.task_ids) > 0:
-            idxs = config.task_ids
-        else:
-            idxs = list(range(config.start_index, end_index))
-        if config.shuffle:
-            random.shuffle(idxs)
-
-        def _run(idx: int) -> EnvRunResult:
-            isolated_env = get_env(
-                config.env,
-                user_strategy=config.user_strategy,
-                user_model=config.user_model,
-                task_split=config.task_split,
-                user_provider=config.user_model_provider,
-                task_index=idx,
-            )
+    if config.task_ids and len(config.task_ids) > 0:
+        idxs = config.task_ids
+    else:
+        idxs = list(range(config.start_index, end_index))
+    episodes = schedule_episodes(
+        idxs,
+        num_trials=config.num_trials,
+        schedule=config.schedule,
+        shuffle=bool(config.shuffle),
+        estimated_lengths={idx: len(env.tasks[idx].actions) for idx in idxs},
+    )
+    completed: Dict[Tuple[int, int], EnvRunResult] = {}
+    if config.resume_from is not None:
+        scheduled = set(episodes)
+        num_ignored = 0
+        for result in load_checkpoint(config.resume_from):
+            result = EnvRunResult.model_validate(result)
+            episode = (result.trial, result.task_id)
+            if episode not in scheduled:
+                # the checkpoint may come from a run with other tasks or trials
+                num_ignored += 1
+            elif "error" not in result.info:
+                # episodes that raised an error are run again
+                completed[episode] = result
+        for result in completed.values():
+            checkpoint_writer.write(result)
+        print(
+            f"Resuming from {config.resume_from} ({len(completed)} episodes already completed, {num_ignored} results of episodes outside this run ignored)"
+        )
+    episodes = [episode for episode in episodes if episode not in completed]
+    results.extend(completed.values())
+
+    result_store = None
+    if config.results_db is not None:
+        result_store = ResultStore(config.results_db)
+        run_id = result_store.create_run(config, checkpoint_path=ckpt_path)
+        for result in results:
+            result_store.add_result(run_id, result)
+        print(f"Storing results as run {run_id} in {config.results_db}")
+
+    telemetry = None
+    if config.metrics_path is not None or config.metrics_port is not None:
+        telemetry = RunTelemetry(
+            labels={"env": config.env, "model": config.model, "user_model": config.user_model},
+            num_episodes=len(results) + len(episodes),
+            metrics_path=config.metrics_path,
+            port=config.metrics_port,
+            interval=config.metrics_interval,
+            # forked workers each adapt their own limit, which the parent cannot see
+            extra_gauges=(lambda: {"concurrency_limit": controller.limit})
+            if controller is not None and config.executor != "process"
+            else None,
+        )
+        for result in results:
+            telemetry.episode_started()
+            telemetry.episode_finished(result)
+
+    def _start_telemetry() -> None:
+        # with the process executor, this runs in the parent once the workers are forked, so
+        # they inherit neither the telemetry threads nor its listener (nor a held lock)
+        if telemetry is not None:
+            add_call_listener(telemetry.llm_call)
+            telemetry.start()
+
+    def _on_start() -> None:
+        # forked workers report the episodes they start through run_in_processes instead
+        if telemetry is not None and config.executor != "process":
+            telemetry.episode_started()
+
+    def _on_result(result: EnvRunResult) -> None:
+        checkpoint_writer.write(result)
+        if result_store is not None:
+            result_store.add_result(run_id, result)
+        if telemetry is not None:
+            telemetry.episode_finished(result)
+
+    def _make_env(idx: int) -> Env:
+        return get_env(
+            config.env,
+            user_strategy=config.user_strategy,
+            user_model=config.user_model,
+            task_split=config.task_split,
+            user_provider=config.user_model_provider,
+            task_index=idx,
+            data_hash_mode=config.data_hash_mode,
+            data_variant=config.data_variant,
+        )
+
+    def _run(episode: Tuple[int, int]) -> EnvRunResult:
+        trial, idx = episode
+        with controller.slot() if controller is not None else nullcontext():
+            _on_start()
 
             print(f"Running task {idx}")
+            with record_timeline() as timeline:
+                try:
+                    isolated_env = _make_env(idx)
+                    res = agent.solve(
+                        env=isolated_env,
+                        task_index=idx,
+                    )
+                    result = to_run_result(res, task_id=idx, trial=trial)
+                except Exception as e:
+                    result = to_error_result(e, task_id=idx, trial=trial)
+            result.timeline = timeline.events
+            result.usage = timeline.get_usage()
+        log_result(result)
+        return result
+
+    async def _run_async(episode: Tuple[int, int]) -> EnvRunResult:
+        trial, idx = episode
+        async with controller.slot_async() if controller is not None else nullcontext():
+            _on_start()
+
+            print(f"Running task {idx}")
+            with record_timeline() as timeline:
+                try:
+                    # building an env reads the task files, keep it off the event loop
+                    isolated_env = await asyncio.to_thread(_make_env, idx)
+                    res = await agent.solve_async(
+                        env=isolated_env,
+                        task_index=idx,
+                    )
+                    result = to_run_result(res, task_id=idx, trial=trial)
+                except Exception as e:
+                    result = to_error_result(e, task_id=idx, trial=trial)
+            result.timeline = timeline.events
+            result.usage = timeline.get_usage()
+        log_result(result)
+        return result
+
+    def _run_and_checkpoint(episode: Tuple[int, int]) -> EnvRunResult:
+        result = _run(episode)
+        _on_result(result)
+        return result
+
+    # all the episodes of all trials share one pool, so a slow episode never holds back the next trial
+    if config.executor == "process":
+        res = run_in_processes(
+            _run,
+            episodes,
+            num_processes=num_processes,
+            max_concurrency=config.max_concurrency,
+            on_forked=_start_telemetry,
+            on_start=telemetry.episode_started if telemetry is not None else None,
+            on_result=_on_result,
+            on_llm_calls=telemetry.llm_calls if telemetry is not None else None,
+        )
+        results.extend(res)
+    elif config.executor == "asyncio":
+        _start_telemetry()
+        res = asyncio.run(
+            run_in_event_loop(
+                _run_async,
+                episodes,
+                max_concurrency=config.max_concurrency,
+                on_result=_on_result,
+            )
+        )
+        results.extend(res)
+    else:
+        _start_telemetry()
+        with ThreadPoolExecutor(max_workers=config.max_concurrency) as executor:
+            res = list(executor.map(_run_and_checkpoint, episodes))
+            results.extend(res)
+    results.sort(key=lambda result: result.trial)
+    checkpoint_writer.close()
+    if result_store is not None:
+        result_store.close()
+    if telemetry is not None:
+        remove_call_listener(telemetry.llm_call)
+        telemetry.stop()
+    if controller is not None:
+        remove_call_listener(controller.record_call)
+        if config.executor != "process":
+            metrics = controller.get_metrics()
+            print(
+                f"⚙️  Final concurrency limit: {metrics['limit']} (bounds {metrics['min_limit']}-{metrics['max_limit']}, {len(metrics['recent_decisions'])} recent decisions)"
+            )
+
+    display_metrics(results)
+    display_timing(results)
+
+    write_results(
+        [result.model_dump() for result in results], ckpt_path, dedup=config.dedup_results
+    )
+    print(f"\n📄 Results saved to {ckpt_path}\n")
+    os.remove(checkpoint_writer.path)
+    return results
+
+
+def to_run_result(res: SolveResult, task_id: int, trial: int) -> EnvRunResult:
+    return EnvRunResult(
+        task_id=task_id,
+        reward=res.reward,
+        info=res.info,
+        traj=res.messages,
+        trial=trial,
+    )
+
+
+def to_error_result(e: Exception, task_id: int, trial: int) -> EnvRunResult:
+    return EnvRunResult(
+        task_id=task_id,
+        reward=0.0,
+        info={"error": str(e), "error_type": type(e).__name__, "traceback": traceback.format_exc()},
+        traj=[],
+        trial=trial,
+    )
+
+
+def log_result(result: EnvRunResult) -> None:
+    print(
+        "✅" if result.reward == 1 else "❌",
+        f"task_id={result.task_id}",
+        result.info,
+    )
+    print("-----")
+
+
+def schedule_episodes(
+    idxs: List[int],
+    num_trials: int,
+    schedule: str = "trial-major",
+    shuffle: bool = False,
+    estimated_lengths: Optional[Dict[int, int]] = None,
+) -> List[Tuple[int, int]]:
+    """Orders the (trial, task index) episodes of a run.
+
+    - trial-major: all tasks of trial 0, then of trial 1, ... (optionally shuffled within each trial)
+    - interleaved: all trials of the first task, then of the second task, ...
+    - longest-first: the tasks with the highest estimated length first, to shorten the tail
+    - shuffled: all episodes in a random order
+    """
+    if schedule == "trial-major":
+        episodes = []
+        for trial in range(num_trials):
+            trial_idxs = list(idxs)
+            if shuffle:
+                random.shuffle(trial_idxs)
+            episodes.extend((trial, idx) for idx in trial_idxs)
+        return episodes
+    episodes = [(trial, idx) for idx in idxs for trial in range(num_trials)]
+    if schedule == "interleaved":
+        return episodes
+    elif schedule == "longest-first":
+        assert estimated_lengths is not None, "longest-first requires estimated lengths"
+        return sorted(episodes, key=lambda episode: -estimated_lengths[episode[1]])
+    elif schedule == "shuffled":
+        random.shuffle(episodes)
+        return episodes
+    raise ValueError(f"Unknown schedule: {schedule}")
+
+
+def _process_worker(
+    run_episode: Callable[[Tuple[int, int]], EnvRunResult],
+    task_queue: multiprocessing.Queue,
+    result_queue: multiprocessing.Queue,
+    num_threads: int,
+) -> None:
+    # the LLM calls of an episode are made on the thread that runs it, and their counts
+    # are sent to the parent along with the episode's result
+    call_counts = threading.local()
+
+    def count_call(latency: float, rate_limited: bool) -> None:
+        call_counts.num_calls += 1
+        call_counts.num_rate_limited += int(rate_limited)
+
+    add_call_listener(count_call)
+
+    def consume() -> None:
+        while True:
+            item = task_queue.get()
+            if item is None:
+                return
+            position, episode = item
+            call_counts.num_calls = 0
+            call_counts.num_rate_limited = 0
+            result_queue.put((position, None, None))
             try:
-                res = agent.solve(
-                    env=isolated_env,
-                    task_index=idx,
-                )
-                result = EnvRunResult(
-                    task_id=idx,
-                    reward=res.reward,
-                    info=res.info,
-                    traj=res.messages,
-                    trial=i,
-                )
+                result = run_episode(episode)
             except Exception as e:
-                result = EnvRunResult(
-                    task_id=idx,
-                    reward=0.0,
-                    info={"error": str(e), "traceback": traceback.format_exc()},
-                    traj=[],
-                    trial=i,
+                # an uncaught error must not end the thread, or its remaining episodes are lost
+                trial, idx = episode
+                result = to_error_result(e, task_id=idx, trial=trial)
+                log_result(result)
+            result_queue.put(
+                (
+                    position,
+                    result.model_dump(),
+                    (call_counts.num_calls, call_counts.num_rate_limited),
                 )
-            print(
-                "✅" if result.reward == 1 else "❌",
-                f"task_id={idx}",
-                result.info,
             )
-            print("-----")
-            with lock:
-                data = []
-                if os.path.exists(ckpt_path):
-                    with open(ckpt_path, "r") as f:
-                        data = json.load(f)
-                with open(ckpt_path, "w") as f:
-                    json.dump(data + [result.model_dump()], f, indent=2)
-            return result
 
-        with ThreadPoolExecutor(max_workers=config.max_concurrency) as executor:
-            res = list(executor.map(_run, idxs))
-            results.extend(res)
+    # the threads overlap the LLM calls of the episodes assigned to this process
+    threads = [threading.Thread(target=consume) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
 
-    display_metrics(results)
 
-    with open(ckpt_path, "w") as f:
-        json.dump([result.model_dump() for result in results], f, indent=2)
-        print(f"\n📄 Results saved to {ckpt_path}\n")
+def run_in_processes(
+    run_episode: Callable[[Tuple[int, int]], EnvRunResult],
+    episodes: List[Tuple[int, int]],
+    num_processes: int,
+    max_concurrency: int,
+    on_start: Optional[Callable[[], None]] = None,
+    on_result: Optional[Callable[[EnvRunResult], None]] = None,
+    on_forked: Optional[Callable[[], None]] = None,
+    on_llm_calls: Optional[Callable[[int, int], None]] = None,
+) -> List[EnvRunResult]:
+    """Runs the episodes in forked worker processes, each with its own pool of threads.
+
+    The workers are forked after the parent loaded the domain data, so they share it
+    copy-on-write instead of parsing it again. Results are streamed back to the parent,
+    which calls `on_start` and `on_result` as episodes start and finish, and returned in
+    the order of `episodes`. `on_forked` is called once all the workers are forked, and
+    `on_llm_calls` with the number of LLM calls and rate limited calls of each episode.
+    If all the workers die, the episodes they left get error results, so the results
+    collected so far are kept.
+    """
+    if len(episodes) == 0:
+        return []
+    ctx = multiprocessing.get_context("fork")
+    num_processes = max(1, min(num_processes, max_concurrency, len(episodes)))
+    num_threads = ceil(max_concurrency / num_processes)
+    task_queue = ctx.Queue()
+    result_queue = ctx.Queue()
+    for position, episode in enumerate(episodes):
+        task_queue.put((position, episode))
+    for _ in range(num_processes * num_threads):
+        task_queue.put(None)
+    workers = [
+        ctx.Process(
+            target=_process_worker,
+            args=(run_episode, task_queue, result_queue, num_threads),
+            daemon=True,
+        )
+        for _ in range(num_processes)
+    ]
+    for worker in workers:
+        worker.start()
+    if on_forked is not None:
+        on_forked()
+    results: List[EnvRunResult] = [None] * len(episodes)
+    num_received = 0
+    workers_exited = False
+    while num_received < len(episodes):
+        try:
+            position, result, call_counts = result_queue.get(timeout=1)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                if not workers_exited:
+                    # receive what the workers sent before they exited first
+                    workers_exited = True
+                    continue
+                error = RuntimeError(
+                    f"All worker processes exited with {len(episodes) - num_received} episodes left"
+                )
+                print(f"⚠️  {error}")
+                for position, (trial, idx) in enumerate(episodes):
+                    if results[position] is None:
+                        results[position] = to_error_result(error, task_id=idx, trial=trial)
+                        if on_result is not None:
+                            on_result(results[position])
+                break
+            continue
+        if result is None:
+            if on_start is not None:
+                on_start()
+            continue
+        results[position] = EnvRunResult.model_validate(result)
+        if on_llm_calls is not None:
+            on_llm_calls(*call_counts)
+        if on_result is not None:
+            on_result(results[position])
+        num_received += 1
+    for worker in workers:
+        worker.join()
     return results
 
 
+async def run_in_event_loop(
+    run_episode: Callable[[Tuple[int, int]], Awaitable[EnvRunResult]],
+    episodes: List[Tuple[int, int]],
+    max_concurrency: int,
+    on_result: Optional[Callable[[EnvRunResult], None]] = None,
+) -> List[EnvRunResult]:
+    """Runs the episodes as coroutines on the current event loop.
+
+    At most `max_concurrency` episodes are in flight at once. Their LLM calls are
+    awaited rather than blocking a thread, so the concurrency is not bounded by the
+    size of a thread pool. Results are returned in the order of `episodes`.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(episode: Tuple[int, int]) -> EnvRunResult:
+        async with semaphore:
+            result = await run_episode(episode)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return list(await asyncio.gather(*(run_one(episode) for episode in episodes)))
+
+
 def agent_factory(
     tools_info: List[Dict[str, Any]], wiki, config: RunConfig
 ) -> Agent:
@@ -187,9 +590,6 @@ def agent_factory(
 
 
 def display_metrics(results: List[EnvRunResult]) -> None:
-    def is_successful(reward: float) -> bool:
-        return (1 - 1e-6) <= reward <= (1 + 1e-6)
-
     num_trials = len(set([r.trial for r in results]))
     rewards = [r.reward for r in results]
     avg_reward = sum(rewards) / len(rewards)
@@ -200,13 +600,35 @@ def display_metrics(results: List[EnvRunResult]) -> None:
             c_per_task_id[result.task_id] = 1 if is_successful(result.reward) else 0
         else:
             c_per_task_id[result.task_id] += 1 if is_successful(result.reward) else 0
-    pass_hat_ks: dict[int, float] = {}
-    for k in range(1, num_trials + 1):
-        sum_task_pass_hat_k = 0
-        for c in c_per_task_id.values():
-            sum_task_pass_hat_k += comb(c, k) / comb(num_trials, k)
-        pass_hat_ks[k] = sum_task_pass_hat_k / len(c_per_task_id)
+    pass_hat_ks = compute_pass_hat_ks(c_per_task_id, num_trials)
     print(f"🏆 Average reward: {avg_reward}")
     print("📈 Pass^k")
     for k, pass_hat_k in pass_hat_ks.items():
         print(f"  k={k}: {pass_hat_k}")
+
+
+def display_timing(results: List[EnvRunResult]) -> None:
+    durations: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    for result in results:
+        for event in result.timeline:
+            durations.setdefault(event.phase, []).append(event.duration)
+    if not any(durations.values()):
+        return
+    print("⏱️  Timing per call (seconds)")
+    print(f"  {'phase':<10} {'count':>7} {'p50':>8} {'p95':>8} {'max':>8} {'total':>9}")
+    for phase, values in durations.items():
+        if len(values) == 0:
+            continue
+        print(
+            f"  {phase:<10} {len(values):>7} {percentile(values, 0.5):>8.3f} {percentile(values, 0.95):>8.3f} {max(values):>8.3f} {sum(values):>9.1f}"
+        )
+    usages = [result.usage for result in results if result.usage is not None]
+    if len(usages) > 0:
+        print("🪙 Tokens and cost")
+        for role in ["agent", "user"]:
+            prompt_tokens = sum(getattr(usage, f"{role}_prompt_tokens") for usage in usages)
+            completion_tokens = sum(getattr(usage, f"{role}_completion_tokens") for usage in usages)
+            cost = sum(getattr(usage, f"{role}_cost") for usage in usages)
+            print(
+                f"  {role}: {prompt_tokens} prompt tokens, {completion_tokens} completion tokens, ${cost:.4f}"
+            )
@@ -0,0 +1,241 @@
+# Copyright Sierra
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from tau_bench.types import EnvRunResult
+
+DEFAULT_METRICS_INTERVAL = 10.0
+RATE_WINDOW_SECONDS = 300.0
+PASS_RATE_WINDOW = 50
+METRIC_PREFIX = "tau_bench"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if len(labels) == 0:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                key,
+                str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+            )
+            for key, value in labels.items()
+        )
+        + "}"
+    )
+
+
+class RunTelemetry(object):
+    """Live counters and gauges of a run, rendered in the Prometheus text format.
+
+    The runner reports episodes as they start and finish, and every LLM call is
+    reported through the rate limiter's call listeners. The text is re-rendered every
+    `interval` seconds and written to `metrics_path` and/or served on
+    http://127.0.0.1:`port`/metrics.
+    """
+
+    def __init__(
+        self,
+        labels: Dict[str, str],
+        num_episodes: int,
+        metrics_path: Optional[str] = None,
+        port: Optional[int] = None,
+        interval: float = DEFAULT_METRICS_INTERVAL,
+        extra_gauges: Optional[Callable[[], Dict[str, float]]] = None,
+    ) -> None:
+        self.labels = labels
+        self.num_episodes = num_episodes
+        self.metrics_path = metrics_path
+        self.port = port
+        self.interval = interval
+        self.extra_gauges = extra_gauges
+        self.start_time = time.time()
+        self.in_flight = 0
+        self.num_completed = 0
+        self.num_llm_calls = 0
+        self.num_rate_limited_calls = 0
+        self.errors_by_type: Counter = Counter()
+        self.tokens: Counter = Counter()
+        self.cost: Counter = Counter()
+        self.last_completion_time: Optional[float] = None
+        self._recent_rewards: Deque[float] = deque(maxlen=PASS_RATE_WINDOW)
+        # (completion time, tokens) of the episodes completed in the last RATE_WINDOW_SECONDS
+        self._recent_completions: Deque[Tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self._text = ""
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def episode_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def episode_finished(self, result: EnvRunResult) -> None:
+        now = time.time()
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.num_completed += 1
+            self.last_completion_time = now
+            if "error" in result.info:
+                self.errors_by_type[result.info.get("error_type", "Exception")] += 1
+            self._recent_rewards.append(result.reward)
+            num_tokens = 0
+            if result.usage is not None:
+                for role in ["agent", "user"]:
+                    for kind in ["prompt", "completion"]:
+                        count = getattr(result.usage, f"{role}_{kind}_tokens")
+                        self.tokens[(role, kind)] += count
+                        num_tokens += count
+                    self.cost[role] += getattr(result.usage, f"{role}_cost")
+            self._recent_completions.append((now, num_tokens))
+
+    def llm_call(self, latency: float, rate_limited: bool) -> None:
+        self.llm_calls(1, int(rate_limited))
+
+    def llm_calls(self, num_calls: int, num_rate_limited: int) -> None:
+        """Counts LLM calls made elsewhere, e.g. by the episodes of a worker process."""
+        with self._lock:
+            self.num_llm_calls += num_calls
+            self.num_rate_limited_calls += num_rate_limited
+
+    def render(self) -> str:
+        now = time.time()
+        with self._lock:
+            while (
+                len(self._recent_completions) > 0
+                and self._recent_completions[0][0] < now - RATE_WINDOW_SECONDS
+            ):
+                self._recent_completions.popleft()
+            window = min(RATE_WINDOW_SECONDS, max(now - self.start_time, 1e-9))
+            num_errors = sum(self.errors_by_type.values())
+            samples: List[Tuple[str, str, str, Dict[str, str], float]] = [
+                ("episodes", "gauge", "Episodes scheduled in this run", {}, self.num_episodes),
+                ("episodes_completed_total", "counter", "Episodes completed", {}, self.num_completed),
+                ("episodes_in_flight", "gauge", "Episodes currently running", {}, self.in_flight),
+                (
+                    "episodes_per_minute",
+                    "gauge",
+                    f"Episodes completed per minute over the last {int(RATE_WINDOW_SECONDS)}s",
+                    {},
+                    len(self._recent_completions) * 60 / window,
+                ),
+                (
+                    "tokens_per_second",
+                    "gauge",
+                    f"Tokens of the episodes completed over the last {int(RATE_WINDOW_SECONDS)}s, per second",
+                    {},
+                    sum(tokens for _, tokens in self._recent_completions) / window,
+                ),
+                ("llm_calls_total", "counter", "LLM calls completed", {}, self.num_llm_calls),
+                (
+                    "llm_rate_limited_total",
+                    "counter",
+                    "LLM calls rejected by the provider's rate limits",
+                    {},
+                    self.num_rate_limited_calls,
+                ),
+                (
+                    "error_rate",
+                    "gauge",
+                    "Fraction of the completed episodes that raised an error",
+                    {},
+                    num_errors / self.num_completed if self.num_completed > 0 else 0.0,
+                ),
+                (
+                    "rolling_pass_rate",
+                    "gauge",
+                    f"Fraction of the last {PASS_RATE_WINDOW} completed episodes with reward 1",
+                    {},
+                    sum(1 for reward in self._recent_rewards if abs(reward - 1) <= 1e-6)
+                    / len(self._recent_rewards)
+                    if len(self._recent_rewards) > 0
+                    else 0.0,
+                ),
+                (
+                    "last_completion_timestamp_seconds",
+                    "gauge",
+                    "Unix time of the last completed episode",
+                    {},
+                    self.last_completion_time or self.start_time,
+                ),
+            ]
+            for (role, kind), count in sorted(self.tokens.items()):
+                samples.append(
+                    ("tokens_total", "counter", "LLM tokens of the completed episodes", {"role": role, "kind": kind}, count)
+                )
+            for role, cost in sorted(self.cost.items()):
+                samples.append(
+                    ("cost_dollars_total", "counter", "LLM cost of the completed episodes", {"role": role}, cost)
+                )
+            for error_type, count in sorted(self.errors_by_type.items()):
+                samples.append(
+                    ("episode_errors_total", "counter", "Episodes that raised an error, by exception type", {"type": error_type}, count)
+                )
+        if self.extra_gauges is not None:
+            for name, value in self.extra_gauges().items():
+                samples.append((name, "gauge", name.replace("_", " ").capitalize(), {}, value))
+        lines = []
+        described = set()
+        for name, kind, description, labels, value in samples:
+            name = f"{METRIC_PREFIX}_{name}"
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels({**self.labels, **labels})} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _refresh(self) -> None:
+        self._text = self.render()
+        if self.metrics_path is not None:
+            tmp_path = f"{self.metrics_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(self._text)
+            # node_exporter's textfile collector must never see a partially written file
+            os.replace(tmp_path, self.metrics_path)
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._refresh()
+
+    def start(self) -> None:
+        self._refresh()
+        if self.port is not None:
+            telemetry = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    if self.path.split("?")[0] not in ["/", "/metrics"]:
+                        self.send_error(404)
+                        return
+                    body = telemetry._text.encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args) -> None:
+                    pass
+
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), MetricsHandler)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            print(f"📊 Serving metrics on http://127.0.0.1:{self._server.server_port}/metrics")
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._refresh()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,123 @@
+# Copyright Sierra
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from tau_bench.types import EpisodeUsage, TimelineEvent
+
+AGENT_LLM_PHASE = "agent_llm"
+USER_LLM_PHASE = "user_llm"
+TOOL_PHASE = "tool"
+REWARD_PHASE = "reward"
+PHASES = [AGENT_LLM_PHASE, USER_LLM_PHASE, TOOL_PHASE, REWARD_PHASE]
+
+_current_timeline: contextvars.ContextVar[Optional["Timeline"]] = contextvars.ContextVar(
+    "timeline", default=None
+)
+# LLM calls are attributed to the agent unless they are made on behalf of the user simulator
+_llm_phase: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_phase", default=AGENT_LLM_PHASE
+)
+
+
+class Timeline(object):
+    """Collects the timed events of one episode.
+
+    The timeline is bound to the current context, so it follows the episode into
+    threads started with `asyncio.to_thread` and into the tasks it awaits.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.monotonic()
+        self.events: List[TimelineEvent] = []
+        self._lock = threading.Lock()
+
+    def add(self, event: TimelineEvent) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def get_usage(self) -> EpisodeUsage:
+        usage = EpisodeUsage()
+        for event in self.events:
+            if event.phase == AGENT_LLM_PHASE:
+                usage.agent_prompt_tokens += event.prompt_tokens or 0
+                usage.agent_completion_tokens += event.completion_tokens or 0
+                usage.agent_cost += event.cost or 0.0
+            elif event.phase == USER_LLM_PHASE:
+                usage.user_prompt_tokens += event.prompt_tokens or 0
+                usage.user_completion_tokens += event.completion_tokens or 0
+                usage.user_cost += event.cost or 0.0
+        return usage
+
+
+@contextmanager
+def record_timeline() -> Iterator[Timeline]:
+    timeline = Timeline()
+    token = _current_timeline.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _current_timeline.reset(token)
+
+
+@contextmanager
+def timed(phase: str, name: Optional[str] = None) -> Iterator[None]:
+    """Adds an event for the duration of the block to the current timeline, if any."""
+    timeline = _current_timeline.get()
+    if timeline is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        timeline.add(
+            TimelineEvent(
+                phase=phase,
+                name=name,
+                start=start - timeline.start,
+                duration=time.monotonic() - start,
+            )
+        )
+
+
+@contextmanager
+def untimed() -> Iterator[None]:
+    """Leaves the events of the block out of the current timeline."""
+    token = _current_timeline.set(None)
+    try:
+        yield
+    finally:
+        _current_timeline.reset(token)
+
+
+@contextmanager
+def user_llm_calls() -> Iterator[None]:
+    """Attributes the LLM calls made in the block to the user simulator."""
+    token = _llm_phase.set(USER_LLM_PHASE)
+    try:
+        yield
+    finally:
+        _llm_phase.reset(token)
+
+
+def record_llm_call(start: float, res: Any) -> None:
+    timeline = _current_timeline.get()
+    if timeline is None:
+        return
+    usage = getattr(res, "usage", None)
+    hidden_params = getattr(res, "_hidden_params", None) or {}
+    timeline.add(
+        TimelineEvent(
+            phase=_llm_phase.get(),
+            name=getattr(res, "model", None),
+            start=start - timeline.start,
+            duration=time.monotonic() - start,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            cost=hidden_params.get("response_cost"),
+        )
+    )
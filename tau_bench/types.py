@@ -8,6 +8,9 @@ if TYPE_CHECKING:
 
 RESPOND_ACTION_NAME = "respond"
 RESPOND_ACTION_FIELD_NAME = "content"
+# the offline provider of tau_bench.mock_provider, defined here so that checking for it
+# does not import litellm's custom provider API
+MOCK_PROVIDER = "tau-mock"
 
 
 class Action(BaseModel):
@@ -65,12 +68,34 @@ class EnvResetResponse(BaseModel):
     info: EnvInfo
 
 
+class TimelineEvent(BaseModel):
+    phase: str
+    name: Optional[str] = None
+    # seconds since the start of the episode
+    start: float
+    duration: float
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost: Optional[float] = None
+
+
+class EpisodeUsage(BaseModel):
+    agent_prompt_tokens: int = 0
+    agent_completion_tokens: int = 0
+    agent_cost: float = 0.0
+    user_prompt_tokens: int = 0
+    user_completion_tokens: int = 0
+    user_cost: float = 0.0
+
+
 class EnvRunResult(BaseModel):
     task_id: int
     reward: float
     info: Dict[str, Any]
     traj: List[Dict[str, Any]]
     trial: int
+    timeline: List[TimelineEvent] = []
+    usage: Optional[EpisodeUsage] = None
 
 
 class RunConfig(BaseModel):
@@ -95,6 +120,22 @@ class RunConfig(BaseModel):
     shuffle: int = 0
     user_strategy: str = "llm"
     few_shot_displays_path: Optional[str] = None
+    data_hash_mode: str = "full"
+    data_variant: Optional[str] = None
+    mock_latency: str = "0"
+    executor: str = "thread"
+    num_processes: Optional[int] = None
+    resume_from: Optional[str] = None
+    schedule: str = "trial-major"
+    rate_limits: List[str] = []
+    adaptive_concurrency: bool = False
+    min_concurrency: int = 1
+    metrics_path: Optional[str] = None
+    metrics_port: Optional[int] = None
+    metrics_interval: float = 10.0
+    results_db: Optional[str] = None
+    dedup_results: bool = False
+    columnar_search: bool = False
 
     @model_validator(mode="after")
     def validate_agent(self):
@@ -0,0 +1,44 @@
+# Copyright Sierra
+
+from typing import Any, Dict
+
+import pytest
+
+from tau_bench.envs.airline.data import load_data as load_airline_data
+from tau_bench.envs.snapshot import clear_snapshots, copy_data, load_snapshot_view
+
+
+def load_data() -> Dict[str, Any]:
+    """A tiny domain database, for the tests of snapshots, rollback and hashing."""
+    return {
+        "users": {
+            "alice": {"name": "Alice", "orders": ["#1"]},
+            "bob": {"name": "Bob", "orders": []},
+        },
+        "orders": {"#1": {"status": "pending", "items": [1, 2]}},
+    }
+
+
+@pytest.fixture
+def fresh_snapshots():
+    clear_snapshots()
+    yield
+    clear_snapshots()
+
+
+def mutate_flights(flights: Dict[str, Any]) -> None:
+    flights["HAT001"]["origin"] = "JFK"
+    flights["HAT002"]["dates"]["2024-05-16"]["status"] = "cancelled"
+    flights["HAT003"]["scheduled_arrival_time_est"] = "01:00:00+1"
+
+
+@pytest.fixture(params=["pristine", "mutated", "inserted"])
+def flights(request) -> Dict[str, Any]:
+    """The flights of an airline snapshot view, as is, with mutated records or with an inserted one."""
+    flights = load_snapshot_view(load_airline_data)["flights"]
+    if request.param != "pristine":
+        mutate_flights(flights)
+    if request.param == "inserted":
+        # an inserted record changes the rows, the lookups fall back to a scan
+        flights["HAT999"] = {**copy_data(flights["HAT004"]), "flight_number": "HAT999"}
+    return flights
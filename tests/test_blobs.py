@@ -0,0 +1,87 @@
+# Copyright Sierra
+
+import json
+from typing import List
+
+from tau_bench.blobs import (
+    BLOB_REF_KEY,
+    DEDUP_FORMAT,
+    BlobTable,
+    dedup_results,
+    rehydrate_results,
+)
+from tau_bench.checkpoint import CheckpointWriter, load_checkpoint, write_results
+from tau_bench.types import EnvRunResult
+
+SYSTEM_PROMPT = "You are a helpful airline agent. " * 20
+
+
+def make_results() -> List[EnvRunResult]:
+    return [
+        EnvRunResult(
+            task_id=task_id,
+            reward=float(task_id % 2),
+            info={"task_id": task_id},
+            traj=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Task {task_id}"},
+            ],
+            trial=0,
+        )
+        for task_id in range(3)
+    ]
+
+
+def test_blob_table_round_trip():
+    blob_table = BlobTable(min_length=10)
+    item = {"short": "abc", "long": ["x" * 10, {"nested": "x" * 10}], "count": 3}
+    deduped = blob_table.dedup(item)
+    assert deduped["short"] == "abc"
+    blob_ref = {BLOB_REF_KEY: blob_table.add("x" * 10)}
+    assert deduped["long"] == [blob_ref, {"nested": blob_ref}]
+    assert len(blob_table.blobs) == 1
+    assert blob_table.rehydrate(deduped) == item
+
+
+def test_deduplicated_results_layout(tmp_path):
+    path = str(tmp_path / "results.json")
+    expected = [result.model_dump() for result in make_results()]
+    write_results(expected, path, dedup=True)
+    with open(path) as f:
+        data = json.load(f)
+    assert data["format"] == DEDUP_FORMAT
+    assert list(data["blobs"].values()) == [SYSTEM_PROMPT]
+    assert rehydrate_results(data) == expected
+    assert load_checkpoint(path) == expected
+    # the plain layout is returned as it is
+    assert rehydrate_results(expected) == expected
+    assert rehydrate_results(dedup_results(expected)) == expected
+
+
+def test_deduplicated_checkpoint_writes_each_blob_once(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    writer = CheckpointWriter(path, dedup=True)
+    for result in make_results():
+        writer.write(result)
+    writer.close()
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    # the system prompt is written once, before the first trajectory that references it
+    assert len(lines) == 4
+    blob_key = lines[1]["traj"][0]["content"][BLOB_REF_KEY]
+    assert lines[0] == {BLOB_REF_KEY: blob_key, "content": SYSTEM_PROMPT}
+    assert load_checkpoint(path) == [result.model_dump() for result in make_results()]
+
+
+def test_truncated_deduplicated_checkpoint_keeps_its_blobs(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    writer = CheckpointWriter(path, dedup=True)
+    for result in make_results():
+        writer.write(result)
+    writer.close()
+    with open(path) as f:
+        content = f.read()
+    with open(path, "w") as f:
+        f.write(content[: len(content) - 20])
+    expected = [result.model_dump() for result in make_results()]
+    assert load_checkpoint(path) == expected[:-1]
@@ -0,0 +1,69 @@
+# Copyright Sierra
+
+import json
+from typing import List
+
+from tau_bench.checkpoint import (
+    CheckpointWriter,
+    consolidate_checkpoint,
+    jsonl_path_for,
+    load_checkpoint,
+)
+from tau_bench.types import EnvRunResult
+
+
+def make_results() -> List[EnvRunResult]:
+    return [
+        EnvRunResult(
+            task_id=task_id,
+            reward=float(task_id % 2),
+            info={"task_id": task_id},
+            traj=[{"role": "user", "content": f"Task {task_id}"}],
+            trial=0,
+        )
+        for task_id in range(3)
+    ]
+
+
+def test_jsonl_path_for():
+    assert jsonl_path_for("results/run.json") == "results/run.jsonl"
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    writer = CheckpointWriter(path)
+    for result in make_results():
+        writer.write(result)
+    writer.close()
+    expected = [result.model_dump() for result in make_results()]
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == expected
+    assert load_checkpoint(path) == expected
+    json_path = str(tmp_path / "run.json")
+    assert consolidate_checkpoint(path, json_path) == expected
+    assert load_checkpoint(json_path) == expected
+
+
+def test_writer_appends_to_an_existing_checkpoint(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    results = make_results()
+    for batch in [results[:1], results[1:]]:
+        writer = CheckpointWriter(path)
+        for result in batch:
+            writer.write(result)
+        writer.close()
+    assert load_checkpoint(path) == [result.model_dump() for result in results]
+
+
+def test_truncated_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    writer = CheckpointWriter(path)
+    for result in make_results():
+        writer.write(result)
+    writer.close()
+    with open(path) as f:
+        content = f.read()
+    # the run was killed while writing the last result
+    with open(path, "w") as f:
+        f.write(content[: len(content) - 20])
+    assert load_checkpoint(path) == [result.model_dump() for result in make_results()[:-1]]
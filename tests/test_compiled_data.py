@@ -0,0 +1,49 @@
+# Copyright Sierra
+
+import json
+import os
+
+import pytest
+
+from tau_bench.envs.compiled_data import (
+    COMPILED_FILE_NAME,
+    compile_tables,
+    load_compiled_tables,
+    load_tables,
+)
+
+FILE_NAMES = {"users": "users.json", "orders": "orders.json"}
+
+
+@pytest.fixture
+def folder_path(tmp_path):
+    with open(tmp_path / "users.json", "w") as f:
+        json.dump({"alice": {"name": "Alice"}}, f)
+    with open(tmp_path / "orders.json", "w") as f:
+        json.dump({"#1": {"status": "pending"}}, f)
+    return str(tmp_path)
+
+
+def test_compiled_tables_match_json(folder_path):
+    compile_tables(folder_path, FILE_NAMES)
+    assert load_compiled_tables(folder_path, FILE_NAMES) == load_tables(folder_path, FILE_NAMES)
+    assert sorted(os.listdir(folder_path)) == [COMPILED_FILE_NAME, "orders.json", "users.json"]
+
+
+@pytest.mark.parametrize("length", [0, 4, 12, 20, -1])
+def test_truncated_compiled_file_falls_back_to_json(folder_path, length):
+    path = compile_tables(folder_path, FILE_NAMES)
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(path, "wb") as f:
+        f.write(content[:length])
+    assert load_compiled_tables(folder_path, FILE_NAMES) is None
+    assert load_tables(folder_path, FILE_NAMES)["users"] == {"alice": {"name": "Alice"}}
+
+
+def test_stale_compiled_file_is_ignored(folder_path):
+    compile_tables(folder_path, FILE_NAMES)
+    with open(os.path.join(folder_path, "users.json"), "w") as f:
+        json.dump({"bob": {"name": "Bob"}}, f)
+    assert load_compiled_tables(folder_path, FILE_NAMES) is None
+    assert load_tables(folder_path, FILE_NAMES)["users"] == {"bob": {"name": "Bob"}}
@@ -0,0 +1,47 @@
+# Copyright Sierra
+
+import asyncio
+import threading
+
+from tau_bench.concurrency import AdaptiveConcurrencyController
+
+
+def record_window(controller: AdaptiveConcurrencyController, latency: float) -> None:
+    for _ in range(controller.window_size):
+        controller.record_call(latency)
+
+
+def test_latency_baseline_follows_a_lasting_increase():
+    # a decrease factor of 1 keeps the limit, so no call is discarded as draining
+    controller = AdaptiveConcurrencyController(
+        max_limit=100, initial_limit=10, decrease_factor=1.0, baseline_windows=3, verbose=False
+    )
+    record_window(controller, 1.0)
+    for _ in range(2):
+        record_window(controller, 4.0)
+    assert [decision.reason for decision in controller.decisions] == [
+        "healthy",
+        "latency increased",
+        "latency increased",
+    ]
+    # the fast window is out of the baseline, the slower latency is the new normal
+    record_window(controller, 4.0)
+    assert controller.baseline_p95_latency == 4.0
+    record_window(controller, 4.0)
+    assert controller.decisions[-1].reason == "healthy"
+    assert controller.limit == 12
+
+
+def test_acquire_async_wakes_up_on_release_from_another_thread():
+    controller = AdaptiveConcurrencyController(max_limit=1, initial_limit=1, verbose=False)
+    controller.acquire()
+
+    async def acquire() -> None:
+        waiter = asyncio.ensure_future(controller.acquire_async())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        threading.Timer(0.01, controller.release).start()
+        await asyncio.wait_for(waiter, timeout=5)
+
+    asyncio.run(acquire())
+    assert controller.in_flight == 1
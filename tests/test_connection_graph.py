@@ -0,0 +1,166 @@
+# Copyright Sierra
+
+import json
+import random
+from datetime import date as Date, timedelta
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from tau_bench.envs.airline.tools.connection_graph import search_itineraries, to_segment
+from tau_bench.envs.airline.tools.search_multistop_flight import SearchMultistopFlight
+from tau_bench.envs.airline.tools.sort_flights import (
+    SORT_ATTRIBUTE_STRING_VALUES,
+    SortAttribute,
+    get_sort_value,
+)
+
+AIRPORTS = ["AAA", "BBB", "CCC", "DDD", "EEE"]
+DATES = ["2024-05-01", "2024-05-02", "2024-05-03"]
+
+
+def make_flights(seed: int) -> Dict[str, Any]:
+    """A small random schedule, dense enough for cycles, tight layovers, next-day arrivals and equal prices."""
+    rng = random.Random(seed)
+    flights = {}
+    for i in range(40):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        departure = rng.randrange(0, 24, 2)
+        arrival = departure + rng.choice([2, 4, 6])
+        flights[f"F{i:03d}"] = {
+            "flight_number": f"F{i:03d}",
+            "origin": origin,
+            "destination": destination,
+            "scheduled_departure_time_est": f"{departure:02d}:00:00",
+            "scheduled_arrival_time_est": f"{arrival % 24:02d}:00:00"
+            + ("+1" if arrival >= 24 else ""),
+            "dates": {
+                date: {
+                    "status": rng.choice(["available"] * 4 + ["cancelled"]),
+                    "available_seats": {"basic_economy": 5, "economy": 5, "business": 5},
+                    "prices": {
+                        "basic_economy": rng.choice([49, 50, 100]),
+                        "economy": rng.choice([99, 100, 150]),
+                        "business": rng.choice([300, 400]),
+                    },
+                }
+                for date in DATES
+                if rng.random() < 0.8
+            },
+        }
+    return flights
+
+
+def brute_force_itineraries(
+    flights: Dict[str, Any], origin: str, destination: str, date: str, max_stops: int
+) -> List[List[Dict[str, Any]]]:
+    """Every itinerary, enumerated with a scan of all flights at every step, in table order."""
+    itineraries = []
+
+    def extend(trip: List[Dict[str, Any]], airport: str, flight_date: str, visited: List[str]) -> None:
+        for flight in flights.values():
+            if flight["origin"] != airport:
+                continue
+            if len(trip) > 0:
+                arrival = trip[-1]["scheduled_arrival_time_est"].replace("+1", "")
+                if arrival > flight["scheduled_departure_time_est"]:
+                    continue
+            if flight_date not in flight["dates"] or flight["dates"][flight_date]["status"] != "available":
+                continue
+            segment = to_segment(flight, flight_date)
+            if flight["destination"] == destination:
+                itineraries.append(trip + [segment])
+            elif flight["destination"] not in visited and len(trip) < max_stops:
+                next_date = flight_date
+                if "+1" in flight["scheduled_arrival_time_est"]:
+                    next_date = (Date.fromisoformat(flight_date) + timedelta(days=1)).isoformat()
+                extend(trip + [segment], flight["destination"], next_date, visited + [flight["destination"]])
+
+    extend([], origin, date, [origin])
+    return itineraries
+
+
+def expected_itineraries(
+    itineraries: List[List[Dict[str, Any]]], sort_by: Optional[str], limit: Optional[int]
+) -> List[List[Dict[str, Any]]]:
+    if sort_by is not None:
+        itineraries = sorted(itineraries, key=lambda trip: get_sort_value(trip, SortAttribute(sort_by)))
+    return itineraries if limit is None else itineraries[:limit]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_search_matches_a_brute_force_enumeration(seed):
+    flights = make_flights(seed)
+    for origin in AIRPORTS:
+        for destination in AIRPORTS:
+            if origin == destination:
+                continue
+            for max_stops in range(4):
+                itineraries = brute_force_itineraries(flights, origin, destination, DATES[0], max_stops)
+                assert all(len(trip) <= max_stops + 1 for trip in itineraries)
+                for sort_by in [None] + SORT_ATTRIBUTE_STRING_VALUES:
+                    for limit in [None, 1, 3, 100]:
+                        args = (origin, destination, max_stops, sort_by, limit)
+                        assert search_itineraries(
+                            flights,
+                            origin,
+                            destination,
+                            DATES[0],
+                            max_stops=max_stops,
+                            sort_by=sort_by,
+                            limit=limit,
+                        ) == expected_itineraries(itineraries, sort_by, limit), args
+
+
+def test_layovers_follow_the_schedule():
+    flights = make_flights(0)
+    trips = [
+        trip
+        for origin in AIRPORTS
+        for destination in AIRPORTS
+        if origin != destination
+        for trip in search_itineraries(flights, origin, destination, DATES[0], max_stops=3)
+    ]
+    # the random schedule has tight and next-day connections, so both rules are exercised
+    assert any(
+        trip[i]["scheduled_arrival_time_est"] == trip[i + 1]["scheduled_departure_time_est"]
+        for trip in trips
+        for i in range(len(trip) - 1)
+    )
+    assert any(trip[-1]["date"] != DATES[0] for trip in trips)
+    for trip in trips:
+        airports = [trip[0]["origin"]] + [segment["destination"] for segment in trip]
+        assert len(set(airports)) == len(airports)
+        for segment, next_segment in zip(trip, trip[1:]):
+            assert segment["destination"] == next_segment["origin"]
+            arrival = segment["scheduled_arrival_time_est"]
+            assert arrival.replace("+1", "") <= next_segment["scheduled_departure_time_est"]
+            assert (next_segment["date"] != segment["date"]) == ("+1" in arrival)
+
+
+def test_search_on_the_airline_flights(flights):
+    for origin, destination in [("JFK", "SEA"), ("ORD", "MIA"), ("SFO", "BOS")]:
+        itineraries = brute_force_itineraries(flights, origin, destination, "2024-05-16", 2)
+        assert len(itineraries) > 0
+        for sort_by in [None, "price_any_class", "price_business", "departure_time"]:
+            for limit in [None, 5]:
+                assert search_itineraries(
+                    flights,
+                    origin,
+                    destination,
+                    "2024-05-16",
+                    max_stops=2,
+                    sort_by=sort_by,
+                    limit=limit,
+                ) == expected_itineraries(itineraries, sort_by, limit), (origin, destination)
+
+
+def test_multistop_tool():
+    data = {"flights": make_flights(1)}
+    itineraries = brute_force_itineraries(data["flights"], "AAA", "EEE", DATES[0], 2)
+    assert json.loads(SearchMultistopFlight.invoke(data, "AAA", "EEE", DATES[0])) == (
+        expected_itineraries(itineraries, "price_any_class", 20)
+    )
+    assert SearchMultistopFlight.invoke(data, "AAA", "EEE", DATES[0], max_stops=-1).startswith("Error")
+    assert SearchMultistopFlight.invoke(data, "AAA", "EEE", DATES[0], limit=0).startswith("Error")
+    assert SearchMultistopFlight.invoke(data, "AAA", "EEE", DATES[0], sort_by="stops").startswith("Error")
@@ -0,0 +1,56 @@
+# Copyright Sierra
+
+from typing import Any, Dict
+
+import pytest
+from conftest import load_data
+
+from tau_bench.envs.base import MerkleDataHasher
+from tau_bench.envs.snapshot import load_snapshot_view, rollback_data
+
+pytestmark = pytest.mark.usefixtures("fresh_snapshots")
+
+
+def mutate(data: Dict[str, Any]) -> None:
+    data["users"]["alice"]["orders"].append("#2")
+    data["orders"]["#2"] = {"status": "pending", "items": [3]}
+    data["orders"]["#1"]["status"] = "cancelled"
+    del data["users"]["bob"]
+
+
+def test_incremental_hash_matches_a_full_rehash():
+    hasher = MerkleDataHasher(load_data)
+    view = load_snapshot_view(load_data)
+    plain = load_data()
+    assert hasher.get_data_hash(view) == hasher.get_data_hash(plain)
+    mutate(view)
+    mutate(plain)
+    # the view rehashes its touched records only, the plain dicts are hashed from scratch
+    assert hasher.get_data_hash(view) == hasher.get_data_hash(plain)
+    assert hasher.get_data_hash(view) != hasher.get_data_hash(load_data())
+
+
+def test_hash_ignores_reads_and_reverted_writes():
+    hasher = MerkleDataHasher(load_data)
+    view = load_snapshot_view(load_data)
+    pristine_hash = hasher.get_data_hash(view)
+    view["users"]["alice"]["name"]
+    view["users"].get("zzz")
+    view["orders"]["#1"]["status"] = "cancelled"
+    view["orders"]["#1"]["status"] = "pending"
+    assert hasher.get_data_hash(view) == pristine_hash
+
+
+def test_hash_after_rollback_matches_the_pristine_data():
+    hasher = MerkleDataHasher(load_data)
+    view = load_snapshot_view(load_data)
+    mutate(view)
+    rollback_data(view, load_data)
+    assert hasher.get_data_hash(view) == hasher.get_data_hash(load_data())
+
+
+def test_hash_depends_on_the_keys_of_the_records():
+    hasher = MerkleDataHasher(load_data)
+    data = load_data()
+    data["users"]["carol"] = data["users"].pop("bob")
+    assert hasher.get_data_hash(data) != hasher.get_data_hash(load_data())
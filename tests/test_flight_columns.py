@@ -0,0 +1,45 @@
+# Copyright Sierra
+
+from typing import Any, Dict
+
+from tau_bench.envs.airline.tools import flight_columns
+from tau_bench.envs.airline.tools.search_direct_flight import SearchDirectFlightWithoutSort
+from tau_bench.envs.airline.tools.search_onestop_flight import SearchOnestopFlightWithoutSort
+
+AIRPORTS = ["JFK", "LAX", "SFO", "ORD", "SEA", "XXX"]
+DATES = ["2024-05-16", "2024-05-30", "2024-05-1x", 20240516]
+
+
+def search(tool: Any, data: Dict[str, Any], *args: Any) -> Any:
+    try:
+        return tool.invoke(data, *args)
+    except Exception as e:
+        return type(e)
+
+
+def test_columnar_search_matches_the_nested_loop(flights):
+    data = {"flights": flights}
+    for origin in AIRPORTS[:4]:
+        for destination in AIRPORTS:
+            for date in DATES:
+                args = (origin, destination, date)
+                flight_columns.disable_columnar_search()
+                expected = [
+                    search(SearchDirectFlightWithoutSort, data, *args),
+                    search(SearchOnestopFlightWithoutSort, data, *args),
+                ]
+                flight_columns.enable_columnar_search()
+                try:
+                    assert [
+                        search(SearchDirectFlightWithoutSort, data, *args),
+                        search(SearchOnestopFlightWithoutSort, data, *args),
+                    ] == expected, args
+                finally:
+                    flight_columns.disable_columnar_search()
+
+
+def test_view_is_only_derived_from_aligned_tables(flights):
+    view = flight_columns.get_flight_columns_view(flights)
+    # an inserted flight changes the rows of the table, the searches then use the loop
+    assert (view is None) == ("HAT999" in flights)
+    assert flight_columns.get_flight_columns_view(dict(flights)) is None
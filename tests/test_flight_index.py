@@ -0,0 +1,37 @@
+# Copyright Sierra
+
+from typing import Any, Dict, List
+
+from tau_bench.envs.airline.data import load_data as load_airline_data
+from tau_bench.envs.airline.tools.flight_index import (
+    flights_between,
+    flights_from,
+    flights_to,
+)
+
+AIRPORTS = ["JFK", "LAX", "SFO", "ORD", "SEA", "XXX"]
+
+
+def scan(flights: Dict[str, Any], **fields: str) -> List[Dict[str, Any]]:
+    return [
+        flight
+        for flight in flights.values()
+        if all(flight[name] == value for name, value in fields.items())
+    ]
+
+
+def test_flight_index_matches_a_scan(flights):
+    for origin in AIRPORTS:
+        assert flights_from(flights, origin) == scan(flights, origin=origin)
+        assert flights_to(flights, origin) == scan(flights, destination=origin)
+        for destination in AIRPORTS:
+            assert flights_between(flights, origin, destination) == scan(
+                flights, origin=origin, destination=destination
+            )
+
+
+def test_flight_index_on_a_plain_dict():
+    flights = load_airline_data()["flights"]
+    assert flights_between(flights, "JFK", "LAX") == scan(
+        flights, origin="JFK", destination="LAX"
+    )
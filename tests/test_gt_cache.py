@@ -0,0 +1,82 @@
+# Copyright Sierra
+
+import importlib
+import inspect
+import sys
+
+import pytest
+from conftest import load_data
+
+from tau_bench.envs import gt_cache
+from tau_bench.envs.snapshot import snapshot_fingerprint
+
+pytestmark = pytest.mark.usefixtures("fresh_snapshots")
+
+TOOL_SOURCE = '''
+from tau_bench.envs.tool import Tool
+
+
+class CancelOrder(Tool):
+    @staticmethod
+    def invoke(data, order_id):
+        data["orders"][order_id]["status"] = "{status}"
+        return "ok"
+'''
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(gt_cache.CACHE_DIR_ENV_VAR, str(tmp_path / "cache"))
+    monkeypatch.setattr(gt_cache, "_entries", None)
+    gt_cache.enable_cache()
+    return tmp_path / "cache"
+
+
+def load_tool(tmp_path, monkeypatch, status: str) -> type:
+    (tmp_path / "fake_tools.py").write_text(TOOL_SOURCE.format(status=status))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    sys.modules.pop("fake_tools", None)
+    importlib.invalidate_caches()
+    return importlib.import_module("fake_tools").CancelOrder
+
+
+def test_store_and_lookup(cache_dir, monkeypatch):
+    assert gt_cache.lookup("key") is None
+    gt_cache.store("key", "hash")
+    assert gt_cache.lookup("key") == "hash"
+    # another process reads the file
+    monkeypatch.setattr(gt_cache, "_entries", None)
+    assert gt_cache.lookup("key") == "hash"
+    assert [path.name for path in cache_dir.iterdir() if path.suffix == ".tmp"] == []
+    gt_cache.disable_cache()
+    assert gt_cache.lookup("key") is None
+    gt_cache.enable_cache()
+
+
+def test_changing_a_tool_changes_the_fingerprint(tmp_path, monkeypatch):
+    cancelled = gt_cache.tools_fingerprint([load_tool(tmp_path, monkeypatch, "cancelled")])
+    assert gt_cache.tools_fingerprint([load_tool(tmp_path, monkeypatch, "cancelled")]) == cancelled
+    assert gt_cache.tools_fingerprint([load_tool(tmp_path, monkeypatch, "canceled")]) != cancelled
+
+
+def test_fingerprint_without_sources(tmp_path, monkeypatch):
+    def getsource(module):
+        raise OSError("could not get source code")
+
+    monkeypatch.setattr(inspect, "getsource", getsource)
+    cancelled = gt_cache.tools_fingerprint([load_tool(tmp_path, monkeypatch, "cancelled")])
+    # the bytecode is hashed instead
+    assert gt_cache.tools_fingerprint([load_tool(tmp_path, monkeypatch, "canceled")]) != cancelled
+
+
+def test_changing_the_data_or_the_version_changes_the_key(monkeypatch):
+    def load_other_data():
+        data = load_data()
+        data["orders"]["#1"]["status"] = "cancelled"
+        return data
+
+    key = gt_cache.make_key(snapshot_fingerprint(load_data), "task")
+    assert gt_cache.make_key(snapshot_fingerprint(load_data), "task") == key
+    assert gt_cache.make_key(snapshot_fingerprint(load_other_data), "task") != key
+    monkeypatch.setattr(gt_cache, "GT_CACHE_VERSION", gt_cache.GT_CACHE_VERSION + 1)
+    assert gt_cache.make_key(snapshot_fingerprint(load_data), "task") != key
@@ -0,0 +1,100 @@
+# Copyright Sierra
+
+import pytest
+
+from tau_bench.rate_limit import (
+    VLLM_PROVIDER,
+    RateLimit,
+    RateLimiter,
+    TokenBucket,
+    _split_provider,
+    parse_rate_limit,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_parse_rate_limit():
+    assert parse_rate_limit("openai:gpt-4o=500:30000")[0] == ("openai", "gpt-4o")
+    key, limit = parse_rate_limit("anthropic:*=:80000")
+    assert key == ("anthropic", "*")
+    assert (limit.requests_per_minute, limit.tokens_per_minute) == (None, 80000)
+    with pytest.raises(ValueError):
+        parse_rate_limit("openai=500:30000")
+
+
+def test_bucket_refills_per_minute():
+    clock = FakeClock()
+    # 60 per minute is one unit per second
+    bucket = TokenBucket(60, clock)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    # later callers queue behind the earlier reservations
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.advance(0.5)
+    assert bucket.reserve(1) == pytest.approx(2.5)
+    clock.advance(3600)
+    # the balance never exceeds the capacity
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(30) == pytest.approx(30.0)
+
+
+def test_bucket_caps_oversized_calls_and_refunds():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock)
+    # a call larger than the budget waits for a full bucket only
+    assert bucket.reserve(10000) == 0.0
+    assert bucket.reserve(100) == pytest.approx(10.0)
+    bucket.adjust(-1000)
+    assert bucket.balance == 600
+
+
+def test_reservation_settles_the_estimate():
+    clock = FakeClock()
+    limiter = RateLimiter({("openai", "gpt-4o"): RateLimit(tokens_per_minute=600)}, clock)
+    reservation, wait = limiter._reserve("openai", "gpt-4o", 100)
+    assert wait == 0.0
+    reservation.settle(400)
+    _, token_bucket = limiter._get_buckets("openai", "gpt-4o")
+    assert token_bucket.balance == pytest.approx(200)
+    # settling twice does not charge twice
+    reservation.settle(400)
+    assert token_bucket.balance == pytest.approx(200)
+
+
+def test_buckets_are_keyed_by_provider_and_model():
+    clock = FakeClock()
+    limiter = RateLimiter(
+        {
+            ("openai", "gpt-4o"): RateLimit(requests_per_minute=60),
+            ("openai", "*"): RateLimit(requests_per_minute=120),
+        },
+        clock,
+    )
+    for _ in range(60):
+        assert limiter._reserve("openai", "gpt-4o", 0)[1] == 0.0
+    assert limiter._reserve("openai", "gpt-4o", 0)[1] == pytest.approx(1.0)
+    # the wildcard gives every other model of the provider its own buckets
+    for model in ["gpt-4o-mini", "o1"]:
+        for _ in range(120):
+            assert limiter._reserve("openai", model, 0)[1] == 0.0
+        assert limiter._reserve("openai", model, 0)[1] == pytest.approx(0.5)
+    # providers without a limit never wait
+    for _ in range(1000):
+        assert limiter._reserve("anthropic", "gpt-4o", 0)[1] == 0.0
+
+
+def test_vllm_calls_share_the_litellm_provider_key():
+    assert _split_provider({"model": f"{VLLM_PROVIDER}/my-model"}) == (VLLM_PROVIDER, "my-model")
+    assert _split_provider(
+        {"model": "my-model", "custom_llm_provider": VLLM_PROVIDER}
+    ) == (VLLM_PROVIDER, "my-model")
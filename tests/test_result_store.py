@@ -0,0 +1,69 @@
+# Copyright Sierra
+
+from typing import List
+
+import pytest
+
+from tau_bench.result_store import ResultStore
+from tau_bench.run import display_metrics
+from tau_bench.types import EnvRunResult, EpisodeUsage, TimelineEvent
+
+SYSTEM_PROMPT = "You are a helpful retail agent. " * 20
+# successful trials out of 3 for each task: pass^1 = 1 / 2, pass^2 = 1 / 3, pass^3 = 1 / 4
+SUCCESSES = {0: 3, 1: 2, 2: 1, 3: 0}
+
+
+def make_results() -> List[EnvRunResult]:
+    results = []
+    for trial in range(3):
+        for task_id, num_successes in SUCCESSES.items():
+            results.append(
+                EnvRunResult(
+                    task_id=task_id,
+                    reward=1.0 if trial < num_successes else 0.0,
+                    info={"task_id": task_id},
+                    traj=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": f"Task {task_id}, trial {trial}"},
+                    ],
+                    trial=trial,
+                    timeline=[
+                        TimelineEvent(phase="agent", start=0.0, duration=1.5, prompt_tokens=100),
+                        TimelineEvent(phase="env", name="think", start=1.5, duration=0.5),
+                    ],
+                    usage=EpisodeUsage(agent_prompt_tokens=100, agent_cost=0.01, user_cost=0.02),
+                )
+            )
+    return results
+
+
+def test_results_round_trip(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    run_id = store.add_run({"model": "gpt-4o", "env": "retail", "task_split": "test"})
+    other_run_id = store.add_run({"model": "gpt-4o-mini", "env": "retail", "task_split": "test"})
+    for result in make_results():
+        store.add_result(run_id, result)
+    store.add_result(other_run_id, make_results()[0])
+    assert store.load_results(run_id) == sorted(
+        make_results(), key=lambda result: (result.trial, result.task_id)
+    )
+    [run] = store.find_runs(model="gpt-4o", env="retail")
+    assert run["id"] == run_id
+    assert run["num_episodes"] == 12
+    assert run["avg_reward"] == 0.5
+    store.close()
+
+
+def test_metrics_match_display_metrics(tmp_path, capsys):
+    store = ResultStore(str(tmp_path / "results.db"))
+    run_id = store.add_run({"model": "gpt-4o", "env": "retail"})
+    for result in make_results():
+        store.add_result(run_id, result)
+    metrics = store.get_metrics(run_id)
+    store.close()
+    assert metrics["pass_hat_ks"] == pytest.approx({1: 1 / 2, 2: 1 / 3, 3: 1 / 4})
+    display_metrics(make_results())
+    assert capsys.readouterr().out.splitlines() == [
+        f"🏆 Average reward: {metrics['avg_reward']}",
+        "📈 Pass^k",
+    ] + [f"  k={k}: {pass_hat_k}" for k, pass_hat_k in metrics["pass_hat_ks"].items()]
@@ -0,0 +1,70 @@
+# Copyright Sierra
+
+import json
+
+import pytest
+
+from tau_bench.agents.tool_calling_agent import ToolCallingAgent
+from tau_bench.checkpoint import CheckpointWriter, load_checkpoint
+from tau_bench.envs import gt_cache
+from tau_bench.mock_provider import GROUND_TRUTH_MODEL, MOCK_PROVIDER
+from tau_bench.run import run
+from tau_bench.types import EnvRunResult, RunConfig
+
+RunConfig.model_rebuild(_types_namespace={"ToolCallingAgent": ToolCallingAgent})
+
+
+def make_result(task_id: int, trial: int, **info) -> EnvRunResult:
+    return EnvRunResult(task_id=task_id, reward=1.0, info=info, traj=[], trial=trial)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch) -> RunConfig:
+    monkeypatch.setenv(gt_cache.CACHE_DIR_ENV_VAR, str(tmp_path / "cache"))
+    monkeypatch.setattr(gt_cache, "_entries", None)
+    return RunConfig(
+        model_provider=MOCK_PROVIDER,
+        user_model_provider=MOCK_PROVIDER,
+        model=GROUND_TRUTH_MODEL,
+        user_model=GROUND_TRUTH_MODEL,
+        agent_strategy="tool-calling",
+        env="retail",
+        start_index=0,
+        end_index=3,
+        num_trials=2,
+        log_dir=str(tmp_path / "results"),
+    )
+
+
+def test_resume_runs_only_the_missing_scheduled_episodes(config, tmp_path):
+    checkpoint_path = str(tmp_path / "interrupted.jsonl")
+    writer = CheckpointWriter(checkpoint_path)
+    for result in [
+        make_result(0, 0, resumed=True),
+        make_result(2, 1, resumed=True),
+        # raised an error, so it is run again
+        make_result(1, 0, error="timeout", resumed=True),
+        # episodes this run does not schedule: another task and another trial
+        make_result(7, 0, resumed=True),
+        make_result(1, 3, resumed=True),
+    ]:
+        writer.write(result)
+    writer.close()
+    config.resume_from = checkpoint_path
+
+    results = run(config)
+
+    episodes = sorted((result.trial, result.task_id) for result in results)
+    assert episodes == [(trial, task_id) for trial in range(2) for task_id in range(3)]
+    resumed = sorted(
+        (result.trial, result.task_id) for result in results if result.info.get("resumed")
+    )
+    assert resumed == [(0, 0), (1, 2)]
+    # the other episodes were run, with the ground truth actions of the mock provider
+    assert all(result.reward == 1.0 for result in results)
+    result_paths = list((tmp_path / "results").glob("*.json"))
+    assert len(result_paths) == 1
+    with open(result_paths[0]) as f:
+        saved = json.load(f)
+    assert sorted((result["trial"], result["task_id"]) for result in saved) == episodes
+    assert load_checkpoint(str(result_paths[0])) == saved
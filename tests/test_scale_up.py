@@ -0,0 +1,43 @@
+# Copyright Sierra
+
+import random
+import string
+
+import pytest
+
+from tau_bench.envs.airline.data import load_data as load_airline_data
+from tau_bench.envs.scale_up import IdAllocator, airport_code_length, scale_airline_data
+
+
+def test_airport_codes_stay_unique_at_a_large_factor():
+    data = load_airline_data()
+    # the schedule alone decides the airports, the dates, users and reservations only slow the copies down
+    data = {
+        "flights": {
+            flight_number: {**flight, "dates": {}} for flight_number, flight in data["flights"].items()
+        },
+        "users": {},
+        "reservations": {},
+    }
+    airports = {flight["origin"] for flight in data["flights"].values()}
+    factor = 1000
+    # more codes than three letters allow
+    assert len(airports) * factor > 26**3
+    flights = scale_airline_data(data, factor)["flights"]
+    assert len(flights) == len(data["flights"]) * factor
+    codes = {flight[field] for flight in flights.values() for field in ["origin", "destination"]}
+    # every copy has its own airports, none shared with another copy or the original data
+    assert len(codes) == len(airports) * factor
+    assert {len(code) for code in codes - airports} == {4}
+
+
+def test_small_factors_keep_three_letter_codes():
+    assert airport_code_length(20 * 10) == 3
+    assert airport_code_length(20 * 1000) == 4
+
+
+def test_exhausted_id_space_raises():
+    ids = IdAllocator(random.Random(0), {"A", "B"})
+    assert ids.new(lambda rng: rng.choice(string.ascii_uppercase[:3])) == "C"
+    with pytest.raises(ValueError):
+        ids.new(lambda rng: rng.choice(string.ascii_uppercase[:3]))
@@ -0,0 +1,62 @@
+# Copyright Sierra
+
+import random
+
+import pytest
+
+from tau_bench.run import schedule_episodes
+
+IDXS = [3, 1, 2]
+
+
+def test_trial_major():
+    assert schedule_episodes(IDXS, num_trials=2) == [
+        (0, 3),
+        (0, 1),
+        (0, 2),
+        (1, 3),
+        (1, 1),
+        (1, 2),
+    ]
+
+
+def test_trial_major_shuffles_within_each_trial():
+    random.seed(0)
+    episodes = schedule_episodes(list(range(20)), num_trials=3, shuffle=True)
+    for trial in range(3):
+        trial_episodes = episodes[trial * 20 : (trial + 1) * 20]
+        assert {episode[0] for episode in trial_episodes} == {trial}
+        assert sorted(idx for _, idx in trial_episodes) == list(range(20))
+    assert [idx for _, idx in episodes[:20]] != list(range(20))
+
+
+def test_interleaved():
+    assert schedule_episodes(IDXS, num_trials=2, schedule="interleaved") == [
+        (0, 3),
+        (1, 3),
+        (0, 1),
+        (1, 1),
+        (0, 2),
+        (1, 2),
+    ]
+
+
+def test_longest_first_is_stable():
+    episodes = schedule_episodes(
+        IDXS,
+        num_trials=2,
+        schedule="longest-first",
+        estimated_lengths={1: 5, 2: 5, 3: 1},
+    )
+    assert episodes == [(0, 1), (1, 1), (0, 2), (1, 2), (0, 3), (1, 3)]
+
+
+def test_shuffled_keeps_every_episode():
+    random.seed(0)
+    episodes = schedule_episodes(IDXS, num_trials=2, schedule="shuffled")
+    assert sorted(episodes) == sorted((trial, idx) for trial in range(2) for idx in IDXS)
+
+
+def test_unknown_schedule():
+    with pytest.raises(ValueError):
+        schedule_episodes(IDXS, num_trials=1, schedule="random")
@@ -0,0 +1,71 @@
+# Copyright Sierra
+
+import pytest
+from conftest import load_data
+
+from tau_bench.envs.snapshot import (
+    TrackedTable,
+    load_snapshot,
+    load_snapshot_view,
+    rollback_data,
+)
+
+pytestmark = pytest.mark.usefixtures("fresh_snapshots")
+
+
+def test_view_copies_records_on_access():
+    data = load_snapshot_view(load_data)
+    snapshot = load_snapshot(load_data)
+    assert isinstance(data["users"], TrackedTable)
+    data["users"]["alice"]["orders"].append("#2")
+    assert snapshot["users"]["alice"]["orders"] == ["#1"]
+    assert data["users"].touched_keys == {"alice"}
+
+
+def test_iterating_does_not_touch_keys():
+    data = load_snapshot_view(load_data)
+    assert [user["name"] for user in data["users"].values()] == ["Alice", "Bob"]
+    assert data["users"].touched_keys == set()
+
+
+def test_rollback_restores_mutated_inserted_and_deleted_records():
+    data = load_snapshot_view(load_data)
+    data["users"]["alice"]["name"] = "Mallory"
+    data["users"]["carol"] = {"name": "Carol", "orders": []}
+    del data["orders"]["#1"]
+    rollback_data(data, load_data)
+    assert data == load_data()
+    assert list(data["orders"]) == ["#1"]
+    assert all(len(table.touched_keys) == 0 for table in data.values())
+
+
+def test_rollback_after_missing_key_lookups():
+    data = load_snapshot_view(load_data)
+    users = data["users"]
+    assert users.get("zzz") is None
+    with pytest.raises(KeyError):
+        users["zzz"]
+    assert users.pop("zzz", None) is None
+    with pytest.raises(KeyError):
+        del users["zzz"]
+    assert users.touched_keys == set()
+    rollback_data(data, load_data)
+    assert data == load_data()
+
+
+def test_rollback_after_insert_then_delete():
+    data = load_snapshot_view(load_data)
+    data["users"]["carol"] = {"name": "Carol", "orders": []}
+    del data["users"]["carol"]
+    data["users"].setdefault("dave", {"name": "Dave", "orders": []})
+    rollback_data(data, load_data)
+    assert data == load_data()
+    assert list(data["users"]) == ["alice", "bob"]
+
+
+def test_rollback_keeps_key_order_after_deleting_a_pristine_record():
+    data = load_snapshot_view(load_data)
+    del data["users"]["alice"]
+    data["users"]["alice"] = {"name": "Alice", "orders": ["#1"]}
+    rollback_data(data, load_data)
+    assert list(data["users"]) == ["alice", "bob"]
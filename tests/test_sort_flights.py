@@ -0,0 +1,74 @@
+# Copyright Sierra
+
+import random
+from typing import Any, List
+
+import pytest
+
+from tau_bench.envs.airline.data import load_data as load_airline_data
+from tau_bench.envs.airline.tools.search_direct_flight import SearchDirectFlightWithoutSort
+from tau_bench.envs.airline.tools.search_onestop_flight import SearchOnestopFlightWithoutSort
+from tau_bench.envs.airline.tools.sort_flights import (
+    MIN_VECTORIZED_SORT_SIZE,
+    SORT_ATTRIBUTE_STRING_VALUES,
+    SortAttribute,
+    get_sort_value,
+    rank_sort_values,
+    sort_flights,
+)
+
+AIRPORTS = ["JFK", "SEA", "ORD", "MIA", "SFO", "BOS", "LAX"]
+
+
+def load_trips() -> List[Any]:
+    """Direct flights and one-stop trips of the airline data, as the search tools return them."""
+    data = load_airline_data()
+    trips = []
+    for origin in AIRPORTS:
+        for destination in AIRPORTS:
+            trips += SearchDirectFlightWithoutSort.invoke(data, origin, destination, "2024-05-16")
+            trips += SearchOnestopFlightWithoutSort.invoke(data, origin, destination, "2024-05-16")
+    return trips
+
+
+def old_sort(trips: List[Any], sort_by: SortAttribute) -> List[Any]:
+    return sorted(trips, key=lambda trip: get_sort_value(trip, sort_by))
+
+
+def ids(trips: List[Any]) -> List[int]:
+    # equal trips compare equal, the identities show whether ties kept their order
+    return [id(trip) for trip in trips]
+
+
+@pytest.mark.parametrize("sort_by", SORT_ATTRIBUTE_STRING_VALUES)
+def test_sort_matches_sorted_on_airline_trips(sort_by):
+    sort_by = SortAttribute(sort_by)
+    trips = load_trips()
+    assert any(type(trip) is dict for trip in trips) and any(type(trip) is list for trip in trips)
+    assert len(trips) >= MIN_VECTORIZED_SORT_SIZE
+    values = [get_sort_value(trip, sort_by) for trip in trips]
+    assert len(set(values)) < len(values), "no ties to check the stability on"
+    descending = sorted(trips, key=lambda trip: get_sort_value(trip, sort_by), reverse=True)
+    shuffled = random.Random(0).sample(trips, len(trips))
+    for order in [trips, trips[::-1], descending, shuffled]:
+        expected = old_sort(order, sort_by)
+        assert ids(sort_flights(order, sort_by)) == ids(expected)
+        for limit in [0, 1, 7, len(order) - 1, len(order) + 1]:
+            assert ids(sort_flights(order, sort_by, limit)) == ids(expected[:limit])
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [random.Random(0).randrange(5) for _ in range(200)],
+        list(range(100, 0, -1)) * 2,
+        [random.Random(1).choice([0.5, -1.0, 2, 3.25]) for _ in range(100)],
+        [random.Random(2).choice(["06:00:00", "23:30:00+1", "12:00:00"]) for _ in range(100)],
+        [2**60 + i % 3 for i in range(50)],
+    ],
+)
+def test_rank_sort_values_is_a_stable_sort(values):
+    expected = sorted(range(len(values)), key=values.__getitem__)
+    assert rank_sort_values(values) == expected
+    for limit in [0, 1, 10, len(values)]:
+        assert rank_sort_values(values, limit) == expected[:limit]
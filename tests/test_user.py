@@ -0,0 +1,81 @@
+# Copyright Sierra
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from tau_bench.envs import user as user_module
+from tau_bench.envs.user import LLMUserSimulationEnv
+
+
+class FakeMessage(SimpleNamespace):
+    def model_dump(self) -> Dict[str, Any]:
+        return {"role": "assistant", "content": self.content}
+
+
+class FakeLLM(object):
+    """Returns the scripted contents in turn, and records the messages of every request."""
+
+    def __init__(self, contents: List[str]) -> None:
+        self.contents = list(contents)
+        self.requests: List[List[Dict[str, Any]]] = []
+
+    def completion(
+        self, model: str, custom_llm_provider: str, messages: List[Dict[str, Any]]
+    ) -> Any:
+        self.requests.append(list(messages))
+        message = FakeMessage(content=self.contents.pop(0))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message)],
+            _hidden_params={"response_cost": 0.01 * len(self.requests)},
+        )
+
+    async def acompletion(self, **kwargs: Any) -> Any:
+        return self.completion(**kwargs)
+
+
+def run_user(monkeypatch, contents: List[str], use_async: bool) -> Any:
+    llm = FakeLLM(contents)
+    monkeypatch.setattr(user_module, "completion", llm.completion)
+    monkeypatch.setattr(user_module, "acompletion", llm.acompletion)
+    user = LLMUserSimulationEnv(model="model", provider="provider")
+    if use_async:
+        first = asyncio.run(user.reset_async("Cancel my order"))
+    else:
+        first = user.reset("Cancel my order")
+    return first, user, llm
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_empty_responses_are_retried(monkeypatch, use_async):
+    first, user, llm = run_user(monkeypatch, ["", "", "Hi, I want to cancel"], use_async)
+    assert first == "Hi, I want to cancel"
+    assert len(llm.requests) == 3
+    # every retry asks again after the empty response
+    assert llm.requests[2][-2:] == [
+        {"role": "assistant", "content": ""},
+        {
+            "role": "user",
+            "content": "You returned an empty response, which is disallowed. Please try again.",
+        },
+    ]
+    assert user.messages[-1] == {"role": "assistant", "content": "Hi, I want to cancel"}
+    assert user.get_total_cost() == pytest.approx(0.03)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_too_many_empty_responses(monkeypatch, use_async):
+    with pytest.raises(ValueError):
+        run_user(monkeypatch, ["", "", ""], use_async)
+
+
+def test_sync_and_async_paths_agree(monkeypatch):
+    contents = ["", "Hi, I want to cancel"]
+    sync_first, sync_user, sync_llm = run_user(monkeypatch, contents, use_async=False)
+    async_first, async_user, async_llm = run_user(monkeypatch, contents, use_async=True)
+    assert sync_first == async_first
+    assert sync_user.messages == async_user.messages
+    assert sync_llm.requests == async_llm.requests
+    assert sync_user.get_total_cost() == async_user.get_total_cost()
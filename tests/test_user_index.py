@@ -0,0 +1,29 @@
+# Copyright Sierra
+
+from tau_bench.envs.retail.data import load_data as load_retail_data
+from tau_bench.envs.retail.tools.user_index import user_ids_by_email, user_ids_by_name_zip
+from tau_bench.envs.snapshot import load_snapshot_view
+
+
+def test_user_index_matches_a_scan():
+    users = load_snapshot_view(load_retail_data)["users"]
+    user_ids = list(users)[:20]
+    # a changed email and a duplicated name/zip, the lookups must see both
+    users[user_ids[0]]["email"] = "New.Email@example.com"
+    users[user_ids[1]]["name"] = dict(users[user_ids[2]]["name"])
+    users[user_ids[1]]["address"]["zip"] = users[user_ids[2]]["address"]["zip"]
+    for user_id in user_ids + ["missing"]:
+        profile = users.get(user_id) or users[user_ids[0]]
+        email = profile["email"].upper()
+        assert user_ids_by_email(users, email) == [
+            key for key, user in users.items() if user["email"].lower() == email.lower()
+        ]
+        first_name, last_name = profile["name"]["first_name"], profile["name"]["last_name"]
+        zip = profile["address"]["zip"]
+        assert user_ids_by_name_zip(users, first_name, last_name, zip) == [
+            key
+            for key, user in users.items()
+            if user["name"]["first_name"].lower() == first_name.lower()
+            and user["name"]["last_name"].lower() == last_name.lower()
+            and user["address"]["zip"] == zip
+        ]